@@ -0,0 +1,154 @@
+# backend/assessment/admission.py
+
+import itertools
+import math
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+JsonDict = Dict[str, Any]
+
+
+class _Waiter:
+    def __init__(self, endpoint: str, priority: int, sequence: int) -> None:
+        self.endpoint = endpoint
+        self.priority = priority
+        self.sequence = sequence
+        self.admitted = False
+        self.event = threading.Event()
+
+
+class AdmissionController:
+    """Bounded concurrency with short priority queues in front of the LLM-backed views.
+
+    Every endpoint has its own in-flight limit and wait-queue size, and all
+    of them share ``capacity`` slots. A request that cannot start waits up to
+    ``queue_timeout`` seconds; when a slot frees, the waiting request with
+    the lowest priority number (then the oldest) whose endpoint is under its
+    limit is admitted. Requests that find the queue full, or time out in it,
+    are shed so the client can retry instead of piling onto the backend.
+
+    Views run in their own thread (``async_view`` starts a fresh event loop
+    per request), so waiting blocks that thread with a threading.Event.
+    """
+
+    def __init__(self, capacity: int, endpoints: Dict[str, JsonDict], queue_timeout: float) -> None:
+        self.capacity = capacity
+        self.endpoints = endpoints
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._waiters: List[_Waiter] = []
+        self._in_flight = {endpoint: 0 for endpoint in endpoints}
+        self._queued = {endpoint: 0 for endpoint in endpoints}
+        self._service_time = {endpoint: 1.0 for endpoint in endpoints}  # EWMA, seconds
+        self._total = 0
+
+    def _can_run(self, endpoint: str) -> bool:
+        return self._total < self.capacity and self._in_flight[endpoint] < self.endpoints[endpoint]["max_in_flight"]
+
+    def _start(self, endpoint: str) -> None:
+        self._in_flight[endpoint] += 1
+        self._total += 1
+        metrics.gauge_add("admission_in_flight", 1, endpoint=endpoint)
+
+    def _dispatch(self) -> None:
+        """Admit waiting requests in priority order while slots are free"""
+        for waiter in sorted(self._waiters, key=lambda w: (w.priority, w.sequence)):
+            if self._total >= self.capacity:
+                break
+            if self._can_run(waiter.endpoint):
+                self._waiters.remove(waiter)
+                self._queued[waiter.endpoint] -= 1
+                metrics.gauge_add("admission_queued", -1, endpoint=waiter.endpoint)
+                self._start(waiter.endpoint)
+                waiter.admitted = True
+                waiter.event.set()
+
+    def retry_after(self, endpoint: str) -> int:
+        """Seconds until the queue ahead has likely drained, at least one"""
+        config = self.endpoints[endpoint]
+        backlog = self._queued[endpoint] + self._in_flight[endpoint]
+        return max(1, math.ceil(self._service_time[endpoint] * backlog / config["max_in_flight"]))
+
+    def acquire(self, endpoint: str) -> Optional[int]:
+        """Block until admitted and return None, or return a Retry-After value if shed"""
+        config = self.endpoints[endpoint]
+        with self._lock:
+            if self._can_run(endpoint):
+                self._start(endpoint)
+                metrics.incr("admission_admitted_total", endpoint=endpoint, queued="false")
+                return None
+            if self._queued[endpoint] >= config["max_queue"]:
+                metrics.incr("admission_shed_total", endpoint=endpoint, reason="queue_full")
+                return self.retry_after(endpoint)
+            waiter = _Waiter(endpoint, config["priority"], next(self._sequence))
+            self._waiters.append(waiter)
+            self._queued[endpoint] += 1
+            metrics.gauge_add("admission_queued", 1, endpoint=endpoint)
+
+        started = time.monotonic()
+        waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            metrics.incr("admission_queue_wait_seconds_total", time.monotonic() - started, endpoint=endpoint)
+            if waiter.admitted:
+                metrics.incr("admission_admitted_total", endpoint=endpoint, queued="true")
+                return None
+            self._waiters.remove(waiter)
+            self._queued[endpoint] -= 1
+            metrics.gauge_add("admission_queued", -1, endpoint=endpoint)
+            metrics.incr("admission_shed_total", endpoint=endpoint, reason="timeout")
+            return self.retry_after(endpoint)
+
+    def release(self, endpoint: str, elapsed: float) -> None:
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            self._total -= 1
+            metrics.gauge_add("admission_in_flight", -1, endpoint=endpoint)
+            self._service_time[endpoint] = 0.8 * self._service_time[endpoint] + 0.2 * elapsed
+            self._dispatch()
+
+
+def admission_controlled(controller: Optional[AdmissionController], endpoint: str) -> Callable:
+    """Run a view method only once admitted; shed requests get a 503 with Retry-After.
+
+    The slot is held until the response is done, which for a streaming
+    response is when its body has been sent or abandoned. A None controller (admission control disabled) admits everything. Apply
+    it outside ``async_view`` so queued requests wait before an event loop
+    is started for them.
+    """
+
+    def decorator(view_func: Callable) -> Callable:
+        @wraps(view_func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if controller is None:
+                return view_func(*args, **kwargs)
+            retry_after = controller.acquire(endpoint)
+            if retry_after is not None:
+                return Response(
+                    {"error": "Server is busy, please retry later"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(retry_after)},
+                )
+            started = time.monotonic()
+
+            def release() -> None:
+                controller.release(endpoint, time.monotonic() - started)
+
+            try:
+                response = view_func(*args, **kwargs)
+            except BaseException:
+                release()
+                raise
+            # A streamed response does its work while the body is sent, so it keeps the slot until then
+            return metrics.after_response(response, release)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,41 @@
+# backend/assessment/background.py
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared background event loop on a daemon thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="assessment-background", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def _log_failure(future: concurrent.futures.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background task failed: {future.exception()}")
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+    """Run a coroutine on the background loop, outliving the request that scheduled it.
+
+    Views run on a per-request loop created by ``async_view`` that is closed
+    as soon as the response is built, so work that must continue after the
+    response is returned is handed to this long-lived loop instead.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    future.add_done_callback(_log_failure)
+    return future
@@ -0,0 +1,91 @@
+# backend/assessment/cohort.py
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .dedup import MinHasher, MinHashLSH
+
+JsonDict = Dict[str, Any]
+
+# (submission index, answer index) of one student's answer
+Member = Tuple[int, int]
+
+# Answers shorter than this are only grouped when identical after normalization:
+# one changed word in a three-word answer can flip its meaning
+NEAR_DUPLICATE_MIN_WORDS = 4
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_answer(text: Any) -> str:
+    """Case-, width-, punctuation- and whitespace-insensitive form of an answer"""
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def question_key(answer: JsonDict) -> Tuple[str, str, str]:
+    """Answers to the same question share type, question text and expected answer"""
+    return (
+        str(answer.get("type") or ""),
+        normalize_answer(answer.get("text")),
+        normalize_answer(answer.get("correct_answer")),
+    )
+
+
+def group_cohort_answers(
+    submissions: Sequence[JsonDict], hasher: MinHasher, threshold: float
+) -> Tuple[List[JsonDict], JsonDict]:
+    """Group a cohort's answers so every distinct answer to a question is scored once.
+
+    Each submission is ``{"student_id": ..., "answers": [answer, ...]}`` with
+    answers shaped as for ScoreAnswersView. Answers to the same question are
+    grouped when they are identical after normalize_answer, or, for answers
+    of at least NEAR_DUPLICATE_MIN_WORDS words, when their MinHash Jaccard
+    estimate reaches ``threshold``. Each returned group holds the answer to
+    score (its first member's) and the members to fan the score out to.
+    """
+    groups: List[JsonDict] = []
+    by_question: Dict[Tuple[str, str, str], JsonDict] = {}
+    total = 0
+
+    for submission_index, submission in enumerate(submissions):
+        for answer_index, answer in enumerate(submission.get("answers") or []):
+            total += 1
+            member = (submission_index, answer_index)
+            key = question_key(answer)
+            state = by_question.get(key)
+            if state is None:
+                state = by_question[key] = {
+                    "exact": {},
+                    "lsh": MinHashLSH(hasher.num_perm, threshold=threshold),
+                    "lsh_groups": [],
+                }
+
+            normalized = normalize_answer(answer.get("user_answer"))
+            group_index = state["exact"].get(normalized)
+            if group_index is None and len(normalized.split()) >= NEAR_DUPLICATE_MIN_WORDS:
+                signature = hasher.signature(normalized)
+                position = state["lsh"].query(signature)
+                if position is not None:
+                    group_index = state["lsh_groups"][position]
+                else:
+                    group_index = len(groups)
+                    state["lsh"].add([signature])
+                    state["lsh_groups"].append(group_index)
+            if group_index is None:
+                group_index = len(groups)
+            if group_index == len(groups):
+                groups.append({"answer": answer, "members": []})
+            state["exact"].setdefault(normalized, group_index)
+            groups[group_index]["members"].append(member)
+
+    stats = {
+        "students": len(submissions),
+        "answers": total,
+        "groups": len(groups),
+        "llm_calls_saved": total - len(groups),
+    }
+    return groups, stats
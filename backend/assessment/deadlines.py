@@ -0,0 +1,158 @@
+# backend/assessment/deadlines.py
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from django.conf import settings
+
+from . import metrics
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() by which the current request must be answered
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+# Absolute time.monotonic() by which the stage being awaited under with_deadline must finish
+_stage_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "stage_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran past its own deadline or the request's remaining latency budget"""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Deadline exceeded in stage '{stage}'")
+        self.stage = stage
+
+
+def latency_budget(seconds: float) -> Callable:
+    """Give every stage awaited inside the decorated coroutine a shared overall deadline"""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            token = _request_deadline.set(time.monotonic() + seconds)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _request_deadline.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def stage_time_left() -> Optional[float]:
+    """Seconds left for the stage being awaited, or None outside with_deadline.
+
+    Also readable from sync_to_async threads, which run in a copy of the
+    caller's context, so blocking calls there can bound their own waits.
+    """
+    deadline = _stage_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def with_deadline(stage: str, awaitable: Awaitable[T]) -> T:
+    """Await a stage under min(its STAGE_DEADLINES entry, the request's remaining budget).
+
+    On timeout the stage is cancelled and DeadlineExceeded is raised. Calls
+    already running in a worker thread cannot be interrupted; their result is
+    simply discarded when it arrives.
+    """
+    timeout = settings.STAGE_DEADLINES[stage]
+    remaining = remaining_budget()
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        metrics.incr("deadline_exceeded_total", stage=stage)
+        raise DeadlineExceeded(stage)
+    # Set before wait_for wraps the awaitable in a task, which copies the context
+    token = _stage_deadline.set(time.monotonic() + timeout)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        metrics.incr("deadline_exceeded_total", stage=stage)
+        raise DeadlineExceeded(stage) from None
+    finally:
+        _stage_deadline.reset(token)
+
+
+class LatencyTracker:
+    """Rolling window of recent upstream latencies for one stage"""
+
+    def __init__(self, window: int = 256) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < settings.HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(stage: str) -> LatencyTracker:
+    with _trackers_lock:
+        return _trackers.setdefault(stage, LatencyTracker())
+
+
+async def hedged(stage: str, call: Callable[[], Awaitable[T]]) -> T:
+    """Run call, firing one duplicate if it outlives the stage's observed p95.
+
+    Whichever attempt succeeds first wins and the other is cancelled. call
+    must raise on failure: an attempt that raised never wins while the other
+    may still succeed, and only successful attempts feed the p95.
+    """
+    tracker = get_tracker(stage)
+    started = time.monotonic()
+    attempts = [asyncio.ensure_future(call())]
+    try:
+        hedge_after = tracker.quantile(0.95) if settings.HEDGING_ENABLED else None
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(attempts, timeout=hedge_after)
+            if not done:
+                metrics.incr("hedged_requests_total", stage=stage)
+                attempts.append(asyncio.ensure_future(call()))
+
+        waiting = set(attempts)
+        while True:
+            done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [attempt for attempt in done if attempt.exception() is None]
+            if not succeeded:
+                if waiting:
+                    continue
+                # Every attempt failed
+                raise done.pop().exception()
+            winner = succeeded[0]
+            if winner is not attempts[0]:
+                metrics.incr("hedge_wins_total", stage=stage)
+            tracker.record(time.monotonic() - started)
+            return winner.result()
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
@@ -0,0 +1,264 @@
+# backend/assessment/dedup.py
+
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .filelock import file_lock
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide
+SHINGLE_SIZE = 3  # words per shingle
+MERGE_MIN = 4096  # signatures added before they are merged into the sorted band arrays
+
+_PRIME = np.uint64((1 << 31) - 1)
+_MAX_HASH = np.uint32((1 << 32) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hash the normalized word shingles of text to 32-bit integers"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) <= size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class MinHasher:
+    """MinHash signatures from universal hashes (a * x + b) mod p.
+
+    The permutation parameters come from a fixed seed so signatures computed
+    by different processes, or persisted to disk, stay comparable.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1) -> None:
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingle_hashes(text) % _PRIME
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+class MinHashLSH:
+    """Banded LSH index over MinHash signatures.
+
+    Signatures live in one uint32 array: with a path, the flat file of
+    records itself, mmapped, so the index for a namespace survives restarts
+    and is shared with every other process using the same file. Each band
+    is indexed by a sorted array of 32-bit band hashes (about 128 bytes per
+    signature); signatures added since the last merge wait in small dict
+    buckets. Before every query and add, records other processes appended
+    to the file are picked up.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        threshold: float = 0.85,
+        path: Optional[str] = None,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.path = path
+        self._record_bytes = num_perm * 4
+        # Odd multipliers hashing each band's rows to one 64-bit value
+        self._band_mix = np.random.RandomState(0).randint(1, 1 << 31, size=self.rows).astype(np.uint64) * 2 + 1
+        self._base = np.empty((0, num_perm), dtype=np.uint32)
+        self._base_keys = [np.empty(0, dtype=np.uint32) for _ in range(bands)]
+        self._base_positions = [np.empty(0, dtype=np.uint32) for _ in range(bands)]
+        self._recent: List[np.ndarray] = []
+        self._recent_buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        if path:
+            with self._lock:
+                self._sync()
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """(n, bands) 32-bit hashes of each band of each signature"""
+        keys = np.empty((len(signatures), self.bands), dtype=np.uint32)
+        # In slices, so hashing a large reloaded file needs no full-size uint64 copy
+        for start in range(0, len(signatures), MERGE_MIN):
+            rows = signatures[start:start + MERGE_MIN].reshape(-1, self.bands, self.rows).astype(np.uint64)
+            mixed = (rows * self._band_mix).sum(axis=2)
+            keys[start:start + MERGE_MIN] = (mixed ^ (mixed >> np.uint64(32))).astype(np.uint32)
+        return keys
+
+    def _signature(self, position: int) -> np.ndarray:
+        if position < len(self._base):
+            return self._base[position]
+        return self._recent[position - len(self._base)]
+
+    def _candidates(self, keys: np.ndarray, bounds: Optional[np.ndarray], row: int) -> Iterator[int]:
+        for band in range(self.bands):
+            if bounds is not None:
+                lower, upper = bounds[:, band, row]
+                yield from self._base_positions[band][lower:upper].tolist()
+            yield from self._recent_buckets[band].get(int(keys[row, band]), ())
+
+    def query_many(
+        self, signatures: Sequence[np.ndarray], ignore: Sequence[Tuple[int, int]] = ()
+    ) -> List[Optional[int]]:
+        """Position of a stored near-duplicate of each signature, or None; [start, stop) ranges in ignore never match"""
+        if not len(signatures):
+            return []
+        stacked = np.asarray(signatures, dtype=np.uint32).reshape(-1, self.num_perm)
+        keys = self._band_keys(stacked)
+        with self._lock:
+            self._sync()
+            bounds = None
+            if len(self._base):
+                bounds = np.array([
+                    [np.searchsorted(self._base_keys[band], keys[:, band], side) for band in range(self.bands)]
+                    for side in ("left", "right")
+                ])
+            matches: List[Optional[int]] = []
+            for row, signature in enumerate(stacked):
+                match = None
+                seen = set()
+                for candidate in self._candidates(keys, bounds, row):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if any(start <= candidate < stop for start, stop in ignore):
+                        continue
+                    if estimate_jaccard(signature, self._signature(candidate)) >= self.threshold:
+                        match = candidate
+                        break
+                matches.append(match)
+        return matches
+
+    def query(self, signature: np.ndarray) -> Optional[int]:
+        """Return the position of a stored near-duplicate of signature, if any"""
+        return self.query_many([signature])[0]
+
+    def add(self, signatures: Sequence[np.ndarray]) -> int:
+        """Store signatures; returns the position of the first, the rest following it"""
+        if not len(signatures):
+            return len(self)
+        stacked = np.asarray(signatures, dtype=np.uint32).reshape(-1, self.num_perm)
+        with self._lock:
+            if not self.path:
+                position = len(self)
+                self._insert(stacked)
+                return position
+            with file_lock(self.path + ".lock"):
+                # Cut off a partial record left by an interrupted append so new records stay aligned
+                size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                if size % self._record_bytes:
+                    os.truncate(self.path, size - size % self._record_bytes)
+                self._sync()
+                position = len(self)
+                with open(self.path, "ab") as f:
+                    f.write(stacked.tobytes())
+                self._insert(stacked)
+                return position
+
+    def _insert(self, signatures: np.ndarray) -> None:
+        position = len(self)
+        self._recent.extend(signatures)
+        keys = self._band_keys(signatures)
+        for offset in range(len(signatures)):
+            for band, bucket in enumerate(self._recent_buckets):
+                bucket.setdefault(int(keys[offset, band]), []).append(position + offset)
+        if len(self._recent) >= max(MERGE_MIN, len(self._base) // 8):
+            self._merge(len(self))
+
+    def _merge(self, count: int) -> None:
+        """Fold every signature after the sorted base, up to count, into the band arrays"""
+        start = len(self._base)
+        if self.path:
+            signatures = np.memmap(self.path, dtype=np.uint32, mode="r", shape=(count, self.num_perm))
+            added = signatures[start:]
+        else:
+            added = np.asarray(self._recent, dtype=np.uint32).reshape(-1, self.num_perm)
+            signatures = np.concatenate([self._base, added])
+        keys = self._band_keys(added)
+        positions = np.arange(start, count, dtype=np.uint32)
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            new_keys = keys[order, band]
+            at = np.searchsorted(self._base_keys[band], new_keys, "right")
+            self._base_keys[band] = np.insert(self._base_keys[band], at, new_keys)
+            self._base_positions[band] = np.insert(self._base_positions[band], at, positions[order])
+        self._base = signatures
+        self._recent = []
+        self._recent_buckets = [{} for _ in range(self.bands)]
+
+    def _sync(self) -> None:
+        """Index records appended to the file since it was last read, by this or another process.
+
+        A trailing partial record, left by an interrupted append, is ignored.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        count = os.path.getsize(self.path) // self._record_bytes
+        if count > len(self):
+            # Includes this process's recent signatures, which are in the file too
+            self._merge(count)
+
+
+def find_near_duplicates(
+    texts: Sequence[str], index: MinHashLSH, hasher: MinHasher, ignore: Sequence[Tuple[int, int]] = ()
+) -> Tuple[List[int], List[np.ndarray], Dict[str, Any]]:
+    """Pick the texts to keep, dropping near-duplicates within texts and of anything in index.
+
+    Index positions in the ``ignore`` ranges, e.g. chunks about to be
+    replaced, do not count as stored. Returns the kept positions, their
+    signatures (to be added to the index once they are stored) and
+    per-batch dedup statistics.
+    """
+    local = MinHashLSH(index.num_perm, index.bands, index.threshold)
+    keep: List[int] = []
+    signatures: List[np.ndarray] = []
+    within = existing = 0
+    all_signatures = [hasher.signature(text) for text in texts]
+    # One vectorized lookup against the stored index for the whole batch
+    stored_matches = index.query_many(all_signatures, ignore)
+    for position, (signature, stored_match) in enumerate(zip(all_signatures, stored_matches)):
+        if local.query(signature) is not None:
+            within += 1
+            continue
+        if stored_match is not None:
+            existing += 1
+            continue
+        local.add([signature])
+        keep.append(position)
+        signatures.append(signature)
+
+    stats = {
+        "chunks": len(texts),
+        "duplicates_within_upload": within,
+        "duplicates_of_existing": existing,
+        "dedup_ratio": (within + existing) / len(texts) if texts else 0.0,
+    }
+    return keep, signatures, stats
@@ -0,0 +1,22 @@
+# backend/assessment/filelock.py
+
+import fcntl
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """Hold an flock on path, created if missing, for the duration of the block.
+
+    The lock belongs to the open file, so it orders writers in different
+    processes (server workers, management commands) as well as threads.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
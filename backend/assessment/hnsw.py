@@ -0,0 +1,377 @@
+# backend/assessment/hnsw.py
+
+import heapq
+import json
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (similarity, row) pairs; rows index the namespace's vector file
+Scored = Tuple[float, int]
+
+# Upper layers are rewritten once this many rows, or an eighth of the graph if more, were added
+CHECKPOINT_MIN_ROWS = 10_000
+
+
+class _UpperLayer:
+    """Neighbour lists of one layer above level 0.
+
+    Lists read from disk stay in flat arrays (sorted nodes, CSR offsets into
+    neighbors); lists set since then shadow them from a dict until the next
+    checkpoint folds them back in.
+    """
+
+    def __init__(
+        self,
+        nodes: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+        neighbors: Optional[np.ndarray] = None,
+    ) -> None:
+        # One tuple, swapped as a whole, so searches running during compact() never mix old and new arrays
+        self.arrays = (
+            nodes if nodes is not None else np.empty(0, dtype=np.int64),
+            offsets if offsets is not None else np.zeros(1, dtype=np.int64),
+            neighbors if neighbors is not None else np.empty(0, dtype=np.int64),
+        )
+        self.changed: Dict[int, List[int]] = {}
+
+    def get(self, node: int) -> List[int]:
+        lists = self.changed.get(node)
+        if lists is not None:
+            return list(lists)
+        nodes, offsets, neighbors = self.arrays
+        i = int(np.searchsorted(nodes, node))
+        if i < len(nodes) and nodes[i] == node:
+            return neighbors[offsets[i]:offsets[i + 1]].tolist()
+        return []
+
+    def set(self, node: int, neighbors: List[int]) -> None:
+        self.changed[node] = list(neighbors)
+
+    def compact(self) -> None:
+        """Fold the changed lists into the arrays"""
+        if not self.changed:
+            return
+        nodes, offsets, neighbors = self.arrays
+        changed = np.fromiter(self.changed, dtype=np.int64, count=len(self.changed))
+        changed_lengths = np.fromiter((len(self.changed[node]) for node in changed.tolist()), dtype=np.int64)
+        changed_neighbors = np.fromiter(
+            (n for node in changed.tolist() for n in self.changed[node]),
+            dtype=np.int64,
+            count=int(changed_lengths.sum()),
+        )
+        keep = ~np.isin(nodes, changed)
+        lengths = np.diff(offsets)
+        neighbors = np.concatenate([neighbors[np.repeat(keep, lengths)], changed_neighbors])
+        nodes = np.concatenate([nodes[keep], changed])
+        lengths = np.concatenate([lengths[keep], changed_lengths])
+        starts = np.cumsum(lengths) - lengths
+
+        order = np.argsort(nodes, kind="stable")
+        lengths = lengths[order]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        # Index into the unsorted neighbors of every entry in sorted node order
+        gather = np.repeat(starts[order] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        self.arrays = (nodes[order], offsets, neighbors[gather])
+        self.changed = {}
+
+
+class HNSWIndex:
+    """Hierarchical navigable small world graph over the rows of a local namespace.
+
+    Similarity is the inner product of normalized vectors (cosine). The graph
+    only stores row numbers; vectors are read from the namespace's mmapped
+    float32 file, which is passed to every call. Deleted rows stay in the
+    graph as tombstones: they are traversed but never returned.
+
+    Files in ``directory``:
+      hnsw_level0.i32  (capacity, 2M) neighbour table, used as a writable mmap
+      hnsw_levels.i8   top level of every node, written as nodes are added
+      hnsw_upper.npz   neighbour lists of the (few) nodes above level 0
+      hnsw_meta.json   parameters, node count and entry point
+
+    Upper layers and meta are only rewritten at checkpoints: once
+    CHECKPOINT_MIN_ROWS rows (or an eighth of the graph) were added since the
+    last one, and on close. Both are replaced atomically, and the graph
+    reopens as of the last checkpoint; the caller re-adds later rows.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        M: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int = 0,
+    ) -> None:
+        self.directory = directory
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_multiplier = 1 / math.log(M)
+        self._rng = random.Random(seed)
+
+        self.count = 0
+        self.entry = -1
+        self.max_level = -1
+        self.levels = bytearray()
+        self.upper: Dict[int, _UpperLayer] = {}
+        self._checkpoint_count = 0
+        self._level0: Optional[np.memmap] = None
+        self._table: Optional[np.ndarray] = None  # plain view of _level0, avoids memmap indexing overhead
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # Persistence
+
+    def _load(self) -> None:
+        meta_path = self._path("hnsw_meta.json")
+        levels_path = self._path("hnsw_levels.i8")
+        if not os.path.exists(meta_path) or not os.path.exists(levels_path):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["M"] != self.M:
+            # Built with different parameters; start over and let the caller re-add rows
+            return
+        with open(levels_path, "rb") as f:
+            levels = bytearray(f.read(meta["count"]))
+        if len(levels) < meta["count"]:
+            return
+        self.count = self._checkpoint_count = meta["count"]
+        self.entry = meta["entry"]
+        self.max_level = meta["max_level"]
+        self.levels = levels
+        self._open_level0()
+        with np.load(self._path("hnsw_upper.npz")) as upper:
+            for level in range(1, self.max_level + 1):
+                self.upper[level] = _UpperLayer(
+                    upper[f"nodes_{level}"], upper[f"offsets_{level}"], upper[f"neighbors_{level}"]
+                )
+
+    def _write_levels(self, start: int) -> None:
+        fd = os.open(self._path("hnsw_levels.i8"), os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, bytes(self.levels[start:]), start)
+        finally:
+            os.close(fd)
+
+    def flush(self) -> None:
+        """Checkpoint the graph: sync level 0 and atomically replace the upper layers, then meta"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._level0 is not None:
+            self._level0.flush()
+        arrays = {}
+        for level, layer in self.upper.items():
+            layer.compact()
+            arrays[f"nodes_{level}"], arrays[f"offsets_{level}"], arrays[f"neighbors_{level}"] = layer.arrays
+        # np.savez adds .npz to names without it
+        tmp_path = self._path("hnsw_upper.tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self._path("hnsw_upper.npz"))
+        meta = {
+            "M": self.M,
+            "count": self.count,
+            "entry": self.entry,
+            "max_level": self.max_level,
+        }
+        # Meta is written last and atomically: it decides how many nodes are valid
+        tmp_path = self._path("hnsw_meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("hnsw_meta.json"))
+        self._checkpoint_count = self.count
+
+    def close(self) -> None:
+        if self.count != self._checkpoint_count:
+            self.flush()
+
+    def _open_level0(self, min_capacity: int = 0) -> None:
+        path = self._path("hnsw_level0.i32")
+        row_bytes = 4 * self.M0
+        capacity = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        if capacity < min_capacity or capacity == 0:
+            os.makedirs(self.directory, exist_ok=True)
+            capacity = max(min_capacity, 2 * capacity, 1024)
+            if self._level0 is not None:
+                # Concurrent readers keep using the old mapping until the new one is bound
+                self._level0.flush()
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self._level0 = np.memmap(path, dtype=np.int32, mode="r+", shape=(capacity, self.M0))
+        self._table = self._level0.view(np.ndarray)
+
+    # Graph access
+
+    def _neighbors(self, node: int, level: int) -> List[int]:
+        if level == 0:
+            row = self._table[node]
+            return row[row >= 0].tolist()
+        return self.upper[level].get(node)
+
+    def _set_neighbors(self, node: int, level: int, neighbors: List[int]) -> None:
+        if level == 0:
+            row = self._table[node]
+            row[:len(neighbors)] = neighbors
+            row[len(neighbors):] = -1
+        else:
+            self.upper[level].set(node, neighbors)
+
+    # Search
+
+    def _greedy(self, query: np.ndarray, vectors: np.ndarray, node: int, similarity: float, level: int) -> Scored:
+        while True:
+            neighbors = [n for n in self._neighbors(node, level) if n < len(vectors)]
+            if not neighbors:
+                return similarity, node
+            sims = vectors[neighbors] @ query
+            best = int(np.argmax(sims))
+            if sims[best] <= similarity:
+                return similarity, node
+            similarity, node = float(sims[best]), neighbors[best]
+
+    def _search_layer(
+        self, query: np.ndarray, vectors: np.ndarray, entry_points: List[Scored], ef: int, level: int
+    ) -> List[Scored]:
+        """Best-first search of one layer; returns up to ef (similarity, node) pairs"""
+        bound = len(vectors)
+        visited = {node for _, node in entry_points}
+        candidates = [(-sim, node) for sim, node in entry_points]
+        heapq.heapify(candidates)
+        results = list(entry_points)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative_sim, node = heapq.heappop(candidates)
+            if len(results) >= ef and -negative_sim < results[0][0]:
+                break
+            # Rows past the bound were linked by an insert newer than the caller's snapshot
+            fresh = [n for n in self._neighbors(node, level) if n < bound and n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            sims = vectors[fresh] @ query
+            for neighbor, sim in zip(fresh, sims.tolist()):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return results
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        vectors: np.ndarray,
+        deleted: np.ndarray,
+        ef: Optional[int] = None,
+    ) -> List[Scored]:
+        """Approximate top-k (similarity, row) pairs for a normalized query, best first"""
+        if self.entry < 0 or top_k <= 0:
+            return []
+        ef = max(ef or self.ef_search, top_k)
+        vectors = np.asarray(vectors)
+        node, max_level = self.entry, self.max_level
+        if node >= len(vectors):
+            # A concurrent insert promoted a row the caller cannot see yet
+            node, max_level = 0, 0
+        similarity = float(vectors[node] @ query)
+        for level in range(max_level, 0, -1):
+            similarity, node = self._greedy(query, vectors, node, similarity, level)
+
+        while True:
+            results = self._search_layer(query, vectors, [(similarity, node)], ef, 0)
+            live = [(sim, row) for sim, row in results if row < len(deleted) and not deleted[row]]
+            # Tombstones take up result slots; widen the beam until enough live rows remain
+            if len(live) >= top_k or ef >= len(vectors):
+                return sorted(live, reverse=True)[:top_k]
+            ef = min(2 * ef, len(vectors))
+
+    # Insertion
+
+    def _select(self, base: int, candidates: List[Scored], limit: int, vectors: np.ndarray) -> List[int]:
+        """Neighbour selection heuristic: skip candidates closer to an already chosen neighbour than
+        to the base node (keeps links spread across clusters), then fill up with the skipped ones"""
+        candidates = sorted((c for c in candidates if c[1] != base), reverse=True)
+        if len(candidates) <= limit:
+            return [node for _, node in candidates]
+        nodes = [node for _, node in candidates]
+        candidate_vectors = vectors[nodes]
+        pairwise = candidate_vectors @ candidate_vectors.T
+        # closest[i]: highest similarity between candidate i and any selected neighbour
+        closest = np.full(len(nodes), -np.inf, dtype=np.float32)
+        selected: List[int] = []
+        skipped: List[int] = []
+        for i, (similarity, _) in enumerate(candidates):
+            if len(selected) >= limit:
+                break
+            if closest[i] > similarity:
+                skipped.append(i)
+            else:
+                selected.append(i)
+                np.maximum(closest, pairwise[i], out=closest)
+        selected.extend(skipped[:limit - len(selected)])
+        return [nodes[i] for i in selected]
+
+    def add(self, vectors: np.ndarray, start: int, stop: int) -> None:
+        """Insert rows [start, stop) of vectors; rows must be added in order"""
+        if start != self.count:
+            raise ValueError(f"HNSW index holds {self.count} rows, cannot add from row {start}")
+        if stop <= start:
+            return
+        vectors = np.asarray(vectors)
+        if self._level0 is None or len(self._level0) < stop:
+            self._open_level0(min_capacity=stop)
+        for row in range(start, stop):
+            self._insert(row, vectors)
+        self._write_levels(start)
+        if self.count - self._checkpoint_count >= max(CHECKPOINT_MIN_ROWS, self._checkpoint_count // 8):
+            self.flush()
+
+    def _insert(self, row: int, vectors: np.ndarray) -> None:
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_multiplier)
+        self.levels.append(level)
+        self._table[row] = -1
+        for upper_level in range(1, level + 1):
+            self.upper.setdefault(upper_level, _UpperLayer()).set(row, [])
+        self.count = row + 1
+
+        if self.entry < 0:
+            self.entry, self.max_level = row, level
+            return
+
+        query = np.asarray(vectors[row])
+        node = self.entry
+        similarity = float(vectors[node] @ query)
+        for current in range(self.max_level, level, -1):
+            similarity, node = self._greedy(query, vectors, node, similarity, current)
+
+        entry_points = [(similarity, node)]
+        for current in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, vectors, entry_points, self.ef_construction, current)
+            limit = self.M0 if current == 0 else self.M
+            neighbors = self._select(row, found, self.M, vectors)
+            self._set_neighbors(row, current, neighbors)
+            for neighbor in neighbors:
+                links = self._neighbors(neighbor, current)
+                if row in links:
+                    # Linked before a reopen rolled the graph back to its last checkpoint
+                    continue
+                links.append(row)
+                if len(links) > limit:
+                    sims = (vectors[links] @ vectors[neighbor]).tolist()
+                    links = self._select(neighbor, list(zip(sims, links)), limit, vectors)
+                self._set_neighbors(neighbor, current, links)
+            entry_points = found
+
+        if level > self.max_level:
+            self.entry, self.max_level = row, level
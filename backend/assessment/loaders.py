@@ -0,0 +1,162 @@
+# backend/assessment/loaders.py
+
+import csv
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+CSV_CONTENT_TYPE = "text/csv"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TABULAR_CONTENT_TYPES = (CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE)
+
+# langchain_community loader class per content type for documents parsed with Unstructured
+UNSTRUCTURED_LOADERS = {
+    "application/pdf": "UnstructuredPDFLoader",
+    "application/msword": "UnstructuredWordDocumentLoader",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "UnstructuredWordDocumentLoader",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": "UnstructuredPowerPointLoader",
+}
+
+CELL_SEPARATOR = " | "
+# Least room left for row text when a long header (and sheet name) nearly fills a chunk
+MIN_ROW_WIDTH = 100
+
+
+def unstructured_loader(file_path: str, content_type: str) -> Optional[Any]:
+    """Unstructured loader for a PDF/Word/PowerPoint file, or None for other content types"""
+    name = UNSTRUCTURED_LOADERS.get(content_type)
+    if name is None:
+        return None
+    from langchain_community import document_loaders
+
+    return getattr(document_loaders, name)(file_path)
+
+
+def _format_row(cells: Sequence[Any]) -> str:
+    """Render a row as a single line, dropping trailing empty cells"""
+    values = ["" if cell is None else str(cell).replace("\n", " ").strip() for cell in cells]
+    while values and not values[-1]:
+        values.pop()
+    return CELL_SEPARATOR.join(values)
+
+
+def _split_line(line: str, width: int) -> List[str]:
+    """Break a row longer than width into pieces, preferably between cells, then between words"""
+    pieces = []
+    while len(line) > width:
+        cut = line.rfind(CELL_SEPARATOR, 1, width)
+        if cut > 0:
+            pieces.append(line[:cut])
+            line = line[cut + len(CELL_SEPARATOR):]
+            continue
+        cut = line.rfind(" ", 1, width)
+        if cut <= 0:
+            cut = width
+        pieces.append(line[:cut].rstrip())
+        line = line[cut:].lstrip()
+    if line:
+        pieces.append(line)
+    return pieces
+
+
+class TabularRowGroupLoader:
+    """Stream CSV/XLSX rows and group them into chunks that repeat the header.
+
+    Rows are read one at a time (csv.reader / openpyxl read-only mode), so the
+    loader never holds more than one chunk of rows in memory. Each emitted
+    document starts with the header line and is at most ``chunk_size``
+    characters long; a row too long to fit is split across several
+    documents, each starting with the header again.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        content_type: str,
+        chunk_size: int = 1000,
+        encoding: str = "utf-8",
+    ) -> None:
+        if content_type not in TABULAR_CONTENT_TYPES:
+            raise ValueError(f"Unsupported tabular content type: {content_type}")
+        self.file_path = file_path
+        self.content_type = content_type
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Yield header-prefixed row-group documents"""
+        if self.content_type == CSV_CONTENT_TYPE:
+            yield from self._group_rows(self._iter_csv_rows(), sheet=None)
+        else:
+            yield from self._iter_xlsx_documents()
+
+    def load(self) -> List[Document]:
+        return list(self.lazy_load())
+
+    def _iter_csv_rows(self) -> Iterator[Sequence[Any]]:
+        with open(self.file_path, newline="", encoding=self.encoding, errors="replace") as f:
+            yield from csv.reader(f)
+
+    def _iter_xlsx_documents(self) -> Iterator[Document]:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                rows = worksheet.iter_rows(values_only=True)
+                yield from self._group_rows(rows, sheet=worksheet.title)
+        finally:
+            # Read-only workbooks keep the underlying zip file open
+            workbook.close()
+
+    def _group_rows(
+        self, rows: Iterable[Sequence[Any]], sheet: Optional[str]
+    ) -> Iterator[Document]:
+        header: Optional[str] = None
+        group: List[str] = []
+        group_len = 0
+        start_row = end_row = 0
+
+        for row_number, cells in enumerate(rows, start=1):
+            line = _format_row(cells)
+            if not line:
+                continue
+            if header is None:
+                header = f"{sheet}\n{line}" if sheet else line
+                continue
+
+            line_len = len(line) + 1  # newline joining it to the group
+            width = max(self.chunk_size - len(header) - 1, MIN_ROW_WIDTH)
+            if group and (len(header) + group_len + line_len > self.chunk_size or len(line) > width):
+                yield self._make_document(header, group, sheet, start_row, end_row)
+                group, group_len = [], 0
+            if len(line) > width:
+                # Split here rather than in the text splitter, which would drop the header from the continuations
+                for piece in _split_line(line, width):
+                    yield self._make_document(header, [piece], sheet, row_number, row_number)
+                continue
+            if not group:
+                start_row = row_number
+            group.append(line)
+            group_len += line_len
+            end_row = row_number
+
+        if header is not None and group:
+            yield self._make_document(header, group, sheet, start_row, end_row)
+
+    def _make_document(
+        self,
+        header: str,
+        lines: List[str],
+        sheet: Optional[str],
+        start_row: int,
+        end_row: int,
+    ) -> Document:
+        metadata = {
+            "source": self.file_path,
+            "start_row": start_row,
+            "end_row": end_row,
+        }
+        if sheet:
+            metadata["sheet"] = sheet
+        return Document(page_content="\n".join([header, *lines]), metadata=metadata)
@@ -0,0 +1,367 @@
+# backend/assessment/management/commands/ingest_documents.py
+
+# Safe to run next to the server on the same data: the local vector store takes a flock on each
+# namespace directory and the dedup index on "<file>.lock" for every write. The server's in-memory
+# semantic cache is not told about what this command ingests, so restart or reload the server
+# afterwards, or cached generations may not see the new documents until SEMANTIC_CACHE_TTL.
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.loaders import (
+    TABULAR_CONTENT_TYPES,
+    UNSTRUCTURED_LOADERS,
+    TabularRowGroupLoader,
+    unstructured_loader,
+)
+from assessment.splitter import LinearTextSplitter
+from assessment.vectorstore import LocalVectorStore
+
+JsonDict = Dict[str, Any]
+
+SUPPORTED_CONTENT_TYPES = (*UNSTRUCTURED_LOADERS, *TABULAR_CONTENT_TYPES)
+CHECKPOINT_NAME = ".ingest_checkpoint.jsonl"
+DELETE_BATCH_SIZE = 1000  # ids per delete call, Pinecone's limit
+
+
+def parse_and_split(file_path: str, content_type: str, chunk_size: int, chunk_overlap: int) -> List[Any]:
+    """Parse a PDF/Word/PowerPoint file into chunks; runs in a worker process"""
+    documents = unstructured_loader(file_path, content_type).load()
+    return LinearTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_documents(documents)
+
+
+def find_files(root: str) -> List[Tuple[str, str]]:
+    """(relative path, content type) of every supported file under root, in a stable order"""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            content_type, _ = mimetypes.guess_type(name)
+            if content_type in SUPPORTED_CONTENT_TYPES:
+                found.append((os.path.relpath(os.path.join(directory, name), root), content_type))
+    return found
+
+
+def new_version(previous: Optional[JsonDict], version: Tuple[int, int]) -> JsonDict:
+    """Progress for a new version of a file, carrying over what the earlier versions wrote.
+
+    ``ids`` and ``dedup`` are the chunk ids and dedup index ranges written
+    for this version. Those of earlier versions become ``stale_ids``, deleted
+    unless this version writes them again, and ``stale_dedup``, which no
+    longer count as stored content when this version is deduplicated.
+    """
+    stale_ids: Set[str] = set()
+    stale_dedup: List[List[int]] = []
+    if previous is not None:
+        stale_ids = previous["stale_ids"] | previous["ids"]
+        stale_dedup = previous["stale_dedup"] + previous["dedup"]
+    return {
+        "version": version,
+        "batches": {},
+        "done": False,
+        "ids": set(),
+        "dedup": [],
+        "stale_ids": stale_ids,
+        "stale_dedup": stale_dedup,
+    }
+
+
+def _add_written(progress: JsonDict, record: JsonDict) -> None:
+    progress["ids"].update(record.get("ids", ()))
+    if record.get("dedup"):
+        progress["dedup"].append(record["dedup"])
+
+
+def load_checkpoint(path: str) -> Tuple[Optional[int], Dict[str, JsonDict]]:
+    """Replay a checkpoint log into (batch size, per-file progress).
+
+    Progress is kept per file with the size and mtime it was recorded for;
+    records for an earlier version of a file only survive as the ids and
+    dedup ranges it wrote (see ``new_version``). A partial last line, left
+    by an interrupted write, is ignored.
+    """
+    batch_size = None
+    files: Dict[str, JsonDict] = {}
+    if not os.path.exists(path):
+        return batch_size, files
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "batch_size" in record:
+                batch_size = record["batch_size"]
+                continue
+            version = (record["size"], record["mtime"])
+            progress = files.get(record["file"])
+            if progress is None or progress["version"] != version:
+                progress = files[record["file"]] = new_version(progress, version)
+            if "batch" in record:
+                progress["batches"][record["batch"]] = record["stats"]
+            _add_written(progress, record)
+            if record.get("done"):
+                # Written only after the earlier versions' leftover chunks were deleted
+                progress["done"] = True
+                progress["stale_ids"] = set()
+    return batch_size, files
+
+
+class Checkpoint:
+    """Append-only log of finished chunk batches and files, flushed after every record"""
+
+    def __init__(self, path: str, batch_size: int) -> None:
+        saved_batch_size, self.files = load_checkpoint(path)
+        if saved_batch_size is not None and saved_batch_size != batch_size:
+            raise CommandError(
+                f"{path} was written with --batch-size {saved_batch_size}; resume with the same value or --restart"
+            )
+        cut_off = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                cut_off = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if cut_off:
+            # End the record an interrupted run left half-written, so the next one gets its own line
+            self._file.write("\n")
+        if saved_batch_size is None:
+            self._write({"batch_size": batch_size})
+
+    def _write(self, record: JsonDict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def progress(self, name: str, version: Tuple[int, int]) -> JsonDict:
+        progress = self.files.get(name)
+        if progress is None or tuple(progress["version"]) != version:
+            progress = self.files[name] = new_version(progress, version)
+        return progress
+
+    def batch_done(self, name: str, version: Tuple[int, int], batch: int, stats: JsonDict, written: JsonDict) -> None:
+        """Record a finished batch with the ids and dedup range process_documents reported in ``written``"""
+        record = {"file": name, "size": version[0], "mtime": version[1], "batch": batch, "stats": stats, **written}
+        progress = self.progress(name, version)
+        progress["batches"][batch] = stats
+        _add_written(progress, record)
+        self._write(record)
+
+    def batch_failed(self, name: str, version: Tuple[int, int], written: JsonDict) -> None:
+        """Record the ids an unfinished batch may have upserted, so a later version deletes them"""
+        record = {"file": name, "size": version[0], "mtime": version[1], **written}
+        _add_written(self.progress(name, version), record)
+        self._write(record)
+
+    def file_done(self, name: str, version: Tuple[int, int]) -> None:
+        progress = self.progress(name, version)
+        progress["done"] = True
+        progress["stale_ids"] = set()
+        self._write({"file": name, "size": version[0], "mtime": version[1], "done": True})
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _batches(documents: Iterator[Any], batch_size: int) -> Iterator[List[Any]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingest every PDF, Word, PowerPoint, CSV and XLSX file under a directory into the vector index. "
+        "Progress is checkpointed per file and per chunk batch, so rerunning an interrupted "
+        "command resumes where it stopped; a file changed since it was ingested starts over, and "
+        "chunks its earlier version stored that the new one does not overwrite are deleted. It may "
+        "run while the server is up, since writes to the vector store and dedup index are locked, "
+        "but restart the server afterwards so its semantic cache sees the new documents."
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="files embedded and upserted at once"
+        )
+        parser.add_argument(
+            "--parse-workers",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="processes parsing and chunking PDF/Word/PowerPoint files",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=200, help="chunks per checkpointed batch"
+        )
+        parser.add_argument("--checkpoint", help=f"checkpoint log (default: <directory>/{CHECKPOINT_NAME})")
+        parser.add_argument("--restart", action="store_true", help="discard the checkpoint and ingest everything")
+        parser.add_argument(
+            "--report-interval", type=float, default=10.0, help="seconds between progress lines"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        root = os.path.abspath(options["directory"])
+        if not os.path.isdir(root):
+            raise CommandError(f"{root} is not a directory")
+        checkpoint_path = options["checkpoint"] or os.path.join(root, CHECKPOINT_NAME)
+        if options["restart"] and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        files = find_files(root)
+        checkpoint = Checkpoint(checkpoint_path, options["batch_size"])
+        self.stdout.write(f"Found {len(files)} files under {root}; checkpointing to {checkpoint_path}")
+        try:
+            asyncio.run(self.ingest(root, files, checkpoint, options))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrupted; rerun the same command to resume"))
+        finally:
+            checkpoint.close()
+
+    async def ingest(self, root: str, files: List[Tuple[str, str]], checkpoint: Checkpoint, options: JsonDict) -> None:
+        # Imported here so worker processes, which import this module, never set up the views
+        from assessment import views
+
+        self.views = views
+        self.totals = {"done": 0, "skipped": 0, "failed": 0, "chunks": 0, "stored": 0}
+        self.started = time.monotonic()
+        self.file_count = len(files)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in files:
+            queue.put_nowait(item)
+
+        parse_pool = ProcessPoolExecutor(
+            max_workers=max(1, options["parse_workers"]), mp_context=multiprocessing.get_context("spawn")
+        )
+        reporter = asyncio.create_task(self.report_progress(options["report_interval"]))
+
+        async def worker() -> None:
+            while not queue.empty():
+                name, content_type = queue.get_nowait()
+                await self.ingest_file(root, name, content_type, checkpoint, parse_pool, options["batch_size"])
+
+        try:
+            await asyncio.gather(*[worker() for _ in range(max(1, options["concurrency"]))])
+        finally:
+            reporter.cancel()
+            parse_pool.shutdown(cancel_futures=True)
+            index = views.get_index()
+            if isinstance(index, LocalVectorStore):
+                # Checkpoint the HNSW graph rather than leave the server to re-insert the tail
+                index.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Finished: {self.status_line()}"))
+        if self.totals["failed"]:
+            self.stdout.write(self.style.WARNING("Failed files are retried on the next run"))
+
+    async def ingest_file(
+        self,
+        root: str,
+        name: str,
+        content_type: str,
+        checkpoint: Checkpoint,
+        parse_pool: ProcessPoolExecutor,
+        batch_size: int,
+    ) -> None:
+        path = os.path.join(root, name)
+        loop = asyncio.get_running_loop()
+        try:
+            stat = os.stat(path)
+            version = (stat.st_size, stat.st_mtime_ns)
+            progress = checkpoint.progress(name, version)
+            if progress["done"]:
+                self.totals["skipped"] += 1
+                return
+
+            reader = None
+            if content_type in TABULAR_CONTENT_TYPES:
+                # Rows are streamed, one batch at a time, on a thread of their own
+                reader = ThreadPoolExecutor(max_workers=1)
+                rows = _batches(TabularRowGroupLoader(path, content_type).lazy_load(), batch_size)
+                next_batch = partial(next, rows, None)
+            else:
+                chunks = await loop.run_in_executor(
+                    parse_pool, parse_and_split, path, content_type, self.views.CHUNK_SIZE, self.views.CHUNK_OVERLAP
+                )
+                pending = iter([chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)])
+                next_batch = partial(next, pending, None)
+
+            # Ids depend only on the file, batch and chunk position, so a batch redone after a crash
+            # overwrites its vectors
+            prefix = "bulk_" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+            try:
+                batch_number = 0
+                while True:
+                    batch = await loop.run_in_executor(reader, next_batch) if reader else next_batch()
+                    if batch is None:
+                        break
+                    if batch_number not in progress["batches"]:
+                        written: JsonDict = {}
+                        try:
+                            stats = await self.views.process_documents(
+                                batch,
+                                id_prefix=f"{prefix}_{batch_number}",
+                                written=written,
+                                dedup_ignore=progress["stale_dedup"],
+                            )
+                        except BaseException:
+                            if written.get("ids"):
+                                checkpoint.batch_failed(name, version, written)
+                            raise
+                        checkpoint.batch_done(name, version, batch_number, stats, written)
+                        self.totals["chunks"] += stats["chunks"]
+                        self.totals["stored"] += stats["stored"]
+                    batch_number += 1
+            finally:
+                if reader:
+                    reader.shutdown()
+
+            if progress["stale_ids"] - progress["ids"]:
+                await self.delete_stale_chunks(progress)
+            checkpoint.file_done(name, version)
+            self.totals["done"] += 1
+        except Exception as e:
+            self.totals["failed"] += 1
+            self.stderr.write(f"Error ingesting {name}: {e}")
+
+    async def delete_stale_chunks(self, progress: JsonDict) -> None:
+        """Delete ids earlier versions of the file wrote that the current version did not overwrite"""
+        ids = sorted(progress["stale_ids"] - progress["ids"])
+        index = self.views.get_index()
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            delete = partial(index.delete, ids=ids[start:start + DELETE_BATCH_SIZE], namespace=self.views.NAMESPACE)
+            await loop.run_in_executor(None, delete)
+
+    def status_line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        totals = self.totals
+        finished = totals["done"] + totals["failed"]
+        processed = finished + totals["skipped"]
+        files_per_second = finished / elapsed if elapsed else 0.0
+        remaining = self.file_count - processed
+        eta = f", ~{remaining / files_per_second:.0f}s left" if files_per_second and remaining else ""
+        return (
+            f"{processed}/{self.file_count} files ({totals['skipped']} already done, {totals['failed']} failed), "
+            f"{totals['chunks']} chunks ({totals['stored']} stored after dedup) in {elapsed:.0f}s | "
+            f"{files_per_second:.2f} files/s, {totals['chunks'] / elapsed if elapsed else 0.0:.1f} chunks/s{eta}"
+        )
+
+    async def report_progress(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.stdout.write(self.status_line())
@@ -0,0 +1,185 @@
+# backend/assessment/metrics.py
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# (metric name, sorted label items)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_lock = threading.Lock()
+_counters: Dict[MetricKey, float] = defaultdict(float)
+_gauges: Dict[MetricKey, float] = defaultdict(float)
+# Per series: cumulative-ready bucket counts (last one is +Inf), sum, count
+_histograms: Dict[MetricKey, List[Any]] = {}
+_buckets: Dict[str, Tuple[float, ...]] = {}
+
+# Seconds; covers a cache hit through a slow multi-shard generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _key(name: str, labels: Dict[str, str]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def incr(name: str, value: float = 1.0, **labels: str) -> None:
+    """Increase a counter; counters only ever go up"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def gauge_add(name: str, value: float, **labels: str) -> None:
+    """Move a gauge up or down, e.g. +1/-1 around an in-flight section"""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] += value
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: str) -> None:
+    """Record a value in a histogram; a name keeps the buckets it was first observed with"""
+    key = _key(name, labels)
+    with _lock:
+        bounds = _buckets.setdefault(name, tuple(buckets))
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [[0] * (len(bounds) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(bounds, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+
+@contextmanager
+def span(stage: str, **labels: str) -> Iterator[None]:
+    """Time a block, awaits included, into the stage_duration_seconds histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_duration_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+
+class _ClosingIterator:
+    """Iterate a streamed body and run a callback once, when it is exhausted or closed.
+
+    A generator would not do: closing one that was never started skips its finally block.
+    """
+
+    def __init__(self, chunks: Iterable[Any], callback: Callable[[], None]) -> None:
+        self._chunks = iter(chunks)
+        self._callback: Any = callback
+
+    def __iter__(self) -> "_ClosingIterator":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        callback, self._callback = self._callback, None
+        if callback is not None:
+            callback()
+
+
+def after_response(response: Any, callback: Callable[[], None]) -> Any:
+    """Call callback once the response is done: now, or for a streaming response when its body is closed"""
+    if not getattr(response, "streaming", False):
+        callback()
+        return response
+    # Django closes the body when the server is finished with the response, even if the client left early
+    response.streaming_content = _ClosingIterator(response.streaming_content, callback)
+    return response
+
+
+def timed_view(view: str) -> Callable:
+    """Observe a view method's latency, through the end of a streamed body, and count its responses by status code"""
+
+    def decorator(view_func: Callable) -> Callable:
+        @wraps(view_func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            code = "500"
+
+            def record() -> None:
+                observe("http_request_duration_seconds", time.perf_counter() - started, view=view)
+                incr("http_requests_total", view=view, status=code)
+
+            try:
+                response = view_func(*args, **kwargs)
+            except BaseException:
+                record()
+                raise
+            code = str(response.status_code)
+            return after_response(response, record)
+
+        return wrapper
+
+    return decorator
+
+
+def get(name: str, **labels: str) -> float:
+    key = _key(name, labels)
+    with _lock:
+        return _counters.get(key, _gauges.get(key, 0.0))
+
+
+def snapshot() -> Dict[str, float]:
+    """Return every counter and gauge keyed by its Prometheus-style series name"""
+    with _lock:
+        return {_format_key(key): value for key, value in [*_counters.items(), *_gauges.items()]}
+
+
+def histogram(name: str, **labels: str) -> Tuple[List[int], float, int]:
+    """Return (per-bucket counts with +Inf last, sum, count) of one histogram series"""
+    with _lock:
+        series = _histograms.get(_key(name, labels))
+        return (list(series[0]), series[1], series[2]) if series else ([], 0.0, 0)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, (list(series[0]), series[1], series[2])) for key, series in _histograms.items())
+        buckets = dict(_buckets)
+
+    lines = []
+    typed = set()
+    for kind, series in (("counter", counters), ("gauge", gauges)):
+        for key, value in series:
+            if key[0] not in typed:
+                typed.add(key[0])
+                lines.append(f"# TYPE {key[0]} {kind}")
+            lines.append(f"{_format_key(key)} {_format_value(value)}")
+    for (name, labels), (counts, total, count) in histograms:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip([*buckets[name], float("inf")], counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            lines.append(f"{_format_key((name + '_bucket', (*labels, ('le', le))))} {cumulative}")
+        lines.append(f"{_format_key((name + '_sum', labels))} {_format_value(total)}")
+        lines.append(f"{_format_key((name + '_count', labels))} {count}")
+    return "\n".join(lines) + "\n"
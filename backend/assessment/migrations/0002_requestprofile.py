@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assessment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("view", models.CharField(max_length=20)),
+                ("trigger", models.CharField(max_length=10)),
+                ("method", models.CharField(max_length=10)),
+                ("path", models.CharField(max_length=200)),
+                ("status_code", models.IntegerField()),
+                ("wall_seconds", models.FloatField()),
+                ("cpu_seconds", models.FloatField()),
+                ("samples", models.IntegerField()),
+                ("metadata", models.JSONField(default=dict)),
+                ("wall_stacks", models.TextField()),
+                ("cpu_stacks", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -39,4 +39,24 @@ class UploadedFile(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.file.name
\ No newline at end of file
+        return self.file.name
+
+
+class RequestProfile(models.Model):
+    """Sampled wall-clock and CPU stacks of one profiled request, in folded flame graph format"""
+
+    view = models.CharField(max_length=20)
+    trigger = models.CharField(max_length=10)  # "header" or "sample"
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=200)
+    status_code = models.IntegerField()
+    wall_seconds = models.FloatField()
+    cpu_seconds = models.FloatField()
+    samples = models.IntegerField()
+    metadata = models.JSONField(default=dict)
+    wall_stacks = models.TextField()
+    cpu_stacks = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Profile of {self.view} ({self.wall_seconds:.3f}s)"
@@ -0,0 +1,55 @@
+# backend/assessment/pregen.py
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+
+JsonDict = Dict[str, Any]
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+class QuestionPool:
+    """Pre-generated questions per (topic, assessment type), consumed by /generate/.
+
+    Pools are replaced wholesale when the same topic is ingested again and
+    expire after ``ttl`` seconds so they never outlive the material they were
+    generated from by much.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pools: Dict[Tuple[str, str], Tuple[float, List[JsonDict]]] = {}
+
+    def put(self, topic: str, assessment_type: str, questions: List[JsonDict]) -> None:
+        with self._lock:
+            self._pools[(normalize_topic(topic), assessment_type)] = (time.monotonic(), list(questions))
+
+    def take(self, topic: str, assessment_type: str, count: int) -> Optional[List[JsonDict]]:
+        """Remove and return count questions, or None if the pool cannot cover the request"""
+        key = (normalize_topic(topic), assessment_type)
+        with self._lock:
+            entry = self._pools.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._pools[key]
+                entry = None
+            if entry is None or len(entry[1]) < count:
+                metrics.incr("pregenerated_pool_misses_total", assessment_type=assessment_type)
+                return None
+            questions, remaining = entry[1][:count], entry[1][count:]
+            if remaining:
+                self._pools[key] = (entry[0], remaining)
+            else:
+                del self._pools[key]
+        metrics.incr("pregenerated_pool_hits_total", assessment_type=assessment_type)
+        return questions
+
+    def size(self, topic: str, assessment_type: str) -> int:
+        with self._lock:
+            entry = self._pools.get((normalize_topic(topic), assessment_type))
+            return len(entry[1]) if entry else 0
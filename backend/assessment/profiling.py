@@ -0,0 +1,274 @@
+# backend/assessment/profiling.py
+
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from asgiref.sync import sync_to_async as _sync_to_async
+from django.conf import settings
+from django.http import HttpRequest
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+JsonDict = Dict[str, Any]
+
+PROFILE_HEADER = "X-Profile-Token"
+# Where an idle event loop blocks; samples ending here are time spent awaiting
+_WAIT_FRAMES = {("selectors.py", "select")}
+_AWAITING = "(awaiting)"
+# Root of the stacks sampled on worker threads running a profiled request's sync_to_async calls
+_WORKER = "(worker)"
+
+# Sampler of the request being profiled; sync_to_async copies it into the worker thread
+_active_sampler: ContextVar[Optional["StackSampler"]] = ContextVar("active_sampler", default=None)
+
+
+def _cpu_clock(thread_id: int) -> Optional[Callable[[], float]]:
+    """CPU time of another thread, where the platform exposes per-thread clocks"""
+    try:
+        clock_id = time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+    return lambda: time.clock_gettime(clock_id)
+
+
+def _fold(frame: Any) -> str:
+    """One stack, outermost frame first, in the folded format flame graph tools read"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    leaf = names[-1].split(":", 1) if names else None
+    if leaf and tuple(leaf) in _WAIT_FRAMES:
+        names.append(_AWAITING)
+    return ";".join(names)
+
+
+class StackSampler:
+    """Sample one thread's stack every ``interval`` seconds into wall and CPU profiles.
+
+    Each sample is charged the wall and CPU time elapsed since the previous
+    one. Time the event loop spends waiting on awaited work (I/O, or calls
+    handed to worker threads by sync_to_async) shows up in the wall profile
+    under an ``(awaiting)`` leaf and costs no CPU. Threads inside ``watch``
+    are sampled too, under a ``(worker)`` root, so the work the loop was
+    awaiting appears as well; their wall time overlaps the ``(awaiting)``
+    time, and their CPU time is totalled in ``worker_cpu``.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.worker_cpu = 0.0
+        # thread id -> CPU clock and the wall and CPU time it was last charged up to
+        self._watched: Dict[int, JsonDict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @contextmanager
+    def watch(self) -> Iterator[None]:
+        """Sample the calling thread as well while in the block"""
+        thread_id = threading.get_ident()
+        if thread_id == self.thread_id or thread_id in self._watched:
+            yield
+            return
+        clock = _cpu_clock(thread_id)
+        started_cpu = time.thread_time()
+        with self._lock:
+            self._watched[thread_id] = {
+                "clock": clock, "wall": time.perf_counter(), "cpu": clock() if clock else 0.0
+            }
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._watched[thread_id]
+                self.worker_cpu += time.thread_time() - started_cpu
+
+    def _run(self) -> None:
+        cpu_clock = _cpu_clock(self.thread_id)
+        last_wall = time.perf_counter()
+        last_cpu = cpu_clock() if cpu_clock else 0.0
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            cpu = cpu_clock() if cpu_clock else 0.0
+            if self.thread_id not in frames:
+                break
+            stack = _fold(frames[self.thread_id])
+            self.wall[stack] += now - last_wall
+            self.cpu[stack] += cpu - last_cpu
+            self.samples += 1
+            last_wall, last_cpu = now, cpu
+            with self._lock:
+                for thread_id, state in self._watched.items():
+                    if thread_id not in frames:
+                        continue
+                    stack = f"{_WORKER};{_fold(frames[thread_id])}"
+                    worker_cpu = state["clock"]() if state["clock"] else 0.0
+                    self.wall[stack] += now - state["wall"]
+                    self.cpu[stack] += worker_cpu - state["cpu"]
+                    state["wall"], state["cpu"] = now, worker_cpu
+            del frames
+
+    @staticmethod
+    def folded(profile: Dict[str, float]) -> str:
+        """Stacks with their time in microseconds, heaviest first"""
+        lines = [
+            f"{stack} {round(seconds * 1e6)}"
+            for stack, seconds in sorted(profile.items(), key=lambda item: -item[1])
+            if seconds > 0
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def sync_to_async(func: Callable, *, thread_sensitive: bool = True) -> Callable:
+    """asgiref's sync_to_async, with the worker thread sampled while it runs a profiled request's call"""
+
+    @wraps(func)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        sampler = _active_sampler.get()
+        if sampler is None:
+            return func(*args, **kwargs)
+        with sampler.watch():
+            return func(*args, **kwargs)
+
+    return _sync_to_async(call, thread_sensitive=thread_sensitive)
+
+
+def authorized(request: HttpRequest) -> bool:
+    token = settings.PROFILING_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get(PROFILE_HEADER, ""), token)
+
+
+def _trigger(request: HttpRequest) -> Optional[str]:
+    if authorized(request):
+        return "header"
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def _request_metadata(request: Any) -> JsonDict:
+    metadata = {
+        "query": request.GET.dict(),
+        "content_type": request.content_type,
+        "content_length": int(request.META.get("CONTENT_LENGTH") or 0),
+        "user_agent": request.headers.get("User-Agent", ""),
+    }
+    try:
+        # Already parsed by the view, so this reads no body
+        data = request.data
+        metadata["topic"] = str(data.get("topic") or "")[:200]
+        for field in ("assessmentType", "questionCount", "assessment_id", "student_id"):
+            if data.get(field) is not None:
+                metadata[field] = str(data.get(field))
+        if isinstance(data.get("answers"), list):
+            metadata["answers"] = len(data["answers"])
+        if request.FILES:
+            metadata["files"] = [
+                {"name": file.name, "size": file.size, "content_type": file.content_type}
+                for file in request.FILES.getlist("documents")
+            ]
+    except Exception:
+        pass
+    return metadata
+
+
+def save_profile(
+    view: str,
+    trigger: str,
+    request: Any,
+    response: Any,
+    sampler: StackSampler,
+    wall: float,
+    cpu: float,
+) -> Optional[int]:
+    """Store a profile and prune beyond PROFILING_MAX_STORED; returns its id"""
+    from .models import RequestProfile
+
+    try:
+        profile = RequestProfile.objects.create(
+            view=view,
+            trigger=trigger,
+            method=request.method,
+            path=request.path[:200],
+            status_code=getattr(response, "status_code", 500),
+            wall_seconds=wall,
+            cpu_seconds=cpu,
+            samples=sampler.samples,
+            metadata=_request_metadata(request),
+            wall_stacks=sampler.folded(sampler.wall),
+            cpu_stacks=sampler.folded(sampler.cpu),
+        )
+        stale = RequestProfile.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)[
+            settings.PROFILING_MAX_STORED:
+        ]
+        RequestProfile.objects.filter(pk__in=list(stale)).delete()
+        return profile.pk
+    except Exception as e:
+        logger.error(f"Error saving request profile for {view}: {e}")
+        return None
+
+
+def profiled(view: str) -> Callable:
+    """Profile a view method when asked to by header or sampling; other requests pass straight through.
+
+    Apply it directly outside ``async_view`` so the whole event loop of the
+    request runs on the sampled thread; calls the view hands to threads with
+    this module's ``sync_to_async`` are sampled on those threads. The stored
+    profile's id is returned in the X-Profile-Id response header.
+    """
+
+    def decorator(view_func: Callable) -> Callable:
+        @wraps(view_func)
+        def wrapper(view_self: Any, request: Any, *args: Any, **kwargs: Any) -> Any:
+            trigger = _trigger(request)
+            if trigger is None:
+                return view_func(view_self, request, *args, **kwargs)
+
+            sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            sampler.start()
+            token = _active_sampler.set(sampler)
+            response = None
+            try:
+                response = view_func(view_self, request, *args, **kwargs)
+                return response
+            finally:
+                _active_sampler.reset(token)
+                sampler.stop()
+                wall = time.perf_counter() - started
+                cpu = time.thread_time() - started_cpu + sampler.worker_cpu
+                metrics.incr("request_profiles_total", view=view, trigger=trigger)
+                profile_id = save_profile(view, trigger, request, response, sampler, wall, cpu)
+                if profile_id is not None and response is not None:
+                    response["X-Profile-Id"] = str(profile_id)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,75 @@
+# backend/assessment/scripts/bench_hnsw.py
+#
+# Build time, query latency and recall@k of the HNSW index against an exact scan.
+# Run from backend/:  python -m assessment.scripts.bench_hnsw [--vectors N] [--M 16] [--ef 16 32 64 128]
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from assessment.scripts.bench_vectorstore import clustered_vectors
+from assessment.vectorstore import LocalVectorStore, recall_at_k, search_rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build time, query latency and recall@k of the HNSW index against an exact scan"
+    )
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--batch", type=int, default=100, help="vectors per upsert, as during ingestion")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(10, args.vectors // 250), args.dimension), dtype=np.float32)
+    queries = clustered_vectors(rng, args.queries, args.dimension, centers)
+    hnsw_params = {"M": args.M, "ef_construction": args.ef_construction}
+
+    directory = tempfile.mkdtemp(prefix="bench_hnsw_")
+    try:
+        store = LocalVectorStore(directory, args.dimension, quantization="none", index="hnsw", hnsw_params=hnsw_params)
+        started = time.perf_counter()
+        for start in range(0, args.vectors, args.batch):
+            batch = clustered_vectors(rng, min(args.batch, args.vectors - start), args.dimension, centers)
+            store.upsert(
+                [{"id": f"v{start + i}", "values": vector} for i, vector in enumerate(batch)],
+                namespace="bench",
+            )
+        store.close()
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reloaded = LocalVectorStore(directory, args.dimension, quantization="none", index="hnsw", hnsw_params=hnsw_params)
+        namespace = reloaded.namespace("bench")
+        reload = time.perf_counter() - started
+
+        print(f"{args.vectors:,} x {args.dimension} vectors, M={args.M}, ef_construction={args.ef_construction}, top_k={args.top_k}")
+        print(f"build {build:.1f}s ({build / args.vectors * 1000:.2f} ms/vector), reload {reload * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        for query in queries:
+            search_rows(namespace, query, args.top_k, 1, exact=True)
+        exact = (time.perf_counter() - started) / len(queries)
+        print(f"{'search':<8}{'ef':>6}{'ms/query':>10}{'speedup':>9}{'recall@k':>10}")
+        print(f"{'exact':<8}{'-':>6}{exact * 1000:>10.2f}{'1.0x':>9}{1.0:>10.3f}")
+        for ef in args.ef:
+            started = time.perf_counter()
+            for query in queries:
+                reloaded.query(query, args.top_k, namespace="bench", ef=ef)
+            elapsed = (time.perf_counter() - started) / len(queries)
+            recall = recall_at_k(reloaded, "bench", queries, args.top_k, ef=ef)
+            print(f"{'hnsw':<8}{ef:>6}{elapsed * 1000:>10.2f}{exact / elapsed:>8.1f}x{recall:>10.3f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
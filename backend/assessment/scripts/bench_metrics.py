@@ -0,0 +1,69 @@
+# backend/assessment/scripts/bench_metrics.py
+#
+# Per-request cost of the instrumentation: spans, counters and rendering /metrics.
+# Run from backend/:  python -m assessment.scripts.bench_metrics [--iterations N] [--threads T]
+
+import argparse
+import threading
+import time
+
+from assessment import metrics
+
+# Roughly what one generate request records: its spans, LLM and embedding counters, request histogram
+SPANS_PER_REQUEST = 6
+COUNTERS_PER_REQUEST = 6
+
+
+def one_request() -> None:
+    for stage in ("pool_lookup", "embed", "cache_lookup", "retrieve", "llm", "parse")[:SPANS_PER_REQUEST]:
+        with metrics.span(stage, operation="bench"):
+            pass
+    for _ in range(COUNTERS_PER_REQUEST):
+        metrics.incr("bench_calls_total", stage="bench")
+    metrics.observe("bench_request_duration_seconds", 0.2, view="bench")
+
+
+def per_call_us(iterations: int, func) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Per-request cost of the instrumentation: spans, counters and rendering /metrics"
+    )
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8, help="threads recording at once, as under load")
+    args = parser.parse_args()
+
+    def span() -> None:
+        with metrics.span("bench", operation="bench"):
+            pass
+
+    print(f"incr           {per_call_us(args.iterations, lambda: metrics.incr('bench_total', stage='x')):7.2f} us")
+    print(f"observe        {per_call_us(args.iterations, lambda: metrics.observe('bench_seconds', 0.1)):7.2f} us")
+    print(f"span           {per_call_us(args.iterations, span):7.2f} us")
+    single = per_call_us(args.iterations // 10, one_request)
+    print(f"request        {single:7.2f} us  ({SPANS_PER_REQUEST} spans, {COUNTERS_PER_REQUEST + 1} other records)")
+
+    timings = []
+
+    def worker() -> None:
+        timings.append(per_call_us(args.iterations // 10, one_request))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"request x{args.threads:<4} {max(timings):7.2f} us  worst thread, lock contended")
+
+    started = time.perf_counter()
+    size = len(metrics.render())
+    print(f"render         {(time.perf_counter() - started) * 1e3:7.2f} ms  ({size:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
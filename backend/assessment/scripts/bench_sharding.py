@@ -0,0 +1,69 @@
+# backend/assessment/scripts/bench_sharding.py
+#
+# Query latency of flat local-store scans split across worker processes, against the
+# single-process scan. Run from backend/:
+#   python -m assessment.scripts.bench_sharding [--vectors 5000000] [--workers 1 2 4 8] [--quantization int8]
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from assessment.scripts.bench_vectorstore import clustered_vectors
+from assessment.vectorstore import QUANTIZATION_MODES, LocalVectorStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Query latency of flat local-store scans split across worker processes"
+    )
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--quantization", choices=QUANTIZATION_MODES, default="int8")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--directory", help="reuse a store built by an earlier run instead of a temporary one")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(10, args.vectors // 250), args.dimension), dtype=np.float32)
+    queries = clustered_vectors(rng, args.queries, args.dimension, centers)
+
+    directory = args.directory or tempfile.mkdtemp(prefix="bench_sharding_")
+    try:
+        store = LocalVectorStore(directory, args.dimension, quantization=args.quantization)
+        existing = store.namespace("bench").count
+        for start in range(existing, args.vectors, 50_000):
+            batch = clustered_vectors(rng, min(50_000, args.vectors - start), args.dimension, centers)
+            store.upsert([{"id": f"v{start + i}", "values": vector} for i, vector in enumerate(batch)], namespace="bench")
+
+        def latency(target: LocalVectorStore) -> float:
+            target.query(queries[0], args.top_k, namespace="bench")  # start workers, warm the page cache
+            started = time.perf_counter()
+            for query in queries:
+                target.query(query, args.top_k, namespace="bench")
+            return (time.perf_counter() - started) / len(queries)
+
+        baseline = latency(store)
+        print(f"{args.vectors:,} x {args.dimension} vectors, quantization={args.quantization}, top_k={args.top_k}, {os.cpu_count()} cpus")
+        print(f"{'workers':<9}{'ms/query':>10}{'speedup':>9}")
+        print(f"{'in-proc':<9}{baseline * 1000:>10.1f}{'1.0x':>9}")
+        for workers in args.workers:
+            sharded = LocalVectorStore(
+                directory, args.dimension, quantization=args.quantization, workers=workers, shard_min_rows=0
+            )
+            elapsed = latency(sharded)
+            if sharded.shards is not None:
+                sharded.shards.close()
+            print(f"{workers:<9}{elapsed * 1000:>10.1f}{baseline / elapsed:>8.1f}x")
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# backend/assessment/scripts/bench_splitter.py
+#
+# Compare LinearTextSplitter against langchain's RecursiveCharacterTextSplitter.
+# Run from backend/:  python -m assessment.scripts.bench_splitter [--chars N] [--repeat R]
+
+import argparse
+import random
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from assessment.splitter import LinearTextSplitter
+
+WORDS = (
+    "the cell membrane regulates transport of ions and molecules while the "
+    "mitochondria produce energy through oxidative phosphorylation during respiration"
+).split()
+
+
+def build_corpus(chars: int, seed: int = 0) -> str:
+    """Build a book-like text with paragraphs, line breaks and the odd unbroken run"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < chars:
+        sentence_count = rng.randint(2, 12)
+        paragraph = []
+        for _ in range(sentence_count):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+            paragraph.append(sentence.capitalize() + ".")
+        text = (" " if rng.random() < 0.8 else "\n").join(paragraph)
+        if rng.random() < 0.02:
+            text += " " + "=" * rng.randint(1000, 3000)
+        parts.append(text)
+        size += len(text) + 2
+    return "\n\n".join(parts)
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare LinearTextSplitter against langchain's RecursiveCharacterTextSplitter"
+    )
+    parser.add_argument("--chars", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    text = build_corpus(args.chars)
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    linear = LinearTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    expected = recursive.split_text(text)
+    if linear.split_text(text) != expected:
+        raise SystemExit("LinearTextSplitter output differs from RecursiveCharacterTextSplitter")
+    parts = [text[i:i + 65536] for i in range(0, len(text), 65536)]
+    if [chunk for _, _, chunk in linear.split_stream(parts)] != expected:
+        raise SystemExit("LinearTextSplitter.split_stream output differs from RecursiveCharacterTextSplitter")
+
+    baseline = best_of(args.repeat, lambda: recursive.split_text(text))
+    spans = best_of(args.repeat, lambda: linear.split_spans(text))
+    texts = best_of(args.repeat, lambda: linear.split_text(text))
+    stream = best_of(args.repeat, lambda: sum(1 for _ in linear.split_stream(parts)))
+
+    print(f"corpus: {len(text):,} chars -> {len(expected):,} chunks (identical output)")
+    print(f"RecursiveCharacterTextSplitter.split_text  {baseline * 1000:9.1f} ms")
+    for label, elapsed in (
+        ("LinearTextSplitter.split_spans", spans),
+        ("LinearTextSplitter.split_text", texts),
+        ("LinearTextSplitter.split_stream", stream),
+    ):
+        print(f"{label:<42} {elapsed * 1000:9.1f} ms  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# backend/assessment/scripts/bench_vectorstore.py
+#
+# Memory, latency and recall@k of the local vector store for each quantization mode.
+# Run from backend/:  python -m assessment.scripts.bench_vectorstore [--vectors N] [--oversample 2 4 8]
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from assessment.vectorstore import QUANTIZATION_MODES, LocalVectorStore, recall_at_k
+
+
+def clustered_vectors(rng: np.random.Generator, count: int, dimension: int, centers: np.ndarray) -> np.ndarray:
+    """Embedding-like data: points scattered around topic centres"""
+    labels = rng.integers(0, len(centers), count)
+    return centers[labels] + 0.6 * rng.standard_normal((count, dimension), dtype=np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Memory, latency and recall@k of the local vector store for each quantization mode"
+    )
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 8, 16])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(10, args.vectors // 250), args.dimension), dtype=np.float32)
+    queries = clustered_vectors(rng, args.queries, args.dimension, centers)
+
+    directory = tempfile.mkdtemp(prefix="bench_vectorstore_")
+    try:
+        stores = {
+            mode: LocalVectorStore(f"{directory}/{mode}", args.dimension, quantization=mode)
+            for mode in QUANTIZATION_MODES
+        }
+        for start in range(0, args.vectors, 10_000):
+            batch = clustered_vectors(rng, min(10_000, args.vectors - start), args.dimension, centers)
+            records = [
+                {"id": f"v{start + i}", "values": vector, "metadata": {}}
+                for i, vector in enumerate(batch)
+            ]
+            for store in stores.values():
+                store.upsert(records, namespace="bench")
+
+        full_bytes = args.vectors * args.dimension * 4
+        print(f"{args.vectors:,} x {args.dimension} vectors, float32 = {full_bytes / 1e6:,.0f} MB, top_k={args.top_k}")
+        print(f"{'mode':<8}{'oversample':>11}{'in-memory MB':>14}{'reduction':>11}{'ms/query':>10}{'recall@k':>10}")
+        for mode, store in stores.items():
+            memory = store.memory_bytes("bench")
+            reduction = f"{full_bytes / memory:.0f}x" if memory else "mmap"
+            for oversample in args.oversample if mode != "none" else [1]:
+                started = time.perf_counter()
+                for query in queries:
+                    store.query(query, args.top_k, namespace="bench", oversample=oversample)
+                elapsed = (time.perf_counter() - started) / len(queries)
+                recall = recall_at_k(store, "bench", queries, args.top_k, oversample)
+                print(f"{mode:<8}{oversample:>11}{memory / 1e6:>14.1f}{reduction:>11}{elapsed * 1000:>10.2f}{recall:>10.3f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
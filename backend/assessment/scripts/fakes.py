@@ -0,0 +1,160 @@
+# backend/assessment/scripts/fakes.py
+#
+# Offline stand-ins for google.generativeai, used by loadtest.py and assessment/tests.py. Latency and failures are
+# simulated with blocking sleeps, since the real client is called through sync_to_async.
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+JsonDict = Dict[str, Any]
+
+_TOKEN_RE = re.compile(r"\w+")
+_GENERATE_RE = re.compile(r"Generate (\d+) (.+?) questions about (.+?) in JSON format")
+WORDS = (
+    "cell energy membrane protein enzyme reaction light carbon oxygen water structure function "
+    "process system cycle layer signal transport gradient molecule pathway"
+).split()
+
+
+class FakeUpstreamError(Exception):
+    pass
+
+
+class LatencyModel:
+    """Log-normal latency around a median, plus a probability of failing the call.
+
+    ``fail_first`` makes the first that many calls fail regardless, for tests
+    of retry paths.
+    """
+
+    def __init__(
+        self, median_ms: float, sigma: float = 0.5, failure_rate: float = 0.0, seed: int = 0, fail_first: int = 0
+    ) -> None:
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self.median * self._rng.lognormvariate(0, self.sigma) if self.median else 0.0
+            failed = self._rng.random() < self.failure_rate or self.calls < self.fail_first
+            self.calls += 1
+        time.sleep(delay)
+        if failed:
+            raise FakeUpstreamError("Simulated upstream failure")
+
+
+def hashed_embedding(text: str, dimension: int) -> List[float]:
+    """Bag-of-words feature hashing: texts sharing words get similar vectors"""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        digest = zlib.crc32(token.encode("utf-8"))
+        vector[digest % dimension] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if not norm:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+class _Usage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int) -> None:
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class _Response:
+    def __init__(self, text: str, prompt: str = "") -> None:
+        self.text = text
+        # Roughly four characters per token, like Gemini on English text
+        self.usage_metadata = _Usage(len(prompt) // 4, len(text) // 4)
+
+
+class FakeGenerativeModel:
+    def __init__(self, genai: "FakeGenAI", model_name: str) -> None:
+        self.genai = genai
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str) -> _Response:
+        self.genai.llm_latency.wait()
+        with self.genai.lock:
+            self.genai.llm_calls += 1
+            rng = random.Random(self.genai.rng.random())
+        if "answer's correctness" in prompt:
+            score = round(rng.random(), 2)
+            if "Return only the number" in prompt:
+                return _Response(str(score), prompt)
+            return _Response(json.dumps({"score": score, "explanation": "Simulated evaluation", "key_matches": []}), prompt)
+
+        match = _GENERATE_RE.search(prompt)
+        count, kind, topic = (int(match.group(1)), match.group(2), match.group(3)) if match else (1, "short answer", "the topic")
+        questions = []
+        for _ in range(count):
+            words = " ".join(rng.choice(WORDS) for _ in range(8))
+            question = {"text": f"Explain how {words} relates to {topic}?", "correct_answer": f"The {words}"}
+            if "multiple choice" in kind:
+                options = [f"Option {rng.choice(WORDS)} {i}" for i in range(4)]
+                question.update(options=options, correct_answer=options[0])
+            elif "true/false" in kind:
+                question["correct_answer"] = rng.choice(["True", "False"])
+            elif "fill-in-the-blank" in kind:
+                question["text"] = f"In {topic}, the {words} is part of the _____."
+            questions.append(question)
+        return _Response("```json\n" + json.dumps(questions) + "\n```", prompt)
+
+
+class FakeGenAI:
+    """Drop-in for the parts of google.generativeai used by assessment.views"""
+
+    def __init__(self, dimension: int, embed_latency: LatencyModel, llm_latency: LatencyModel, seed: int = 0) -> None:
+        self.dimension = dimension
+        self.embed_latency = embed_latency
+        self.llm_latency = llm_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.embed_calls = 0
+        self.llm_calls = 0
+
+    def configure(self, **kwargs: Any) -> None:
+        pass
+
+    def embed_content(self, model: str, content: Union[str, List[str]], task_type: str = "", title: str = "") -> JsonDict:
+        self.embed_latency.wait()
+        with self.lock:
+            self.embed_calls += 1
+        if isinstance(content, list):
+            return {"embedding": [hashed_embedding(text, self.dimension) for text in content]}
+        return {"embedding": hashed_embedding(content, self.dimension)}
+
+    def GenerativeModel(self, model_name: str) -> FakeGenerativeModel:
+        return FakeGenerativeModel(self, model_name)
+
+
+class SlowIndex:
+    """Wraps the local vector store with network-like latency, standing in for a Pinecone index"""
+
+    def __init__(self, store: Any, latency: LatencyModel) -> None:
+        self.store = store
+        self.latency = latency
+
+    def upsert(self, *args: Any, **kwargs: Any) -> JsonDict:
+        self.latency.wait()
+        return self.store.upsert(*args, **kwargs)
+
+    def query(self, *args: Any, **kwargs: Any) -> JsonDict:
+        self.latency.wait()
+        return self.store.query(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
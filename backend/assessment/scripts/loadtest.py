@@ -0,0 +1,297 @@
+# backend/assessment/scripts/loadtest.py
+#
+# Offline end-to-end load test of the generate, score and upload endpoints. Gemini is replaced by
+# fakes with configurable latency and failure rates, and the vector index by the local store
+# behind a latency wrapper, so runs need no API keys and are comparable between commits.
+# Run from backend/:  python -m assessment.scripts.loadtest [--concurrency 1 8 32] [--output run.json]
+#                     [--baseline previous.json]
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from assessment.scripts.fakes import WORDS, FakeGenAI, LatencyModel, SlowIndex
+
+JsonDict = Dict[str, Any]
+
+ENDPOINTS = ("generate", "score", "upload")
+TOPICS = [
+    "photosynthesis", "cell division", "protein synthesis", "plate tectonics", "the water cycle",
+    "supply and demand", "the french revolution", "newton's laws of motion", "chemical bonding",
+    "the immune system", "electric circuits", "climate change", "the roman empire", "genetics",
+]
+ASSESSMENT_TYPES = ("mcq", "true_false", "fill_in_blank", "short_answer", "long_answer")
+
+
+def setup_django(workdir: str, args: argparse.Namespace) -> Any:
+    """Configure Django against a throwaway database and store, then install the fakes"""
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "assessment_system.settings")
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = os.path.join(workdir, "db.sqlite3")
+    settings.MEDIA_ROOT = os.path.join(workdir, "media")
+    settings.LOCAL_VECTOR_DIR = os.path.join(workdir, "vector_store")
+    settings.CHUNK_DEDUP_DIR = os.path.join(workdir, "dedup_index")
+    settings.ALLOWED_HOSTS = ["testserver"]
+    settings.PREGENERATION_ENABLED = False
+    settings.SEMANTIC_CACHE_ENABLED = args.semantic_cache
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+    from assessment import views
+
+    sigma = args.latency_sigma
+    views.genai = FakeGenAI(
+        views.VECTOR_DIMENSION,
+        embed_latency=LatencyModel(args.embed_latency_ms, sigma, args.embed_failure_rate, seed=1),
+        llm_latency=LatencyModel(args.llm_latency_ms, sigma, args.llm_failure_rate, seed=2),
+        seed=args.seed,
+    )
+    views.local_vector_store = SlowIndex(
+        views.local_vector_store, LatencyModel(args.vector_latency_ms, sigma, seed=3)
+    )
+    return views
+
+
+def csv_upload(rng: random.Random, topic: str, rows: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["term", "notes"])
+    for _ in range(rows):
+        writer.writerow([rng.choice(WORDS), f"{topic}: " + " ".join(rng.choice(WORDS) for _ in range(20))])
+    return buffer.getvalue().encode("utf-8")
+
+
+def make_request(client: Any, endpoint: str, rng: random.Random, args: argparse.Namespace) -> int:
+    topic = rng.choice(TOPICS)
+    if endpoint == "generate":
+        payload = {
+            "topic": topic,
+            "assessmentType": rng.choice(ASSESSMENT_TYPES),
+            "questionCount": args.questions,
+        }
+        return client.post("/api/assessment/generate/", payload, content_type="application/json").status_code
+    if endpoint == "score":
+        answers = [
+            {
+                "type": "short_answer",
+                "text": f"Describe {rng.choice(TOPICS)} question {i}?",
+                "correct_answer": f"The key idea of {topic}",
+                "user_answer": f"I think it is about {rng.choice(TOPICS)}",
+            }
+            for i in range(args.answers)
+        ]
+        payload = {"topic": topic, "answers": answers, "assessment_id": "loadtest"}
+        return client.post(
+            "/api/assessment/score-short-answers/", payload, content_type="application/json"
+        ).status_code
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    document = SimpleUploadedFile(f"{topic}.csv", csv_upload(rng, topic, args.upload_rows), content_type="text/csv")
+    return client.post("/api/assessment/upload-document/", {"topic": topic, "documents": [document]}).status_code
+
+
+def percentiles(latencies: List[float]) -> JsonDict:
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "mean": round(float(values.mean()), 2),
+        "max": round(float(values.max()), 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_load(concurrency: int, mix: List[Tuple[str, float]], args: argparse.Namespace) -> JsonDict:
+    from django.test import Client
+
+    rng = random.Random(args.seed + concurrency)
+    plan = rng.choices([name for name, _ in mix], weights=[weight for _, weight in mix], k=args.requests)
+    local = threading.local()
+    lock = threading.Lock()
+    samples: Dict[str, List[Tuple[float, int]]] = {name: [] for name, _ in mix}
+
+    def worker(position: int) -> None:
+        if not hasattr(local, "client"):
+            local.client = Client()
+        endpoint = plan[position]
+        request_rng = random.Random(args.seed * 1_000_003 + position)
+        started = time.perf_counter()
+        try:
+            code = make_request(local.client, endpoint, request_rng, args)
+        except Exception as e:
+            print(f"{endpoint} request failed: {e}", file=sys.stderr)
+            code = 0
+        with lock:
+            samples[endpoint].append((time.perf_counter() - started, code))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(len(plan))))
+    duration = time.perf_counter() - started
+
+    endpoints = {}
+    for endpoint, results in samples.items():
+        ok = [elapsed for elapsed, code in results if 200 <= code < 300]
+        endpoints[endpoint] = {
+            "requests": len(results),
+            "ok": len(ok),
+            "shed": sum(1 for _, code in results if code == 503),
+            "errors": sum(1 for _, code in results if not 200 <= code < 300 and code != 503),
+            "throughput_rps": round(len(ok) / duration, 2),
+            "latency_ms": percentiles(ok),
+        }
+    completed = [elapsed for results in samples.values() for elapsed, code in results if 200 <= code < 300]
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(completed) / duration, 2),
+        "latency_ms": percentiles(completed),
+        "endpoints": endpoints,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(report: JsonDict, baseline: JsonDict, tolerance: float) -> List[str]:
+    """Regressions against a baseline report: slower p95, lower throughput or more memory"""
+    regressions = []
+    previous_runs = {run["concurrency"]: run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        previous = previous_runs.get(run["concurrency"])
+        if previous is None:
+            continue
+        for endpoint, current in run["endpoints"].items():
+            before = previous["endpoints"].get(endpoint)
+            if not before or not before["latency_ms"] or not current["latency_ms"]:
+                continue
+            label = f"c={run['concurrency']} {endpoint}"
+            if current["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + tolerance):
+                regressions.append(
+                    f"{label}: p95 {before['latency_ms']['p95']} -> {current['latency_ms']['p95']} ms"
+                )
+            if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{label}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s"
+                )
+    if report["peak_rss_mb"] > baseline.get("peak_rss_mb", float("inf")) * (1 + tolerance):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']} -> {report['peak_rss_mb']} MB")
+    return regressions
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}, expected one of {ENDPOINTS}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end load test of the generate, score and upload endpoints"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("generate=3,score=6,upload=1"))
+    parser.add_argument("--questions", type=int, default=5, help="questionCount per generate request")
+    parser.add_argument("--answers", type=int, default=5, help="answers per score request")
+    parser.add_argument("--upload-rows", type=int, default=200, help="CSV rows per uploaded document")
+    parser.add_argument("--warmup-uploads", type=int, default=len(TOPICS))
+    parser.add_argument("--embed-latency-ms", type=float, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--vector-latency-ms", type=float, default=15)
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of fake latencies")
+    parser.add_argument("--embed-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.01)
+    parser.add_argument("--semantic-cache", action="store_true", help="serve repeated topics from the cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest.json")
+    parser.add_argument("--baseline", help="report from an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative change vs the baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="loadtest_") as workdir:
+        views = setup_django(workdir, args)
+        from django.test import Client
+
+        client = Client()
+        rng = random.Random(args.seed)
+        for _ in range(args.warmup_uploads):
+            make_request(client, "upload", rng, args)
+
+        runs = []
+        for concurrency in args.concurrency:
+            run = run_load(concurrency, args.mix, args)
+            runs.append(run)
+            latency = run["latency_ms"]
+            print(
+                f"concurrency {concurrency:>3}: {run['throughput_rps']:>7.2f} req/s  "
+                f"p50 {latency.get('p50', 0):>8.1f}  p95 {latency.get('p95', 0):>8.1f}  "
+                f"p99 {latency.get('p99', 0):>8.1f} ms  peak RSS {run['peak_rss_mb']} MB"
+            )
+            for endpoint, stats in run["endpoints"].items():
+                print(
+                    f"    {endpoint:<9}{stats['requests']:>5} req  {stats['errors']:>4} errors  "
+                    f"{stats['shed']:>4} shed  p95 {stats['latency_ms'].get('p95', 0):>8.1f} ms"
+                )
+
+        # Write queued scoring results before the temporary database goes away
+        from results.writebehind import result_buffer
+
+        result_buffer.flush()
+        report = {
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "runs": runs,
+            "peak_rss_mb": peak_rss_mb(),
+            "fake_calls": {"embed": views.genai.embed_calls, "llm": views.genai.llm_calls},
+        }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != json.loads(json.dumps(report["config"])):
+            print("Warning: the baseline was run with a different configuration")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
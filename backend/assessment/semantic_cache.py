@@ -0,0 +1,169 @@
+# backend/assessment/semantic_cache.py
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import metrics
+
+JsonDict = Dict[str, Any]
+
+# Chunk embeddings kept from recent ingestions, to check generations that were in flight meanwhile
+RECENT_INGESTED_ROWS = 4096
+
+
+def _normalize(vectors: Any) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class _Scope:
+    """Cached generations for one (namespace, assessment type), with their topic embeddings"""
+
+    def __init__(self) -> None:
+        self.entries: List[JsonDict] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.stack([entry["embedding"] for entry in self.entries]) if self.entries else None
+        return self._matrix
+
+    def nearest(self, embedding: np.ndarray) -> Optional[int]:
+        if not self.entries:
+            return None
+        return int(np.argmax(self.matrix() @ embedding))
+
+    def append(self, entry: JsonDict) -> None:
+        self.entries.append(entry)
+        self._matrix = None
+
+    def remove(self, positions: Sequence[int]) -> None:
+        drop = set(positions)
+        self.entries = [entry for i, entry in enumerate(self.entries) if i not in drop]
+        self._matrix = None
+
+
+class SemanticCache:
+    """Generated questions keyed by topic embedding rather than topic text.
+
+    A request is served from the cache when its topic embedding is within
+    ``threshold`` cosine similarity of a cached topic in the same scope and
+    the cached generation has enough questions. Entries expire after ``ttl``
+    seconds and are dropped by ``invalidate_near`` when newly ingested chunks
+    are similar to their topic, since generating again would see new context.
+    A generation that was running during an ingestion is only refused if the
+    ingested chunks are similar to its topic, so a steady ingest elsewhere
+    does not keep the cache from filling.
+    """
+
+    def __init__(self, threshold: float, ttl: float, max_entries: int, stale_similarity: float) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_similarity = stale_similarity
+        # Bumped by every invalidation; ``store`` checks the chunks ingested since a generation started
+        self.generation = 0
+        self._recent: Deque[Tuple[int, np.ndarray]] = deque()
+        self._recent_rows = 0
+        self._forgotten = 0  # last generation no longer in ``_recent``
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, _Scope] = {}
+
+    def lookup(self, embedding: Sequence[float], scope: str, count: int) -> Optional[List[JsonDict]]:
+        """Cached questions for the nearest topic in scope, or None"""
+        query = _normalize(embedding)
+        with self._lock:
+            data = self._scopes.get(scope)
+            position = data.nearest(query) if data else None
+            if position is None:
+                return self._miss(scope, "no_match")
+            entry = data.entries[position]
+            if time.monotonic() - entry["created"] > self.ttl:
+                data.remove([position])
+                metrics.gauge_add("semantic_cache_entries", -1)
+                return self._miss(scope, "expired")
+            if float(entry["embedding"] @ query) < self.threshold:
+                return self._miss(scope, "no_match")
+            if len(entry["questions"]) < count:
+                return self._miss(scope, "too_few_questions")
+            entry["last_hit"] = time.monotonic()
+            questions = entry["questions"][:count]
+            self.hits += 1
+        metrics.incr("semantic_cache_hits_total", scope=scope)
+        return questions
+
+    def _miss(self, scope: str, reason: str) -> None:
+        self.misses += 1
+        metrics.incr("semantic_cache_misses_total", scope=scope, reason=reason)
+        return None
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def store(
+        self, topic: str, embedding: Sequence[float], scope: str, questions: List[JsonDict], generation: int
+    ) -> None:
+        """Cache a generation; ``generation`` is the value read before generating started"""
+        if not questions:
+            return
+        vector = _normalize(embedding)
+        now = time.monotonic()
+        entry = {"topic": topic, "embedding": vector, "questions": list(questions), "created": now, "last_hit": now}
+        with self._lock:
+            if self._ingested_near(vector, generation):
+                # Related material was ingested while generating; the questions may already be stale
+                return
+            data = self._scopes.setdefault(scope, _Scope())
+            position = data.nearest(vector)
+            if position is not None and float(data.entries[position]["embedding"] @ vector) >= self.threshold:
+                # Replaces the entry that could not serve this request
+                data.remove([position])
+                metrics.gauge_add("semantic_cache_entries", -1)
+            elif len(data.entries) >= self.max_entries:
+                coldest = min(range(len(data.entries)), key=lambda i: data.entries[i]["last_hit"])
+                data.remove([coldest])
+                metrics.gauge_add("semantic_cache_entries", -1)
+            data.append(entry)
+        metrics.gauge_add("semantic_cache_entries", 1)
+
+    def _ingested_near(self, vector: np.ndarray, generation: int) -> bool:
+        """Whether chunks ingested after ``generation`` are similar to a topic; assumed so once forgotten"""
+        if generation < self._forgotten:
+            return True
+        return any(
+            float((chunks @ vector).max()) >= self.stale_similarity
+            for number, chunks in self._recent
+            if number > generation
+        )
+
+    def invalidate_near(self, embeddings: Sequence[Sequence[float]]) -> int:
+        """Drop cached topics similar to any newly ingested chunk; returns how many were dropped"""
+        if not len(embeddings):
+            return 0
+        chunks = _normalize(embeddings)
+        dropped = 0
+        with self._lock:
+            self.generation += 1
+            self._recent.append((self.generation, chunks))
+            self._recent_rows += len(chunks)
+            while self._recent_rows > RECENT_INGESTED_ROWS and len(self._recent) > 1:
+                self._forgotten, forgotten = self._recent.popleft()
+                self._recent_rows -= len(forgotten)
+            for data in self._scopes.values():
+                if not data.entries:
+                    continue
+                closest = (chunks @ data.matrix().T).max(axis=0)
+                stale = np.flatnonzero(closest >= self.stale_similarity).tolist()
+                data.remove(stale)
+                dropped += len(stale)
+        if dropped:
+            metrics.gauge_add("semantic_cache_entries", -dropped)
+            metrics.incr("semantic_cache_invalidations_total", dropped)
+        return dropped
@@ -0,0 +1,259 @@
+# backend/assessment/sharding.py
+
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .deadlines import stage_time_left
+
+logger = logging.getLogger(__name__)
+
+# Keep BLAS single-threaded inside workers: parallelism comes from the shards
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+JsonDict = Dict[str, Any]
+
+
+class _MappedNamespace:
+    """A worker's read-only view of one namespace directory, remapped as it grows"""
+
+    def __init__(self, directory: str, dimension: int, quantization: str) -> None:
+        self.directory = directory
+        self.dimension = dimension
+        self.quantization = quantization
+        self.count = 0
+        self.tombstones_size = -1
+        self.full: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.deleted = np.zeros(0, dtype=np.bool_)
+
+    def _map(self, name: str, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        return np.memmap(os.path.join(self.directory, name), dtype=dtype, mode="r", shape=shape)
+
+    def refresh(self, count: int, tombstones_size: int) -> None:
+        if count != self.count:
+            self.full = self._map("vectors.f32", np.float32, (count, self.dimension))
+            if self.quantization == "int8":
+                self.codes = self._map("codes.int8", np.int8, (count, self.dimension))
+                self.scales = self._map("scales.f32", np.float32, (count,))
+            elif self.quantization == "binary":
+                self.codes = self._map("codes.binary", np.uint8, (count, (self.dimension + 7) // 8))
+            self.count = count
+            self.tombstones_size = -1
+        if tombstones_size != self.tombstones_size:
+            # Superseded rows are tombstoned too, so this file alone defines the deleted set
+            deleted = np.zeros(count, dtype=np.bool_)
+            if tombstones_size:
+                tombstones = np.fromfile(
+                    os.path.join(self.directory, "tombstones.i64"), dtype=np.int64, count=tombstones_size // 8
+                )
+                deleted[tombstones[tombstones < count]] = True
+            self.deleted = deleted
+            self.tombstones_size = tombstones_size
+
+
+def _worker_main(connection: Connection) -> None:
+    """Serve scan requests for one row range at a time until told to stop; replies carry the request id"""
+    from .vectorstore import scan_range
+
+    mapped: Dict[str, _MappedNamespace] = {}
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            namespace = mapped.get(request["directory"])
+            if namespace is None:
+                namespace = mapped[request["directory"]] = _MappedNamespace(
+                    request["directory"], request["dimension"], request["quantization"]
+                )
+            namespace.refresh(request["count"], request["tombstones_size"])
+            rows, scores = scan_range(
+                request["query"],
+                namespace.quantization,
+                namespace.codes,
+                namespace.scales,
+                namespace.full,
+                namespace.deleted,
+                request["start"],
+                request["stop"],
+                request["top_k"],
+                request["oversample"],
+            )
+            connection.send((request["id"], "ok", rows, scores))
+        except Exception as e:
+            connection.send((request["id"], "error", repr(e), None))
+
+
+class ShardPool:
+    """Scatter flat scans over worker processes and merge their top-k.
+
+    Workers map the namespace files read-only, so all of them share the same
+    page-cache copy of the vectors and codes. Shards are contiguous row
+    ranges recomputed from the row count on every query: rows appended by
+    an ingest are spread evenly over the workers on the next search, and
+    each worker keeps roughly the same range (and warm pages) as it grows.
+    Namespaces below ``min_rows`` are scanned in-process, where the IPC
+    round trip would cost more than the scan.
+
+    Concurrent queries share the workers: requests are tagged with an id and
+    a reader thread per worker hands each reply to the query waiting for it,
+    so a worker starts on the next query's shard while slower shards of the
+    previous one are still running.
+
+    Inside a with_deadline stage, a search waits for its shards only until
+    the stage's deadline; a worker that has not replied by then is taken to
+    be hung, and the pool is restarted on the next query.
+    """
+
+    def __init__(self, workers: int, min_rows: int = 50_000) -> None:
+        self.workers = workers
+        self.min_rows = min_rows
+        self._connections: List[Connection] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._send_locks: Dict[Connection, threading.Lock] = {}
+        self._live: Set[Connection] = set()
+        # request id -> (worker connection, future for its reply)
+        self._pending: Dict[int, Tuple[Connection, Future]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()  # guards the above
+
+    def _start(self) -> None:
+        # Spawned rather than forked: the parent is a threaded server
+        context = multiprocessing.get_context("spawn")
+        previous = {name: os.environ.get(name) for name in _THREAD_ENV_VARS}
+        os.environ.update({name: "1" for name in _THREAD_ENV_VARS})
+        try:
+            for number in range(self.workers):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_worker_main, args=(child,), name=f"vector-shard-{number}", daemon=True
+                )
+                process.start()
+                child.close()
+                self._connections.append(parent)
+                self._processes.append(process)
+                self._send_locks[parent] = threading.Lock()
+                self._live.add(parent)
+                threading.Thread(
+                    target=self._read_replies, args=(parent,), name=f"vector-shard-{number}-replies", daemon=True
+                ).start()
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def _read_replies(self, connection: Connection) -> None:
+        """Resolve the future of every reply from one worker; fail the rest once it is gone"""
+        while True:
+            try:
+                request_id, *reply = connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                _, future = self._pending.pop(request_id, (None, None))
+            if future is not None:
+                future.set_result(reply)
+        with self._lock:
+            self._live.discard(connection)
+            lost = [request_id for request_id, (owner, _) in self._pending.items() if owner is connection]
+            futures = [self._pending.pop(request_id)[1] for request_id in lost]
+        for future in futures:
+            future.set_exception(EOFError("vector shard worker exited"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+    def _stop(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        # Closed after the workers exit, so each reader thread sees EOF and fails what is still pending
+        for connection in self._connections:
+            connection.close()
+        self._connections, self._processes = [], []
+        self._send_locks, self._live = {}, set()
+
+    def search(
+        self, namespace: Any, query: np.ndarray, top_k: int, oversample: int, count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact-rescored top-k (rows, scores) over rows [0, count) of a vectorstore._Namespace"""
+        tombstones_path = os.path.join(namespace.directory, "tombstones.i64")
+        request = {
+            "directory": namespace.directory,
+            "dimension": namespace.dimension,
+            "quantization": namespace.quantization,
+            "count": count,
+            "tombstones_size": os.path.getsize(tombstones_path) if os.path.exists(tombstones_path) else 0,
+            "query": np.asarray(query, dtype=np.float32),
+            "top_k": top_k,
+            "oversample": oversample,
+        }
+        bounds = np.linspace(0, count, self.workers + 1).astype(int)
+        time_left = stage_time_left()
+        deadline = None if time_left is None else time.monotonic() + time_left
+
+        with self._lock:
+            if not self._processes:
+                self._start()
+            shards = []
+            for connection, start, stop in zip(self._connections, bounds[:-1], bounds[1:]):
+                if stop <= start:
+                    # Fewer rows than workers
+                    continue
+                request_id = next(self._ids)
+                future: Future = Future()
+                if connection in self._live:
+                    self._pending[request_id] = (connection, future)
+                else:
+                    future.set_exception(EOFError("vector shard worker exited"))
+                shards.append((connection, self._send_locks[connection], request_id, future, int(start), int(stop)))
+
+        try:
+            for connection, send_lock, request_id, future, start, stop in shards:
+                if not future.done():
+                    with send_lock:
+                        connection.send({**request, "id": request_id, "start": start, "stop": stop})
+            replies = [
+                future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                for _, _, _, future, _, _ in shards
+            ]
+        except (EOFError, BrokenPipeError, OSError, FutureTimeoutError) as e:
+            with self._lock:
+                for _, _, request_id, _, _, _ in shards:
+                    self._pending.pop(request_id, None)
+                if any(shard[0] in self._connections for shard in shards):
+                    # Restart the whole pool on the next query, unless another query already has
+                    logger.error(f"Vector shard worker failed, restarting pool: {e!r}")
+                    self._stop()
+            raise RuntimeError("Vector shard worker failed") from e
+
+        errors = [reply[1] for reply in replies if reply[0] == "error"]
+        if errors:
+            raise RuntimeError(f"Vector shard search failed: {errors[0]}")
+        rows = np.concatenate([reply[1] for reply in replies])
+        scores = np.concatenate([reply[2] for reply in replies])
+        # Shard scores are exact cosines, so the merged top-k is the best of the shard top-ks
+        order = np.argsort(-scores)[:top_k]
+        return rows[order], scores[order]
@@ -0,0 +1,76 @@
+# backend/assessment/singleflight.py
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The request running a shared call was cancelled before the call finished"""
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls onto one upstream call.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait on the same result instead of starting their
+    own. Each Django request runs its own event loop (see ``async_view``), so
+    the shared result is a thread-safe concurrent future that every waiter
+    wraps in its own loop. A cancelled waiter never cancels the shared call;
+    if the leader itself is cancelled, waiters retry and one of them leads.
+    """
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, concurrent.futures.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            with self._lock:
+                future = self._flights.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._flights[key] = future
+
+            if leader:
+                return await self._lead(key, future, call)
+
+            metrics.incr("singleflight_coalesced_total", stage=self.stage)
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue
+
+    async def _lead(self, key: Hashable, future: concurrent.futures.Future, call: Callable[[], Awaitable[T]]) -> T:
+        metrics.incr("singleflight_calls_total", stage=self.stage)
+        metrics.gauge_add("singleflight_in_flight", 1, stage=self.stage)
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._finish(key, future, exception=_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._finish(key, future, exception=e)
+            raise
+        else:
+            self._finish(key, future, result=result)
+            return result
+        finally:
+            metrics.gauge_add("singleflight_in_flight", -1, stage=self.stage)
+
+    def _finish(self, key: Hashable, future: concurrent.futures.Future, result: Any = None, exception: BaseException = None) -> None:
+        # Forget the flight before publishing, so later callers start a fresh call
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -0,0 +1,262 @@
+# backend/assessment/splitter.py
+
+import copy
+from collections import deque
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# (start, end) offsets into the text being split
+Span = Tuple[int, int]
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def _strip_span(text: str, start: int, end: int) -> Optional[Span]:
+    """Offset equivalent of str.strip(); returns None for an all-whitespace span"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def _iter_pieces(text: str, start: int, end: int, separator: str) -> Iterator[Span]:
+    """Yield the pieces of text[start:end], each starting with its separator"""
+    if not separator:
+        for i in range(start, end):
+            yield (i, i + 1)
+        return
+
+    piece_start = start
+    match = text.find(separator, start, end)
+    while match != -1:
+        if match > piece_start:
+            yield (piece_start, match)
+        piece_start = match
+        match = text.find(separator, match + len(separator), end)
+    if end > piece_start:
+        yield (piece_start, end)
+
+
+class _SpanMerger:
+    """Incremental form of langchain's TextSplitter._merge_splits over adjacent spans.
+
+    Pieces are fed one at a time; a merged (unstripped) span is returned each
+    time the window has to be flushed, and the window then slides back to at
+    most ``chunk_overlap`` characters, exactly as the list-based version does.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int) -> None:
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.window: Deque[Span] = deque()
+        self.total = 0
+
+    def push(self, start: int, end: int) -> Optional[Span]:
+        length = end - start
+        merged = None
+        if self.total + length > self.chunk_size and self.window:
+            merged = (self.window[0][0], self.window[-1][1])
+            while self.total > self.chunk_overlap or (
+                self.total + length > self.chunk_size and self.total > 0
+            ):
+                first_start, first_end = self.window.popleft()
+                self.total -= first_end - first_start
+        self.window.append((start, end))
+        self.total += length
+        return merged
+
+    def finish(self) -> Optional[Span]:
+        merged = (self.window[0][0], self.window[-1][1]) if self.window else None
+        self.window.clear()
+        self.total = 0
+        return merged
+
+    @property
+    def window_start(self) -> Optional[int]:
+        return self.window[0][0] if self.window else None
+
+
+class LinearTextSplitter:
+    """Drop-in replacement for RecursiveCharacterTextSplitter's default mode.
+
+    Produces the same chunks as ``RecursiveCharacterTextSplitter(chunk_size,
+    chunk_overlap)`` (separators ["\\n\\n", "\\n", " ", ""], separator kept at
+    the start of each piece, whitespace stripped) but works on offsets: pieces
+    are found with str.find instead of regex splits and string concatenation,
+    merging is a sliding window over spans, and only oversized pieces are
+    rescanned with the next separator. Text is copied once per emitted chunk.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: Optional[Sequence[str]] = None,
+    ) -> None:
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators or DEFAULT_SEPARATORS)
+
+    def split_spans(self, text: str) -> List[Span]:
+        """Return chunk boundaries as (start, end) offsets into text"""
+        spans: List[Span] = []
+        self._split_range(text, 0, len(text), self.separators, spans)
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_documents(self, documents: Iterable[Any]) -> List[Document]:
+        chunks = []
+        for document in documents:
+            text = document.page_content
+            for start, end in self.split_spans(text):
+                chunks.append(
+                    Document(page_content=text[start:end], metadata=copy.deepcopy(document.metadata))
+                )
+        return chunks
+
+    def split_stream(self, parts: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+        """Split text arriving in pieces, yielding (start, end, text) chunks as they close.
+
+        Chunks are identical to ``split_spans("".join(parts))``. Once the first
+        top-level separator has been seen, only the current paragraph plus the
+        overlap window is kept in memory; text with no top-level separator at
+        all has to be buffered whole, as its split depends on every character.
+        """
+        separator = self.separators[0]
+        parts = iter(parts)
+        buffer = ""
+        found = False
+        for part in parts:
+            search_from = max(0, len(buffer) - len(separator) + 1)
+            buffer += part
+            if separator and buffer.find(separator, search_from) != -1:
+                found = True
+                break
+
+        if not found:
+            for start, end in self.split_spans(buffer):
+                yield (start, end, buffer[start:end])
+            return
+
+        remaining = self.separators[1:]
+        merger = _SpanMerger(self.chunk_size, self.chunk_overlap)
+        base = 0  # offset of buffer[0] in the whole stream
+        piece_start = 0
+        search_from = scan_from = 0
+        exhausted = False
+
+        while True:
+            match = buffer.find(separator, scan_from - base)
+            if match == -1 and not exhausted:
+                # Only the tail that could start a separator needs rescanning
+                scan_from = max(search_from, base + len(buffer) - len(separator) + 1)
+                part = next(parts, None)
+                if part is None:
+                    exhausted = True
+                else:
+                    buffer += part
+                continue
+
+            piece_end = base + match if match != -1 else base + len(buffer)
+            if piece_end > piece_start:
+                for start, end in self._handle_piece(buffer, base, piece_start, piece_end, remaining, merger):
+                    yield (start, end, buffer[start - base:end - base])
+            if match == -1:
+                break
+            piece_start = piece_end
+            search_from = scan_from = piece_end + len(separator)
+
+            # Drop text that no pending piece or overlap window can reach
+            keep_from = merger.window_start
+            keep_from = piece_start if keep_from is None else min(keep_from, piece_start)
+            if keep_from - base > len(buffer) // 2:
+                buffer = buffer[keep_from - base:]
+                base = keep_from
+
+        tail: List[Span] = []
+        self._emit(buffer, merger.finish(), tail, base)
+        for start, end in tail:
+            yield (start, end, buffer[start - base:end - base])
+
+    def _handle_piece(
+        self,
+        buffer: str,
+        base: int,
+        start: int,
+        end: int,
+        remaining: List[str],
+        merger: _SpanMerger,
+    ) -> List[Span]:
+        """Route one top-level piece of a stream through the merger or the recursive split"""
+        spans: List[Span] = []
+        if end - start < self.chunk_size:
+            self._emit(buffer, merger.push(start, end), spans, base)
+            return spans
+
+        self._emit(buffer, merger.finish(), spans, base)
+        if not remaining:
+            spans.append((start, end))
+            return spans
+        nested: List[Span] = []
+        self._split_range(buffer, start - base, end - base, remaining, nested)
+        spans.extend((s + base, e + base) for s, e in nested)
+        return spans
+
+    def _split_range(
+        self, text: str, start: int, end: int, separators: List[str], spans: List[Span]
+    ) -> None:
+        separator = separators[-1]
+        remaining: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+
+        if not separator and self.chunk_size > 1:
+            self._split_characters(text, start, end, spans)
+            return
+
+        merger = _SpanMerger(self.chunk_size, self.chunk_overlap)
+        for piece_start, piece_end in _iter_pieces(text, start, end, separator):
+            if piece_end - piece_start < self.chunk_size:
+                self._emit(text, merger.push(piece_start, piece_end), spans)
+                continue
+            self._emit(text, merger.finish(), spans)
+            if remaining:
+                self._split_range(text, piece_start, piece_end, remaining, spans)
+            else:
+                # Unsplittable pieces are passed through unstripped, as in langchain
+                spans.append((piece_start, piece_end))
+        self._emit(text, merger.finish(), spans)
+
+    def _split_characters(self, text: str, start: int, end: int, spans: List[Span]) -> None:
+        """Closed form of merging one-character pieces: a window sliding by a fixed step"""
+        step = self.chunk_size - min(self.chunk_overlap, self.chunk_size - 1)
+        position = start
+        while position < end:
+            chunk_end = min(position + self.chunk_size, end)
+            self._emit(text, (position, chunk_end), spans)
+            if chunk_end == end:
+                break
+            position += step
+
+    @staticmethod
+    def _emit(text: str, merged: Optional[Span], spans: List[Span], base: int = 0) -> None:
+        """Strip a merged span and record it; spans and text may be offset by base"""
+        if merged is None:
+            return
+        stripped = _strip_span(text, merged[0] - base, merged[1] - base)
+        if stripped is not None:
+            spans.append((stripped[0] + base, stripped[1] + base))
@@ -1,3 +1,1293 @@
-from django.test import TestCase
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import signal
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from . import background, metrics
+from .admission import AdmissionController, admission_controlled
+from .cohort import group_cohort_answers
+from . import deadlines, hnsw
+from .deadlines import DeadlineExceeded, hedged, latency_budget, with_deadline
+from .dedup import MERGE_MIN, MinHasher, MinHashLSH, find_near_duplicates
+from .hnsw import HNSWIndex
+from .loaders import CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE, TabularRowGroupLoader
+from .management.commands.ingest_documents import load_checkpoint
+from .pregen import QuestionPool
+from .profiling import StackSampler
+from .scripts.fakes import FakeGenAI, FakeUpstreamError, LatencyModel, SlowIndex
+from .semantic_cache import SemanticCache
+from .singleflight import SingleFlight
+from .splitter import LinearTextSplitter
+from .vectorstore import LocalVectorStore, recall_at_k
+
+
+def build_corpus(seed: int) -> str:
+    """Random text mixing paragraphs, line breaks, odd whitespace and unbroken runs"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(rng.randint(1, 40)):
+        if rng.random() < 0.05:
+            parts.append("x" * rng.randint(900, 2500))
+        words = [
+            "".join(rng.choice("abcdefg") for _ in range(rng.randint(1, 12)))
+            for _ in range(rng.randint(0, 400))
+        ]
+        parts.append("".join(word + rng.choice([" ", "  ", "\n", " \n", "\t"]) for word in words))
+        parts.append(rng.choice(["\n\n", "\n\n\n", "\n", "\n \n", ""]))
+    return "".join(parts)
+
+
+class LinearTextSplitterTests(SimpleTestCase):
+    SETTINGS = [(1000, 200), (100, 20), (50, 0), (300, 299)]
+
+    def test_matches_recursive_character_splitter(self):
+        for seed in range(200):
+            text = build_corpus(seed)
+            for chunk_size, chunk_overlap in self.SETTINGS:
+                expected = RecursiveCharacterTextSplitter(
+                    chunk_size=chunk_size, chunk_overlap=chunk_overlap
+                ).split_text(text)
+                splitter = LinearTextSplitter(chunk_size, chunk_overlap)
+                with self.subTest(seed=seed, chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+                    self.assertEqual(splitter.split_text(text), expected)
+
+    def test_stream_matches_whole_text(self):
+        for seed in range(100):
+            text = build_corpus(seed)
+            rng = random.Random(seed)
+            parts = []
+            position = 0
+            while position < len(text):
+                size = rng.randint(1, 300)
+                parts.append(text[position:position + size])
+                position += size
+            splitter = LinearTextSplitter(100, 20)
+            with self.subTest(seed=seed):
+                streamed = list(splitter.split_stream(parts))
+                self.assertEqual([chunk for _, _, chunk in streamed], splitter.split_text(text))
+                self.assertEqual([(start, end) for start, end, _ in streamed], splitter.split_spans(text))
+
+    def test_split_documents_keeps_metadata(self):
+        documents = RecursiveCharacterTextSplitter().create_documents(
+            [build_corpus(1), build_corpus(2)], metadatas=[{"source": "a"}, {"source": "b"}]
+        )
+        expected = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents(documents)
+        chunks = LinearTextSplitter(1000, 200).split_documents(documents)
+        self.assertEqual(
+            [(chunk.page_content, chunk.metadata) for chunk in chunks],
+            [(chunk.page_content, chunk.metadata) for chunk in expected],
+        )
+
+
+@override_settings(
+    STAGE_DEADLINES={"embed": 0.2, "generate": 5.0}, HEDGING_ENABLED=True, HEDGE_MIN_SAMPLES=3
+)
+class DeadlineTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(deadlines._trackers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tracker = deadlines.get_tracker("generate")
+        for _ in range(3):
+            self.tracker.record(0.02)
+
+    def attempts(self, *behaviours):
+        """A call whose successive attempts sleep and then return or raise as listed"""
+        started = []
+
+        async def call():
+            delay, outcome = behaviours[len(started)]
+            started.append(time.monotonic())
+            await asyncio.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return call, started
+
+    def test_slow_attempt_is_hedged_and_the_duplicate_wins(self):
+        call, started = self.attempts((1.0, "slow"), (0.01, "hedge"))
+        began = time.monotonic()
+        self.assertEqual(asyncio.run(hedged("generate", call)), "hedge")
+        self.assertEqual(len(started), 2)
+        self.assertAlmostEqual(started[1] - started[0], 0.02, delta=0.015)
+        self.assertLess(time.monotonic() - began, 0.5)
+
+    def test_failed_attempt_never_wins_over_one_still_running(self):
+        call, started = self.attempts((0.05, ValueError("upstream failed")), (0.1, "hedge"))
+        self.assertEqual(asyncio.run(hedged("generate", call)), "hedge")
+        # The failure's short latency is not recorded; only the successful call is
+        samples = sorted(self.tracker._samples)
+        self.assertEqual(len(samples), 4)
+        self.assertGreater(samples[-1], 0.1)
+
+    def test_fast_failure_raises_without_feeding_the_p95(self):
+        call, started = self.attempts((0.0, ValueError("upstream failed")))
+        with self.assertRaises(ValueError):
+            asyncio.run(hedged("generate", call))
+        self.assertEqual(len(started), 1)
+        self.assertEqual(len(self.tracker._samples), 3)
+
+    def test_stage_deadline_cancels_the_stage(self):
+        async def run():
+            with self.assertRaises(DeadlineExceeded):
+                await with_deadline("embed", asyncio.sleep(1))
+
+        began = time.monotonic()
+        asyncio.run(run())
+        self.assertAlmostEqual(time.monotonic() - began, 0.2, delta=0.1)
+
+    def test_exhausted_budget_fails_later_stages_immediately(self):
+        @latency_budget(0.05)
+        async def request():
+            with self.assertRaises(DeadlineExceeded):
+                # The request budget is shorter than the stage's own deadline
+                await with_deadline("generate", asyncio.sleep(1))
+            stage = asyncio.sleep(1)
+            began = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                await with_deadline("generate", stage)
+            return time.monotonic() - began
+
+        began = time.monotonic()
+        self.assertLess(asyncio.run(request()), 0.01)
+        self.assertLess(time.monotonic() - began, 0.2)
+        self.assertIsNone(deadlines.remaining_budget())
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight("test")
+        self.calls = 0
+
+    async def slow_call(self, result="value", delay=0.05, error=None):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    def test_concurrent_identical_keys_share_one_call(self):
+        async def run():
+            return await asyncio.gather(*[self.flight.do("key", self.slow_call) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), ["value"] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_requests_on_other_event_loops_share_the_call(self):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(asyncio.run(self.flight.do("key", lambda: self.slow_call(delay=0.2))))
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(self.calls, 1)
+
+    def test_leader_exception_reaches_every_waiter(self):
+        async def run():
+            call = lambda: self.slow_call(error=ValueError("upstream failed"))
+            return await asyncio.gather(*[self.flight.do("key", call) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual([type(result) for result in results], [ValueError] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_takes_over_when_the_leader_is_cancelled(self):
+        async def run():
+            leader = asyncio.create_task(self.flight.do("key", lambda: self.slow_call("leader")))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(self.flight.do("key", lambda: self.slow_call("waiter")))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        self.assertEqual(asyncio.run(run()), "waiter")
+        self.assertEqual(self.calls, 2)
+
+    def test_keys_are_released_after_completion(self):
+        async def run():
+            first = await self.flight.do("key", self.slow_call)
+            with self.assertRaises(ValueError):
+                await self.flight.do("other", lambda: self.slow_call(error=ValueError()))
+            second = await self.flight.do("key", lambda: self.slow_call("fresh"))
+            return first, second
+
+        self.assertEqual(asyncio.run(run()), ("value", "fresh"))
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.flight._flights, {})
+
+
+class QuestionPoolTests(SimpleTestCase):
+    questions = [{"text": f"Question {i}?"} for i in range(5)]
+
+    def test_take_removes_questions_until_the_pool_cannot_cover_a_request(self):
+        pool = QuestionPool(ttl=60)
+        pool.put("Cells", "mcq", self.questions)
+        self.assertEqual(pool.take("Cells", "mcq", 2), self.questions[:2])
+        self.assertIsNone(pool.take("Cells", "mcq", 4))
+        self.assertEqual(pool.size("Cells", "mcq"), 3)
+        self.assertIsNone(pool.take("Cells", "true_false", 1))
+        self.assertEqual(pool.take("Cells", "mcq", 3), self.questions[2:])
+        self.assertEqual(pool.size("Cells", "mcq"), 0)
+
+    def test_topics_match_ignoring_case_and_spacing(self):
+        pool = QuestionPool(ttl=60)
+        pool.put("  Cell   Biology", "mcq", self.questions)
+        self.assertEqual(pool.take("cell biology", "mcq", 1), self.questions[:1])
+        # A new ingestion of the topic replaces the pool
+        pool.put("CELL BIOLOGY", "mcq", self.questions[:2])
+        self.assertEqual(pool.size("Cell Biology", "mcq"), 2)
+
+    def test_pools_expire_after_the_ttl(self):
+        pool = QuestionPool(ttl=60)
+        with mock.patch("assessment.pregen.time.monotonic", return_value=1000.0):
+            pool.put("Cells", "mcq", self.questions)
+        with mock.patch("assessment.pregen.time.monotonic", return_value=1059.0):
+            self.assertEqual(pool.take("Cells", "mcq", 1), self.questions[:1])
+        with mock.patch("assessment.pregen.time.monotonic", return_value=1061.0):
+            self.assertIsNone(pool.take("Cells", "mcq", 1))
+        self.assertEqual(pool.size("Cells", "mcq"), 0)
+
+
+class SemanticCacheTests(SimpleTestCase):
+    questions = [{"text": f"Question {i}?"} for i in range(5)]
+
+    def setUp(self):
+        self.cache = SemanticCache(0.9, ttl=60, max_entries=10, stale_similarity=0.5)
+        self.topic = np.array([1.0, 0.0, 0.0, 0.0])
+
+    def test_serves_topics_within_the_threshold_in_the_same_scope(self):
+        self.cache.store("cells", self.topic, "docs:mcq", self.questions, self.cache.generation)
+        # cos = 0.95 and 0.85
+        near, far = np.array([0.95, 0.3122, 0.0, 0.0]), np.array([0.85, 0.5268, 0.0, 0.0])
+        self.assertEqual(self.cache.lookup(near, "docs:mcq", 3), self.questions[:3])
+        self.assertIsNone(self.cache.lookup(far, "docs:mcq", 3))
+        self.assertIsNone(self.cache.lookup(self.topic, "docs:true_false", 3))
+        self.assertIsNone(self.cache.lookup(self.topic, "docs:mcq", 6))
+
+    def test_entries_expire_after_the_ttl(self):
+        with mock.patch("assessment.semantic_cache.time.monotonic", return_value=1000.0):
+            self.cache.store("cells", self.topic, "docs:mcq", self.questions, self.cache.generation)
+        with mock.patch("assessment.semantic_cache.time.monotonic", return_value=1059.0):
+            self.assertIsNotNone(self.cache.lookup(self.topic, "docs:mcq", 1))
+        with mock.patch("assessment.semantic_cache.time.monotonic", return_value=1061.0):
+            self.assertIsNone(self.cache.lookup(self.topic, "docs:mcq", 1))
+        self.assertEqual(self.cache._scopes["docs:mcq"].entries, [])
+
+    def test_ingestion_drops_only_nearby_topics(self):
+        other = np.array([0.0, 1.0, 0.0, 0.0])
+        self.cache.store("cells", self.topic, "docs:mcq", self.questions, self.cache.generation)
+        self.cache.store("tides", other, "docs:mcq", self.questions, self.cache.generation)
+        self.assertEqual(self.cache.invalidate_near([[0.8, 0.0, 0.6, 0.0]]), 1)
+        self.assertIsNone(self.cache.lookup(self.topic, "docs:mcq", 1))
+        self.assertIsNotNone(self.cache.lookup(other, "docs:mcq", 1))
+
+    def test_generation_in_flight_is_cached_unless_related_material_arrived(self):
+        started = self.cache.generation
+        self.cache.invalidate_near([[0.0, 0.0, 1.0, 0.0]])
+        self.cache.store("cells", self.topic, "docs:mcq", self.questions, started)
+        self.assertIsNotNone(self.cache.lookup(self.topic, "docs:mcq", 1))
+
+        started = self.cache.generation
+        self.cache.invalidate_near([[0.0, 0.0, 1.0, 0.0]])
+        self.cache.invalidate_near([[0.8, 0.0, 0.6, 0.0]])
+        self.cache.store("cells", self.topic, "docs:true_false", self.questions, started)
+        self.assertIsNone(self.cache.lookup(self.topic, "docs:true_false", 1))
+
+    def test_generation_older_than_the_remembered_ingestions_is_not_cached(self):
+        started = self.cache.generation
+        with mock.patch("assessment.semantic_cache.RECENT_INGESTED_ROWS", 2):
+            for _ in range(3):
+                self.cache.invalidate_near([[0.0, 0.0, 1.0, 0.0]])
+        self.cache.store("cells", self.topic, "docs:mcq", self.questions, started)
+        self.assertIsNone(self.cache.lookup(self.topic, "docs:mcq", 1))
+
+
+class TabularRowGroupLoaderTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_csv(self, rows):
+        path = os.path.join(self.directory, "data.csv")
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+        return path
+
+    def test_csv_groups_repeat_the_header_within_the_size_limit(self):
+        rows = [["term", "definition"]] + [[f"term {i}", "word " * 10] for i in range(100)]
+        documents = TabularRowGroupLoader(self.write_csv(rows), CSV_CONTENT_TYPE, chunk_size=300).load()
+        self.assertGreater(len(documents), 1)
+        for document in documents:
+            self.assertTrue(document.page_content.startswith("term | definition\n"))
+            self.assertLessEqual(len(document.page_content), 300)
+        self.assertEqual(documents[0].metadata["start_row"], 2)
+        self.assertEqual(documents[-1].metadata["end_row"], 101)
+        body = [line for document in documents for line in document.page_content.split("\n")[1:]]
+        self.assertEqual(len(body), 100)
+
+    def test_csv_row_wider_than_a_chunk_is_split_with_the_header(self):
+        wide = [f"cell {i} " + "text " * 20 for i in range(20)]
+        rows = [["col"] * 20, ["short"], wide, ["after"]]
+        documents = TabularRowGroupLoader(self.write_csv(rows), CSV_CONTENT_TYPE, chunk_size=300).load()
+        pieces = [document for document in documents if document.metadata["start_row"] == 3]
+        self.assertGreater(len(pieces), 1)
+        header = " | ".join(["col"] * 20)
+        for document in documents:
+            self.assertTrue(document.page_content.startswith(header + "\n"))
+            self.assertLessEqual(len(document.page_content), 300)
+        # Every cell of the wide row survives the split
+        text = " ".join(document.page_content for document in pieces)
+        for i in range(20):
+            self.assertIn(f"cell {i} ", text)
+        self.assertEqual(documents[0].page_content.split("\n")[1:], ["short"])
+        self.assertEqual(documents[-1].page_content.split("\n")[1:], ["after"])
+
+    def test_xlsx_documents_start_with_sheet_name_and_header(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        first = workbook.active
+        first.title = "Cells"
+        first.append(["organelle", "role"])
+        for i in range(30):
+            first.append([f"organelle {i}", "makes energy for the cell"])
+        second = workbook.create_sheet("Tissues")
+        second.append(["tissue"])
+        second.append(["muscle"])
+        path = os.path.join(self.directory, "data.xlsx")
+        workbook.save(path)
+
+        documents = TabularRowGroupLoader(path, XLSX_CONTENT_TYPE, chunk_size=200).load()
+        sheets = [document.metadata["sheet"] for document in documents]
+        self.assertEqual(sheets[-1], "Tissues")
+        self.assertGreater(sheets.count("Cells"), 1)
+        for document in documents:
+            self.assertLessEqual(len(document.page_content), 200)
+            if document.metadata["sheet"] == "Cells":
+                self.assertTrue(document.page_content.startswith("Cells\norganelle | role\n"))
+        self.assertEqual(documents[-1].page_content, "Tissues\ntissue\nmuscle")
+
+
+class NearDuplicateTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "documents.minhash")
+        self.hasher = MinHasher()
+
+    def paragraph(self, seed):
+        rng = random.Random(seed)
+        words = ["cell", "energy", "membrane", "protein", "enzyme", "light", "water"]
+        return " ".join(f"{rng.choice(words)}{rng.randint(0, 50)}" for _ in range(60))
+
+    def test_counts_duplicates_within_the_upload_and_of_existing_chunks(self):
+        index = MinHashLSH(threshold=0.8, path=self.path)
+        stored = [self.paragraph(seed) for seed in range(3)]
+        keep, signatures, _ = find_near_duplicates(stored, index, self.hasher)
+        index.add(signatures)
+        self.assertEqual(keep, [0, 1, 2])
+
+        texts = [stored[0], self.paragraph(10), self.paragraph(10) + " extra", self.paragraph(11), stored[2]]
+        keep, signatures, stats = find_near_duplicates(texts, index, self.hasher)
+        self.assertEqual(keep, [1, 3])
+        self.assertEqual(len(signatures), 2)
+        self.assertEqual((stats["duplicates_within_upload"], stats["duplicates_of_existing"]), (1, 2))
+        self.assertEqual(stats["dedup_ratio"], 3 / 5)
+
+    def test_reload_ignores_a_partial_record_and_sees_other_writers(self):
+        index = MinHashLSH(path=self.path)
+        signatures = [self.hasher.signature(self.paragraph(seed)) for seed in range(4)]
+        index.add(signatures[:3])
+        with open(self.path, "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        reloaded = MinHashLSH(path=self.path)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.query(signatures[1]), 1)
+        # The next append replaces the partial record, and the first instance picks it up
+        reloaded.add(signatures[3:])
+        self.assertEqual(os.path.getsize(self.path), 4 * reloaded.num_perm * 4)
+        self.assertEqual(index.query(signatures[3]), 3)
+
+    def test_merged_and_recent_signatures_are_both_found(self):
+        rng = np.random.RandomState(0)
+        signatures = rng.randint(0, 1 << 32, size=(MERGE_MIN + 10, 128), dtype=np.uint64).astype(np.uint32)
+        index = MinHashLSH(path=self.path)
+        index.add(list(signatures))
+        index.add([signatures[0] + 1])
+        self.assertEqual(len(MinHashLSH(path=self.path)), MERGE_MIN + 11)
+        for position in (0, MERGE_MIN - 1, MERGE_MIN + 9, MERGE_MIN + 10):
+            probe = index._signature(position).copy()
+            probe[:4] += 1
+            self.assertEqual(index.query(probe), position)
+        self.assertIsNone(index.query(rng.randint(0, 1 << 32, size=128, dtype=np.uint64).astype(np.uint32)))
+
+
+class CohortGroupingTests(SimpleTestCase):
+    question = {"type": "short_answer", "text": "What does the mitochondria do?", "correct_answer": "Produces ATP"}
+
+    def submission(self, student_id, user_answer):
+        return {"student_id": student_id, "answers": [{**self.question, "user_answer": user_answer}]}
+
+    def test_groups_normalized_and_near_duplicate_answers(self):
+        submissions = [
+            self.submission(1, "It produces ATP for the cell through respiration"),
+            self.submission(2, "it produces ATP for the cell, through respiration."),
+            self.submission(3, "It produces ATP for the cell through cellular respiration"),
+            self.submission(4, "It stores genetic information"),
+        ]
+        groups, stats = group_cohort_answers(submissions, MinHasher(), threshold=0.5)
+        members = sorted(sorted(group["members"]) for group in groups)
+        self.assertEqual(members, [[(0, 0), (1, 0), (2, 0)], [(3, 0)]])
+        self.assertEqual(stats["llm_calls_saved"], 2)
+
+    def test_short_answers_only_group_when_identical(self):
+        submissions = [self.submission(1, "ATP"), self.submission(2, "atp!"), self.submission(3, "no ATP")]
+        groups, _ = group_cohort_answers(submissions, MinHasher(), threshold=0.1)
+        self.assertEqual(sorted(len(group["members"]) for group in groups), [1, 2])
+
+    def test_different_questions_are_never_grouped(self):
+        other = {**self.question, "text": "What does the ribosome do?"}
+        submissions = [
+            self.submission(1, "ATP"),
+            {"student_id": 2, "answers": [{**other, "user_answer": "ATP"}]},
+        ]
+        groups, _ = group_cohort_answers(submissions, MinHasher(), threshold=0.85)
+        self.assertEqual(len(groups), 2)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def controller(self, capacity, queue_timeout=5.0):
+        return AdmissionController(
+            capacity=capacity,
+            endpoints={
+                "score": {"max_in_flight": 1, "max_queue": 2, "priority": 0},
+                "generate": {"max_in_flight": 1, "max_queue": 1, "priority": 1},
+            },
+            queue_timeout=queue_timeout,
+        )
+
+    def test_sheds_when_queue_is_full(self):
+        controller = self.controller(capacity=2, queue_timeout=0.05)
+        self.assertIsNone(controller.acquire("generate"))
+        waiter = threading.Thread(target=controller.acquire, args=("generate",))
+        waiter.start()
+        time.sleep(0.01)
+        self.assertGreaterEqual(controller.acquire("generate"), 1)
+        waiter.join()
+        # Other endpoints still have room
+        self.assertIsNone(controller.acquire("score"))
+
+    def test_freed_slot_goes_to_scoring_first(self):
+        controller = self.controller(capacity=1)
+        self.assertIsNone(controller.acquire("score"))
+        order = []
+
+        def wait(endpoint):
+            controller.acquire(endpoint)
+            order.append(endpoint)
+            controller.release(endpoint, 0.0)
+
+        waiters = [threading.Thread(target=wait, args=("generate",)), threading.Thread(target=wait, args=("score",))]
+        for waiter in waiters:
+            waiter.start()
+            time.sleep(0.01)
+        controller.release("score", 0.0)
+        for waiter in waiters:
+            waiter.join()
+        self.assertEqual(order, ["score", "generate"])
+
+    def test_streamed_response_keeps_its_slot_until_the_body_is_done(self):
+        controller = self.controller(capacity=1, queue_timeout=0.01)
+        view = admission_controlled(controller, "score")(lambda: StreamingHttpResponse(iter(["a", "b"])))
+
+        response = view()
+        self.assertIsNotNone(controller.acquire("score"))
+        self.assertEqual(b"".join(response), b"ab")
+        self.assertIsNone(controller.acquire("score"))
+        controller.release("score", 0.0)
+
+        # A client that leaves before the first chunk frees the slot when Django closes the response
+        response = view()
+        response.close()
+        self.assertIsNone(controller.acquire("score"))
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_upper_inclusive(self):
+        for value in (0.05, 0.2, 3.0, 100.0):
+            metrics.observe("test_latency_seconds", value, buckets=(0.05, 1.0, 5.0), view="a")
+        counts, total, count = metrics.histogram("test_latency_seconds", view="a")
+        self.assertEqual(counts, [1, 1, 1, 1])
+        self.assertEqual((total, count), (103.25, 4))
+
+    def test_render_prometheus_text(self):
+        metrics.incr("test_render_total", 2, stage="x")
+        with metrics.span("test_render", operation="test"):
+            pass
+        text = metrics.render()
+        self.assertIn("# TYPE test_render_total counter\ntest_render_total{stage=\"x\"} 2\n", text)
+        self.assertIn('stage_duration_seconds_bucket{operation="test",stage="test_render",le="0.005"} 1', text)
+        self.assertIn('stage_duration_seconds_bucket{operation="test",stage="test_render",le="+Inf"} 1', text)
+        self.assertIn('stage_duration_seconds_count{operation="test",stage="test_render"} 1', text)
+
+    def test_endpoint_requires_the_metrics_token(self):
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+        with override_settings(METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StackSamplerTests(SimpleTestCase):
+    def test_samples_busy_and_sleeping_frames(self):
+        ready = threading.Event()
+        result = {}
+
+        def work():
+            sampler = StackSampler(threading.get_ident(), 0.002)
+            sampler.start()
+            ready.set()
+            spin(0.1)
+            time.sleep(0.1)
+            sampler.stop()
+            result["sampler"] = sampler
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        sampler = result["sampler"]
+        self.assertGreater(sampler.samples, 10)
+        busy = sum(seconds for stack, seconds in sampler.wall.items() if stack.endswith("tests.py:spin"))
+        self.assertGreater(busy, 0.05)
+        self.assertIn("tests.py:work;tests.py:spin", sampler.folded(sampler.cpu))
+        # Sleeping costs wall time but hardly any CPU
+        sleeping = [stack for stack in sampler.wall if stack.endswith("tests.py:work")]
+        self.assertTrue(sleeping)
+        self.assertLess(sum(sampler.cpu[stack] for stack in sleeping), 0.05)
+
+
+def unit_vectors(count: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.RandomState(seed).randn(count, dimension).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class LocalVectorStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(lambda: __import__("shutil").rmtree(self.directory, ignore_errors=True))
+
+    def store(self, **kwargs):
+        return LocalVectorStore(self.directory, 8, **kwargs)
+
+    def upsert(self, store, ids, vectors):
+        store.upsert([
+            {"id": id_, "values": vector.tolist(), "metadata": {"id": id_}} for id_, vector in zip(ids, vectors)
+        ], namespace="docs")
+
+    def top(self, store, vector, top_k=1):
+        return [(match["id"], match["metadata"]["id"]) for match in store.query(
+            vector.tolist(), top_k=top_k, namespace="docs", include_metadata=True
+        )["matches"]]
+
+    def test_query_finds_each_vector_with_its_metadata(self):
+        vectors = unit_vectors(50)
+        for quantization in ("none", "int8", "binary"):
+            with self.subTest(quantization=quantization):
+                store = LocalVectorStore(os.path.join(self.directory, quantization), 8, quantization=quantization)
+                self.upsert(store, [f"v{i}" for i in range(50)], vectors)
+                for i in range(50):
+                    self.assertEqual(self.top(store, vectors[i]), [(f"v{i}", f"v{i}")])
+
+    def test_overwrite_and_delete_survive_reload(self):
+        vectors = unit_vectors(4)
+        store = self.store()
+        self.upsert(store, ["a", "b", "c"], vectors[:3])
+        # "a" moves to a new vector; the batch repeats "c", so only its last row may stay live
+        self.upsert(store, ["a", "c", "c"], vectors[[3, 0, 2]])
+        store.delete(["b"], namespace="docs")
+        for opened in (store, self.store()):
+            self.assertEqual(opened.describe_index_stats()["namespaces"]["docs"]["vector_count"], 2)
+            self.assertEqual(self.top(opened, vectors[3]), [("a", "a")])
+            self.assertEqual(self.top(opened, vectors[0]), [("a", "a")])
+            self.assertEqual(self.top(opened, vectors[2]), [("c", "c")])
+            self.assertEqual([id_ for id_, _ in self.top(opened, vectors[1], top_k=5)], ["a", "c"])
+        tombstones = np.fromfile(os.path.join(self.directory, "docs", "tombstones.i64"), dtype=np.int64)
+        # Rows of the old "a", the batch's first "c", the first batch's "c" and the deleted "b"
+        self.assertEqual(sorted(tombstones.tolist()), [0, 1, 2, 4])
+
+    def test_reload_drops_a_half_written_upsert(self):
+        vectors = unit_vectors(3)
+        self.upsert(self.store(), ["a", "b"], vectors[:2])
+        with open(os.path.join(self.directory, "docs", "vectors.f32"), "ab") as f:
+            f.write(vectors[2].tobytes())
+        with open(os.path.join(self.directory, "docs", "records.jsonl"), "ab") as f:
+            f.write(b'{"id": "c", "meta')
+        store = self.store()
+        self.assertEqual(store.namespace("docs").count, 2)
+        self.upsert(store, ["c"], vectors[2:])
+        self.assertEqual(self.top(self.store(), vectors[2]), [("c", "c")])
+
+    def test_writers_in_separate_stores_do_not_interleave(self):
+        # Each store opens its own lock file descriptor, as another process would
+        vectors = unit_vectors(202)
+        first, second = self.store(), self.store()
+        self.upsert(first, ["warm"], vectors[200:201])
+        self.upsert(second, ["seen"], vectors[201:])
+        self.assertEqual(self.top(first, vectors[201]), [("seen", "seen")])
+
+        def write(store, name, base):
+            for batch in range(20):
+                rows = range(batch * 5, batch * 5 + 5)
+                self.upsert(store, [f"{name}{row}" for row in rows], vectors[[base + row for row in rows]])
+
+        threads = [
+            threading.Thread(target=write, args=(store, name, base))
+            for store, name, base in ((first, "x", 0), (second, "y", 100))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        first.delete(["y7"], namespace="docs")
+
+        for store in (first, second, self.store()):
+            self.assertEqual(store.describe_index_stats()["namespaces"]["docs"]["vector_count"], 201)
+            for row in (0, 42, 99):
+                self.assertEqual(self.top(store, vectors[row]), [(f"x{row}", f"x{row}")])
+                self.assertEqual(self.top(store, vectors[100 + row]), [(f"y{row}", f"y{row}")])
+            self.assertNotIn("y7", [id_ for id_, _ in self.top(store, vectors[107], top_k=5)])
+
+
+class HNSWIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(lambda: __import__("shutil").rmtree(self.directory, ignore_errors=True))
+        self.vectors = unit_vectors(1000, dimension=16, seed=1)
+
+    def store(self):
+        return LocalVectorStore(self.directory, 16, quantization="none", index="hnsw", hnsw_params={"M": 8})
+
+    def fill(self, store, stop, start=0, batch=50):
+        for first in range(start, stop, batch):
+            rows = range(first, min(first + batch, stop))
+            store.upsert([{"id": f"v{row}", "values": self.vectors[row].tolist()} for row in rows], namespace="docs")
+
+    def test_recall_against_an_exact_scan(self):
+        store = self.store()
+        self.fill(store, 1000)
+        queries = unit_vectors(50, dimension=16, seed=2)
+        self.assertGreaterEqual(recall_at_k(store, "docs", queries, top_k=10), 0.95)
+
+    def test_reopened_graph_answers_like_the_original(self):
+        store = self.store()
+        self.fill(store, 600)
+        queries = unit_vectors(20, dimension=16, seed=2).tolist()
+        before = [store.query(query, top_k=10, namespace="docs") for query in queries]
+        store.close()
+
+        graph = HNSWIndex(os.path.join(self.directory, "docs"), M=8)
+        self.assertEqual(graph.count, 600)
+        self.assertTrue(all(not layer.changed for layer in graph.upper.values()))
+        reopened = self.store()
+        self.assertEqual([reopened.query(query, top_k=10, namespace="docs") for query in queries], before)
+
+    def test_reopens_at_the_last_checkpoint_and_re_adds_later_rows(self):
+        with mock.patch.object(hnsw, "CHECKPOINT_MIN_ROWS", 100):
+            store = self.store()
+            self.fill(store, 250)
+        # Not closed, as after a crash: upper layers and meta were last written at 200 rows
+        self.assertEqual(HNSWIndex(os.path.join(self.directory, "docs"), M=8).count, 200)
+        reopened = self.store()
+        self.assertEqual(reopened.namespace("docs").hnsw.count, 250)
+        for row in range(0, 250, 7):
+            self.assertEqual(reopened.query(self.vectors[row].tolist(), top_k=1, namespace="docs")["matches"][0]["id"], f"v{row}")
+
+    def test_re_added_rows_are_not_linked_twice(self):
+        with mock.patch.object(hnsw, "CHECKPOINT_MIN_ROWS", 100):
+            self.fill(self.store(), 250)
+            # Each reopen re-adds rows 200-249, which older level-0 lists may already link to
+            for _ in range(3):
+                graph = self.store().namespace("docs").hnsw
+        self.assertEqual(graph.count, 250)
+        table = graph._table[:250]
+        for node, row in enumerate(table):
+            links = row[row >= 0].tolist()
+            self.assertEqual(len(links), len(set(links)), f"duplicate links from node {node}")
+
+    def test_deleted_rows_are_never_returned(self):
+        store = self.store()
+        self.fill(store, 500)
+        store.delete([f"v{row}" for row in range(500) if row % 5], namespace="docs")
+        for opened in (store, self.store()):
+            for row in range(0, 500, 3):
+                ids = [match["id"] for match in opened.query(self.vectors[row].tolist(), top_k=5, namespace="docs")["matches"]]
+                self.assertEqual(len(ids), 5)
+                self.assertTrue(all(int(id_[1:]) % 5 == 0 for id_ in ids))
+                if row % 5 == 0:
+                    self.assertEqual(ids[0], f"v{row}")
+
+    def test_upper_layer_compaction_keeps_every_list(self):
+        layer = hnsw._UpperLayer()
+        expected = {}
+        rng = random.Random(0)
+        for round_ in range(3):
+            for _ in range(50):
+                node = rng.randrange(100)
+                expected[node] = [rng.randrange(1000) for _ in range(rng.randrange(5))]
+                layer.set(node, expected[node])
+            layer.compact()
+            self.assertEqual({node: layer.get(node) for node in expected}, expected)
+            self.assertEqual(layer.get(1000), [])
+
+
+class ShardPoolTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        # One pool for the class: spawning workers dominates the run time
+        cls.sharded = LocalVectorStore(cls.directory, 16, quantization="int8", workers=3, shard_min_rows=1)
+        cls.vectors = unit_vectors(1000, dimension=16, seed=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded.close()
+        __import__("shutil").rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def fill(self, namespace, count):
+        self.sharded.upsert(
+            [{"id": f"v{row}", "values": self.vectors[row].tolist()} for row in range(count)], namespace=namespace
+        )
+
+    def search(self, store, namespace, query, top_k):
+        return [(match["id"], match["score"]) for match in store.query(query, top_k=top_k, namespace=namespace)["matches"]]
+
+    def test_matches_a_single_process_scan(self):
+        self.fill("scan", 1000)
+        self.sharded.delete([f"v{row}" for row in range(0, 1000, 3)], namespace="scan")
+        single = LocalVectorStore(self.directory, 16, quantization="int8")
+        for query in unit_vectors(30, dimension=16, seed=4).tolist():
+            sharded = self.search(self.sharded, "scan", query, 10)
+            expected = self.search(single, "scan", query, 10)
+            self.assertEqual(len(sharded), 10)
+            # Every shard rescores its own top_k * oversample candidates, so it finds at least as good rows
+            for (_, score), (_, expected_score) in zip(sharded, expected):
+                self.assertGreaterEqual(score, expected_score - 1e-6)
+            exact = self.search(self.sharded, "scan", query, 1000)
+            self.assertEqual(sharded, exact[:10])
+
+    def test_every_row_lands_in_exactly_one_shard(self):
+        # Fewer rows than workers leaves some shards empty; odd counts leave uneven bounds
+        for count in (1, 2, 7, 100):
+            with self.subTest(count=count):
+                self.fill(f"bounds{count}", count)
+                for row in range(count):
+                    ids = [id_ for id_, _ in self.search(self.sharded, f"bounds{count}", self.vectors[row].tolist(), count)]
+                    self.assertEqual(sorted(ids), sorted(f"v{i}" for i in range(count)))
+                    self.assertEqual(ids[0], f"v{row}")
+
+    def test_concurrent_queries_get_their_own_replies(self):
+        self.fill("concurrent", 500)
+        errors = []
+
+        def run(offset):
+            for row in range(offset, 500, 8):
+                top = self.search(self.sharded, "concurrent", self.vectors[row].tolist(), 1)
+                if top[0][0] != f"v{row}":
+                    errors.append((row, top))
+
+        threads = [threading.Thread(target=run, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @override_settings(STAGE_DEADLINES={"retrieve": 0.3})
+    def test_hung_worker_fails_the_search_at_the_stage_deadline(self):
+        self.fill("hung", 300)
+        query = self.vectors[7].tolist()
+        self.search(self.sharded, "hung", query, 1)
+        pool = self.sharded.shards
+        hung = pool._processes[1]
+        os.kill(hung.pid, signal.SIGSTOP)
+        failures = []
+
+        def search():
+            try:
+                self.search(self.sharded, "hung", query, 1)
+            except RuntimeError as e:
+                failures.append(e)
+
+        async def retrieve():
+            # Unthreaded, so asyncio.run waits for the abandoned search to give up
+            await with_deadline("retrieve", sync_to_async(search, thread_sensitive=False)())
+
+        began = time.monotonic()
+        try:
+            with self.assertRaises(DeadlineExceeded):
+                asyncio.run(retrieve())
+        finally:
+            os.kill(hung.pid, signal.SIGCONT)
+        self.assertLess(time.monotonic() - began, 5)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(pool._processes, [])
+        # The next query starts a fresh pool
+        self.assertEqual(self.search(self.sharded, "hung", query, 1)[0][0], "v7")
+
+
+class IngestCheckpointTests(SimpleTestCase):
+    def test_replays_batches_for_the_current_file_version(self):
+        records = [
+            {"batch_size": 200},
+            {"file": "a.csv", "size": 10, "mtime": 1, "batch": 0, "stats": {"chunks": 200}},
+            {"file": "a.csv", "size": 10, "mtime": 1, "done": True},
+            {
+                "file": "b.pdf", "size": 5, "mtime": 1, "batch": 0, "stats": {"chunks": 200},
+                "ids": ["b_0_0", "b_0_1"], "dedup": [0, 2],
+            },
+            # Batch 1 was interrupted after one upsert
+            {"file": "b.pdf", "size": 5, "mtime": 1, "ids": ["b_1_5"]},
+            # b.pdf was edited after its first batch, so the earlier progress no longer applies
+            {"file": "b.pdf", "size": 6, "mtime": 2, "batch": 1, "stats": {"chunks": 50}, "ids": ["b_1_0"]},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.jsonl")
+            with open(path, "w") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+                f.write('{"file": "b.pdf", "si')
+            batch_size, files = load_checkpoint(path)
+        self.assertEqual(batch_size, 200)
+        self.assertTrue(files["a.csv"]["done"])
+        self.assertEqual(files["b.pdf"]["version"], (6, 2))
+        self.assertEqual(list(files["b.pdf"]["batches"]), [1])
+        self.assertFalse(files["b.pdf"]["done"])
+        # What the first version wrote is deleted unless the new one writes it again
+        self.assertEqual(files["b.pdf"]["ids"], {"b_1_0"})
+        self.assertEqual(files["b.pdf"]["stale_ids"], {"b_0_0", "b_0_1", "b_1_5"})
+        self.assertEqual(files["b.pdf"]["stale_dedup"], [[0, 2]])
+        self.assertEqual(files["a.csv"]["stale_ids"], set())
+
+
+class OfflineViewsTestCase(SimpleTestCase):
+    """Runs assessment.views against the offline fakes: Gemini from scripts/fakes.py and a
+    temporary local vector store. Needs VECTOR_BACKEND=local, as for the load test."""
+
+    def setUp(self):
+        from . import views
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.views = views
+        self.genai = FakeGenAI(views.VECTOR_DIMENSION, LatencyModel(0), LatencyModel(0))
+        self.store = LocalVectorStore(os.path.join(self.directory, "vectors"), views.VECTOR_DIMENSION)
+        self.index = self.store
+        overrides = override_settings(
+            CHUNK_DEDUP_DIR=os.path.join(self.directory, "dedup"),
+            CHUNK_DEDUP_ENABLED=False,
+            UPSERT_RETRY_BACKOFF=0.01,
+            HEDGING_ENABLED=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for patcher in (
+            mock.patch.object(views, "genai", self.genai),
+            mock.patch.object(views, "get_index", lambda: self.index),
+            mock.patch.object(views, "semantic_cache", SemanticCache(0.92, ttl=60, max_entries=100, stale_similarity=0.5)),
+            mock.patch.dict(views._dedup_indexes, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def documents(self, count, words=150):
+        rng = random.Random(count)
+        return [
+            Document(page_content=" ".join(f"word{rng.randint(0, 10000)}" for _ in range(words)))
+            for _ in range(count)
+        ]
+
+    def stored(self):
+        return self.store.describe_index_stats()["namespaces"].get(self.views.NAMESPACE, {}).get("vector_count", 0)
+
+
+@override_settings(UPSERT_BATCH_SIZE=2, UPSERT_MAX_RETRIES=3)
+class UpsertPipelineTests(OfflineViewsTestCase):
+    def test_retries_only_the_failed_batch_with_backoff(self):
+        self.index = SlowIndex(self.store, LatencyModel(0, fail_first=2))
+        sleeps = []
+        real_sleep = asyncio.sleep
+
+        async def record_sleep(delay):
+            sleeps.append(delay)
+            await real_sleep(0)
+
+        batch = [{"id": "a", "values": [1.0] * self.views.VECTOR_DIMENSION, "metadata": {"text": "a"}}]
+        with mock.patch.object(self.views.asyncio, "sleep", record_sleep):
+            asyncio.run(self.views.upsert_with_retry(self.index, batch, 0))
+        self.assertEqual(self.index.latency.calls, 3)
+        self.assertEqual(sleeps, [0.01, 0.02])
+        self.assertEqual(self.stored(), 1)
+
+    def test_gives_up_after_the_last_retry(self):
+        self.index = SlowIndex(self.store, LatencyModel(0, failure_rate=1.0))
+        batch = [{"id": "a", "values": [1.0] * self.views.VECTOR_DIMENSION, "metadata": {"text": "a"}}]
+        with self.assertRaises(FakeUpstreamError), self.assertLogs("assessment.views", "ERROR"):
+            asyncio.run(self.views.upsert_with_retry(self.index, batch, 0))
+        self.assertEqual(self.index.latency.calls, 4)
+
+    @override_settings(UPSERT_MAX_RETRIES=0, UPSERT_CONCURRENCY=1)
+    def test_stops_embedding_once_an_upsert_gives_up(self):
+        self.index = SlowIndex(self.store, LatencyModel(0, failure_rate=1.0))
+        with self.assertRaises(FakeUpstreamError), self.assertLogs("assessment.views", "ERROR"):
+            asyncio.run(self.views.process_documents(self.documents(20)))
+        # Ten batches of two, but embedding stops at the batch waiting behind the failed upsert
+        self.assertLessEqual(self.genai.embed_calls, 2)
+        self.assertEqual(self.stored(), 0)
+
+    @override_settings(UPSERT_CONCURRENCY=2)
+    def test_cancelling_ingestion_cancels_upserts_in_flight(self):
+        self.index = SlowIndex(self.store, LatencyModel(100, sigma=0))
+
+        async def ingest_then_cancel():
+            task = asyncio.create_task(self.views.process_documents(self.documents(20)))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+        self.assertEqual(asyncio.run(ingest_then_cancel()), set())
+        # Only the upserts already running on threads can land; queued batches never do
+        self.assertLessEqual(self.stored(), 4)
+        self.assertLess(self.genai.embed_calls, 10)
+
+    def test_waits_for_the_pinecone_index_to_be_ready(self):
+        descriptions = iter([{"ready": False}, {"ready": False}, {"ready": True}])
+        pc = mock.Mock()
+        pc.describe_index.side_effect = lambda name: mock.Mock(status=next(descriptions))
+        with override_settings(VECTOR_BACKEND="pinecone"), mock.patch.object(self.views, "pc", pc), \
+                mock.patch.object(self.views, "_index_ready", False):
+            asyncio.run(self.views.wait_for_index_ready(poll_interval=0.001))
+            self.assertTrue(self.views._index_ready)
+        self.assertEqual(pc.describe_index.call_count, 3)
+
+
+class IngestCommandTests(OfflineViewsTestCase):
+    batch_size = 3
+
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.directory, "documents")
+        os.makedirs(self.root)
+        for name, rows in (("a.csv", 40), ("b.csv", 25)):
+            self.write_csv(name, rows)
+        self.completed = []
+        self.interrupt_after = None
+        real = self.views.process_documents
+
+        async def process_documents(batch, id_prefix, **kwargs):
+            if self.interrupt_after is not None and len(self.completed) == self.interrupt_after:
+                raise KeyboardInterrupt
+            stats = await real(batch, id_prefix=id_prefix, **kwargs)
+            self.completed.append(id_prefix)
+            return stats
+
+        patcher = mock.patch.object(self.views, "process_documents", process_documents)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_csv(self, name, rows, edited=()):
+        with open(os.path.join(self.root, name), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["topic", "notes"])
+            for i in range(rows):
+                words = [f"{name}-{i}-{j}" for j in range(60)]
+                if i in edited:
+                    words[30] = "edited"
+                writer.writerow([name, " ".join(words)])
+
+    def file_texts(self, name):
+        documents = TabularRowGroupLoader(os.path.join(self.root, name), CSV_CONTENT_TYPE).lazy_load()
+        splitter = LinearTextSplitter(chunk_size=self.views.CHUNK_SIZE, chunk_overlap=self.views.CHUNK_OVERLAP)
+        return sorted(chunk.page_content for chunk in splitter.split_documents(list(documents)))
+
+    def expected_prefixes(self):
+        prefixes = []
+        for name in ("a.csv", "b.csv"):
+            documents = len(list(TabularRowGroupLoader(os.path.join(self.root, name), CSV_CONTENT_TYPE).lazy_load()))
+            prefix = "bulk_" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+            prefixes += [f"{prefix}_{batch}" for batch in range(-(-documents // self.batch_size))]
+        return prefixes
+
+    def ingest(self):
+        call_command(
+            "ingest_documents", self.root, batch_size=self.batch_size, concurrency=1, parse_workers=1,
+            report_interval=60, stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+
+    def stored_ids(self):
+        namespace = LocalVectorStore(os.path.join(self.directory, "vectors"), self.views.VECTOR_DIMENSION)
+        return set(namespace.namespace(self.views.NAMESPACE).id_to_row)
+
+    def stored_texts(self, name):
+        prefix = "bulk_" + hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+        namespace = LocalVectorStore(os.path.join(self.directory, "vectors"), self.views.VECTOR_DIMENSION)
+        namespace = namespace.namespace(self.views.NAMESPACE)
+        return sorted(
+            namespace.metadata(row)["text"] for id_, row in namespace.id_to_row.items() if id_.startswith(prefix)
+        )
+
+    def test_rerun_after_an_interruption_neither_skips_nor_repeats_batches(self):
+        self.interrupt_after = 5
+        self.ingest()
+        self.assertEqual(len(self.completed), 5)
+
+        self.interrupt_after = None
+        self.ingest()
+        expected = self.expected_prefixes()
+        self.assertEqual(sorted(self.completed), sorted(expected))
+        self.assertEqual({id_.rsplit("_", 1)[0] for id_ in self.stored_ids()}, set(expected))
+        self.assertEqual(self.stored(), len(self.stored_ids()))
+
+        # A finished directory is skipped entirely
+        self.ingest()
+        self.assertEqual(len(self.completed), len(expected))
+
+    @override_settings(CHUNK_DEDUP_ENABLED=True)
+    def test_changed_file_replaces_its_chunks_with_dedup_enabled(self):
+        self.ingest()
+        before = len(self.stored_ids())
+        self.assertEqual(self.stored_texts("a.csv"), self.file_texts("a.csv"))
+        # Row 2 becomes a near-duplicate of its earlier text, and the file loses its last 30 rows
+        self.write_csv("a.csv", 10, edited={2})
+        # Interrupted part way through the new version, so the cleanup happens on the rerun
+        self.interrupt_after = len(self.completed) + 1
+        self.ingest()
+        self.interrupt_after = None
+        self.ingest()
+
+        prefixes = set(self.expected_prefixes())
+        stored = self.stored_ids()
+        self.assertEqual({id_.rsplit("_", 1)[0] for id_ in stored}, prefixes)
+        self.assertLess(len(stored), before)
+        self.assertEqual(self.stored(), len(stored))
+        # Every chunk of the new version is stored, under its own id, and nothing of the old one is left
+        self.assertEqual(self.stored_texts("a.csv"), self.file_texts("a.csv"))
+        self.assertEqual(self.stored_texts("b.csv"), self.file_texts("b.csv"))
+
+
+class ProfiledUploadTests(OfflineViewsTestCase):
+    databases = {"default"}
+
+    def test_profile_includes_parsing_on_worker_threads(self):
+        from .models import RequestProfile, UploadedFile
+
+        self.addCleanup(lambda: (RequestProfile.objects.all().delete(), UploadedFile.objects.all().delete()))
+        rows = io.StringIO()
+        writer = csv.writer(rows)
+        writer.writerow(["term", "definition"])
+        writer.writerows([f"term {i}", f"definition number {i} of the glossary"] for i in range(20000))
+        upload = SimpleUploadedFile("glossary.csv", rows.getvalue().encode("utf-8"), content_type=CSV_CONTENT_TYPE)
+        with override_settings(
+            PROFILING_TOKEN="secret", PROFILING_INTERVAL=0.001, MEDIA_ROOT=self.directory, PREGENERATION_ENABLED=False
+        ):
+            response = self.client.post(
+                "/api/assessment/upload-document/", {"documents": upload}, HTTP_X_PROFILE_TOKEN="secret"
+            )
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        worker_stacks = [line for line in profile.wall_stacks.splitlines() if line.startswith("(worker);")]
+        self.assertTrue(any("loaders.py:" in line for line in worker_stacks))
+        self.assertTrue(any("loaders.py:" in line for line in profile.cpu_stacks.splitlines()))
+
+
+@override_settings(
+    GENERATION_SHARD_SIZE=5, GENERATION_SHARD_CONCURRENCY=2, GENERATION_MAX_QUESTIONS=40, GENERATION_TOPUP_ROUNDS=1
+)
+class ShardedGenerationTests(OfflineViewsTestCase):
+    def generate(self, count, passages):
+        return asyncio.run(self.views.generate_questions_sharded("short_answer", count, "cells", passages=passages))
+
+    def test_shards_get_distinct_prompts_with_too_few_passages(self):
+        for passages in ([], ["The mitochondria produces ATP for the cell."]):
+            with self.subTest(passages=len(passages)):
+                self.genai.llm_calls = 0
+                questions = self.generate(15, passages)
+                self.assertEqual(len(questions), 15)
+                # One call per shard; none were coalesced into another shard's call
+                self.assertEqual(self.genai.llm_calls, 3)
+
+    def test_shard_fan_out_is_bounded(self):
+        running = peak = 0
+
+        async def fake_batch(*args, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return []
+
+        with mock.patch.object(self.views, "generate_question_batch", fake_batch):
+            self.generate(40, [])
+        self.assertEqual(peak, 2)
+
+    def test_rejects_question_counts_above_the_limit(self):
+        for count in (41, 0, "many"):
+            with self.subTest(count=count):
+                response = self.client.post(
+                    "/api/assessment/generate/",
+                    {"topic": "cells", "assessmentType": "mcq", "questionCount": count},
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.genai.llm_calls, 0)
+
+    def test_rejects_unknown_assessment_types_before_the_cache(self):
+        response = self.client.post(
+            "/api/assessment/generate/",
+            {"topic": "cells", "assessmentType": "essay", "questionCount": 5},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((self.genai.embed_calls, self.genai.llm_calls), (0, 0))
+        self.assertNotIn("essay", metrics.render())
+
+
+@override_settings(GENERATION_SHARD_SIZE=10, GENERATION_TOPUP_ROUNDS=1, PREGENERATION_POOL_SIZE=20)
+class PregenerationTests(OfflineViewsTestCase):
+    def test_fills_every_pool_from_a_single_passage(self):
+        pool = QuestionPool(ttl=60)
+        with mock.patch.object(self.views, "question_pool", pool):
+            asyncio.run(self.views.pregenerate_questions("Cells", ["The mitochondria produces ATP."]))
+        for assessment_type in self.views.ASSESSMENT_TYPES:
+            with self.subTest(assessment_type=assessment_type):
+                self.assertEqual(pool.size("cells", assessment_type), 20)
+
+
+@override_settings(COHORT_SCORING_CONCURRENCY=1)
+class CohortScoringTests(OfflineViewsTestCase):
+    question = {"type": "short_answer", "text": "What does the mitochondria do?", "correct_answer": "Produces ATP"}
+
+    def setUp(self):
+        super().setUp()
+        self.started = []
+        self.finished = []
+
+        async def score_answer(answer, topic, context):
+            self.started.append(answer["user_answer"])
+            await asyncio.sleep(0.05)
+            self.finished.append(answer["user_answer"])
+            return {"score": 1.0, "is_correct": True, "verified_by_llm": True}
+
+        for patcher in (
+            mock.patch.object(self.views, "score_answer", score_answer),
+            mock.patch.object(self.views, "record_scores", lambda *args, **kwargs: None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def submissions(self, count):
+        # Short distinct answers, so every one is its own group
+        return [{"student_id": i, "answers": [{**self.question, "user_answer": f"guess {i}"}]} for i in range(count)]
+
+    def test_cancelling_the_run_stops_the_remaining_groups(self):
+        events = queue.Queue()
+        future = background.submit(self.views.score_cohort("Cells", self.submissions(10), events.put))
+        while events.get(timeout=5)["event"] != "progress":
+            pass
+        future.cancel()
+        started = len(self.started)
+        time.sleep(0.3)
+        # At most the group admitted as the cancellation was delivered may still have started
+        self.assertLessEqual(len(self.started), started + 1)
+        self.assertLess(len(self.started), 10)
+
+    def test_streams_progress_then_the_result_and_counts_the_request(self):
+        before = metrics.get("http_requests_total", view="cohort", status="200")
+        response = self.client.post(
+            "/api/assessment/score-cohort/",
+            {"topic": "Cells", "submissions": self.submissions(3)},
+            content_type="application/json",
+        )
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        response.close()
+        self.assertEqual([event["event"] for event in events], ["grouped", "progress", "progress", "progress", "result"])
+        self.assertEqual([student["overall_score"] for student in events[-1]["students"]], [1.0, 1.0, 1.0])
+        self.assertEqual(metrics.get("http_requests_total", view="cohort", status="200"), before + 1)
+
+
+class ScriptedLatency:
+    """Stands in for a LatencyModel: each call sleeps, then fails or not, as scripted"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def wait(self):
+        delay, fail = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        time.sleep(delay)
+        if fail:
+            raise FakeUpstreamError("Simulated upstream failure")
+
+
+class LLMFailureTests(OfflineViewsTestCase):
+    @override_settings(HEDGING_ENABLED=True, HEDGE_MIN_SAMPLES=3)
+    def test_hedged_llm_call_survives_a_failing_attempt(self):
+        with mock.patch.dict(deadlines._trackers, clear=True):
+            for _ in range(3):
+                deadlines.get_tracker("score").record(0.02)
+            # The first attempt is hedged after 20ms, then fails before the hedge returns
+            self.genai.llm_latency = ScriptedLatency((0.05, True), (0.1, False))
+            response = asyncio.run(self.views.make_api_request("Evaluate this answer's correctness", stage="score"))
+            self.assertIsNotNone(response)
+            self.assertEqual(self.genai.llm_latency.calls, 2)
+            self.assertEqual(len(deadlines.get_tracker("score")._samples), 4)
+
+    def test_failed_llm_call_returns_none_and_counts_the_error(self):
+        self.genai.llm_latency = LatencyModel(0, failure_rate=1.0)
+        errors = metrics.get("llm_errors_total", stage="score")
+        with self.assertLogs("assessment.views", "ERROR"):
+            self.assertIsNone(asyncio.run(self.views.make_api_request("Evaluate this", stage="score")))
+        self.assertEqual(metrics.get("llm_errors_total", stage="score"), errors + 1)
@@ -6,7 +6,10 @@ from django.conf.urls.static import static
 from .views import (
     GenerateAssessmentView, 
     ScoreAnswersView,
+    CohortScoreView,
     FileUploadView,
+    ProfileListView,
+    ProfileDownloadView,
 )
 
 urlpatterns = [
@@ -14,5 +17,8 @@ urlpatterns = [
     path('score-short-answers/', ScoreAnswersView.as_view(), name='score-short-answers'),
     path('score-long-answers/', ScoreAnswersView.as_view(), name='score-long-answers'),
     path('score-fill-in-the-blanks/', ScoreAnswersView.as_view(), name='score-fill-in-the-blanks'),
+    path('score-cohort/', CohortScoreView.as_view(), name='score-cohort'),
     path('upload-document/', FileUploadView.as_view(), name='upload-document'),
+    path('profiles/', ProfileListView.as_view(), name='profiles'),
+    path('profiles/<int:pk>/', ProfileDownloadView.as_view(), name='profile-download'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
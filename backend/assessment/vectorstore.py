@@ -0,0 +1,595 @@
+# backend/assessment/vectorstore.py
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .filelock import file_lock
+from .hnsw import HNSWIndex
+
+JsonDict = Dict[str, Any]
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+INDEX_TYPES = ("flat", "hnsw")
+SCAN_BLOCK_ROWS = 4096  # rows decoded per block while scanning; small enough to stay in cache
+LOCK_NAME = ".lock"
+
+# Number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector scalar quantization: v ~= codes * scale"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """1-bit codes: the sign of every dimension, packed eight to a byte"""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(codes: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """Hamming distance from every packed code row to the packed query"""
+    xor = np.bitwise_xor(codes, query_bits)
+    if hasattr(np, "bitwise_count"):
+        if xor.shape[1] % 8 == 0:
+            xor = xor.view(np.uint64)
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+class _GrowableArray:
+    """Append-only numpy array with amortized doubling"""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: Any) -> None:
+        self._data = np.empty((1024, *shape), dtype=dtype)
+        self.size = 0
+
+    def extend(self, rows: np.ndarray) -> None:
+        needed = self.size + len(rows)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)), *self._data.shape[1:]), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = rows
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class _Namespace:
+    """One namespace on disk.
+
+    Files in the namespace directory, all appended to and aligned by row:
+      vectors.f32    normalized float32 vectors, read back through mmap
+      records.jsonl  {"id", "metadata"} per row; metadata is read by offset
+      codes.<mode>   quantized codes kept in memory (int8 also has scales.f32)
+      tombstones.i64 rows deleted or superseded by a later upsert of the same id
+      hnsw_*         optional HNSW graph over the rows (see hnsw.HNSWIndex)
+      .lock          flock held exclusively by whichever process is writing
+
+    Several processes (server workers, the ingest_documents command) may
+    write the same namespace. Every write holds the lock and first reads the
+    rows and tombstones other processes appended since this one last looked;
+    reads do the same whenever the file sizes show they are behind.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        quantization: str,
+        index: str = "flat",
+        hnsw_params: Optional[JsonDict] = None,
+    ) -> None:
+        self.directory = directory
+        self.dimension = dimension
+        self.quantization = quantization
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.offsets = _GrowableArray((), np.int64)
+        self.deleted = _GrowableArray((), np.bool_)
+        if quantization == "int8":
+            self.codes = _GrowableArray((dimension,), np.int8)
+            self.scales = _GrowableArray((), np.float32)
+        elif quantization == "binary":
+            self.codes = _GrowableArray(((dimension + 7) // 8,), np.uint8)
+        # Bytes of records.jsonl and tombstones.i64 read so far
+        self._records_size = 0
+        self._tombstones_size = 0
+        self._full: Optional[np.memmap] = None
+        self.hnsw: Optional[HNSWIndex] = None
+        with self._file_lock():
+            self._sync()
+            self._repair()
+            if index == "hnsw":
+                self.hnsw = self._load_hnsw(hnsw_params or {})
+        self.shards: Optional[Any] = None  # sharding.ShardPool set by LocalVectorStore
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _file_lock(self) -> Any:
+        return file_lock(self._path(LOCK_NAME))
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def full_vectors(self) -> np.ndarray:
+        """Memory-map the full-precision vectors, remapping after the file has grown"""
+        with self.lock:
+            if self._full is None or len(self._full) != self.count:
+                self._full = None
+                if self.count:
+                    self._full = np.memmap(
+                        self._path("vectors.f32"), dtype=np.float32, mode="r",
+                        shape=(self.count, self.dimension),
+                    )
+            return self._full if self._full is not None else np.empty((0, self.dimension), np.float32)
+
+    def _file_sizes(self) -> Tuple[int, int]:
+        sizes = []
+        for name in ("records.jsonl", "tombstones.i64"):
+            path = self._path(name)
+            sizes.append(os.path.getsize(path) if os.path.exists(path) else 0)
+        return sizes[0], sizes[1]
+
+    def refresh(self) -> None:
+        """Catch up with rows and tombstones written by other processes"""
+        if self._file_sizes() == (self._records_size, self._tombstones_size):
+            return
+        with self.lock, self._file_lock():
+            self._sync()
+            self._repair()
+
+    def _sync(self) -> None:
+        """Read the rows and tombstones appended since the last sync; call with the file lock held"""
+        start = self.count
+        records_path = self._path("records.jsonl")
+        if os.path.exists(records_path) and os.path.getsize(records_path) > self._records_size:
+            offsets = []
+            superseded = []
+            with open(records_path, "rb") as f:
+                f.seek(self._records_size)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Half-written by an upsert that was killed; _repair drops it
+                        break
+                    record = json.loads(line)
+                    offsets.append(self._records_size)
+                    self._records_size += len(line)
+                    if record["id"] in self.id_to_row:
+                        superseded.append(self.id_to_row[record["id"]])
+                    self._register(record["id"])
+            self.offsets.extend(np.asarray(offsets, dtype=np.int64))
+            self.deleted.extend(np.zeros(self.count - start, dtype=np.bool_))
+            self.deleted.view()[superseded] = True
+
+        count = self.count
+        if count > start:
+            vectors_path = self._path("vectors.f32")
+            vectors_rows = os.path.getsize(vectors_path) // (4 * self.dimension) if os.path.exists(vectors_path) else 0
+            if vectors_rows < count:
+                raise ValueError(f"{self.directory}: vectors.f32 has {vectors_rows} rows, records.jsonl has {count}")
+            if self.quantization != "none":
+                self._load_codes(start, count)
+
+        tombstones_path = self._path("tombstones.i64")
+        tombstones_size = os.path.getsize(tombstones_path) if os.path.exists(tombstones_path) else 0
+        if tombstones_size > self._tombstones_size:
+            tombstones = np.fromfile(
+                tombstones_path, dtype=np.int64,
+                count=(tombstones_size - self._tombstones_size) // 8, offset=self._tombstones_size,
+            )
+            self._tombstones_size += 8 * len(tombstones)
+            rows = tombstones[tombstones < count]
+            self.deleted.view()[rows] = True
+            for row in rows.tolist():
+                if self.id_to_row.get(self.ids[row]) == row:
+                    del self.id_to_row[self.ids[row]]
+
+        if self.hnsw is not None and self.hnsw.count < count:
+            self.hnsw.add(self.full_vectors(), self.hnsw.count, count)
+
+    def _repair(self) -> None:
+        """Drop what a killed upsert left past the last complete row, so appends stay aligned"""
+        count = self.count
+        self._truncate(self._path("records.jsonl"), self._records_size)
+        self._truncate(self._path("vectors.f32"), count * 4 * self.dimension)
+        if self.quantization == "int8":
+            self._truncate(self._path("codes.int8"), count * self.dimension)
+            self._truncate(self._path("scales.f32"), count * 4)
+        elif self.quantization == "binary":
+            self._truncate(self._path("codes.binary"), count * ((self.dimension + 7) // 8))
+        self._truncate(self._path("tombstones.i64"), self._tombstones_size)
+
+    def _load_codes(self, start: int, stop: int) -> None:
+        """Load persisted codes of rows [start, stop), re-encoding from the full vectors if they are missing or short"""
+        width = self.codes.view().shape[1]
+        rows = stop - start
+        codes_path = self._path(f"codes.{self.quantization}")
+        scales_path = self._path("scales.f32")
+        codes = scales = None
+        if os.path.exists(codes_path):
+            codes = np.fromfile(codes_path, dtype=self.codes.view().dtype, count=rows * width, offset=start * width)
+        if os.path.exists(scales_path):
+            scales = np.fromfile(scales_path, dtype=np.float32, count=rows, offset=start * 4)
+
+        complete = codes is not None and len(codes) == rows * width
+        if self.quantization == "int8":
+            complete = complete and scales is not None and len(scales) == rows
+        if complete:
+            self.codes.extend(codes.reshape(rows, width))
+            if self.quantization == "int8":
+                self.scales.extend(scales)
+            return
+
+        full = self.full_vectors()
+        self._truncate(codes_path, start * width)
+        if self.quantization == "int8":
+            self._truncate(scales_path, start * 4)
+        for block_start in range(start, stop, SCAN_BLOCK_ROWS):
+            encoded = self._encode(np.asarray(full[block_start:min(block_start + SCAN_BLOCK_ROWS, stop)]))
+            self._write_codes(encoded)
+            self._append_codes(encoded)
+
+    def _load_hnsw(self, params: JsonDict) -> HNSWIndex:
+        """Open the persisted graph and insert any rows it has not seen yet"""
+        hnsw = HNSWIndex(self.directory, **params)
+        if hnsw.count > self.count:
+            # The graph outlived rows truncated by _repair; rebuild it from scratch
+            for name in os.listdir(self.directory):
+                if name.startswith("hnsw_"):
+                    os.remove(self._path(name))
+            hnsw = HNSWIndex(self.directory, **params)
+        if hnsw.count < self.count:
+            hnsw.add(self.full_vectors(), hnsw.count, self.count)
+        return hnsw
+
+    @staticmethod
+    def _truncate(path: str, size: int) -> None:
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def _register(self, id_: str) -> int:
+        row = len(self.ids)
+        self.ids.append(id_)
+        self.id_to_row[id_] = row
+        return row
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.quantization == "int8":
+            return quantize_int8(vectors)
+        return quantize_binary(vectors), None
+
+    def _write_codes(self, encoded: Tuple[np.ndarray, Optional[np.ndarray]]) -> None:
+        with open(self._path(f"codes.{self.quantization}"), "ab") as f:
+            f.write(encoded[0].tobytes())
+        if encoded[1] is not None:
+            with open(self._path("scales.f32"), "ab") as f:
+                f.write(encoded[1].tobytes())
+
+    def _append_codes(self, encoded: Tuple[np.ndarray, Optional[np.ndarray]]) -> None:
+        self.codes.extend(encoded[0])
+        if encoded[1] is not None:
+            self.scales.extend(encoded[1])
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, metadatas: Sequence[JsonDict]) -> None:
+        vectors = normalize(vectors)
+        with self.lock, self._file_lock():
+            # Rows another process appended come first, so ours start after them
+            self._sync()
+            self._repair()
+            start = self.count
+            # Records are written last: their line count defines how many rows exist
+            with open(self._path("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            if self.quantization != "none":
+                encoded = self._encode(vectors)
+                self._write_codes(encoded)
+                self._append_codes(encoded)
+            offsets = []
+            with open(self._path("records.jsonl"), "ab") as f:
+                offset = f.tell()
+                for id_, metadata in zip(ids, metadatas):
+                    line = (json.dumps({"id": id_, "metadata": metadata}) + "\n").encode("utf-8")
+                    f.write(line)
+                    offsets.append(offset)
+                    offset += len(line)
+            self._records_size = offset
+
+            superseded = []
+            for id_ in ids:
+                # Includes a row of the same id earlier in this batch
+                if id_ in self.id_to_row:
+                    superseded.append(self.id_to_row[id_])
+                self._register(id_)
+            self.offsets.extend(np.asarray(offsets, dtype=np.int64))
+            self.deleted.extend(np.zeros(len(ids), dtype=np.bool_))
+            self._tombstone(superseded)
+            if self.hnsw is not None:
+                self.hnsw.add(self.full_vectors(), start, self.count)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self.lock, self._file_lock():
+            self._sync()
+            self._repair()
+            rows = [self.id_to_row.pop(id_) for id_ in ids if id_ in self.id_to_row]
+            self._tombstone(rows)
+
+    def close(self) -> None:
+        """Checkpoint the HNSW graph, so the next open need not re-insert recent rows"""
+        if self.hnsw is not None:
+            with self.lock, self._file_lock():
+                self.hnsw.close()
+
+    def _tombstone(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        self.deleted.view()[rows] = True
+        with open(self._path("tombstones.i64"), "ab") as f:
+            f.write(np.asarray(rows, dtype=np.int64).tobytes())
+            self._tombstones_size = f.tell()
+
+    def metadata(self, row: int) -> JsonDict:
+        with open(self._path("records.jsonl"), "rb") as f:
+            f.seek(int(self.offsets.view()[row]))
+            return json.loads(f.readline())["metadata"]
+
+    def snapshot(self) -> Tuple[int, np.ndarray, Optional[np.ndarray], Optional[np.ndarray], np.ndarray]:
+        """Consistent views for a lock-free scan: count, deleted, codes, scales, full vectors"""
+        self.refresh()
+        with self.lock:
+            count = self.count
+            codes = self.codes.view() if self.quantization != "none" else None
+            scales = self.scales.view() if self.quantization == "int8" else None
+            return count, self.deleted.view(), codes, scales, self.full_vectors()
+
+
+def _top_candidates(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the largest scores, unordered"""
+    if limit >= len(scores):
+        return np.arange(len(scores))
+    return np.argpartition(-scores, limit - 1)[:limit]
+
+
+def approximate_scores(
+    query: np.ndarray,
+    quantization: str,
+    codes: Optional[np.ndarray],
+    scales: Optional[np.ndarray],
+    full: np.ndarray,
+    start: int,
+    stop: int,
+) -> np.ndarray:
+    """Score rows [start, stop) against a normalized query using the chosen representation"""
+    if quantization == "int8":
+        return (codes[start:stop].astype(np.float32) @ query) * scales[start:stop]
+    if quantization == "binary":
+        distances = hamming_distances(codes[start:stop], quantize_binary(query[None, :]))
+        return -distances.astype(np.float32)
+    return np.asarray(full[start:stop]) @ query
+
+
+def search_rows(
+    namespace: _Namespace,
+    query: np.ndarray,
+    top_k: int,
+    oversample: int,
+    exact: bool = False,
+    ef: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """Top-k (row, cosine) pairs: a quantized scan for top_k * oversample candidates, then
+    exact rescoring of those candidates against the memory-mapped full vectors.
+    Namespaces with an HNSW graph walk it instead of scanning, unless exact is set."""
+    count, deleted, codes, scales, full = namespace.snapshot()
+    if not count or top_k <= 0:
+        return []
+    query = normalize(query)
+    if namespace.hnsw is not None and not exact:
+        return [(row, score) for score, row in namespace.hnsw.search(query, top_k, full, deleted, ef)]
+    quantization = "none" if exact else namespace.quantization
+    if namespace.shards is not None and not exact and count >= namespace.shards.min_rows:
+        rows, scores = namespace.shards.search(namespace, query, top_k, oversample, count)
+    else:
+        rows, scores = scan_range(query, quantization, codes, scales, full, deleted, 0, count, top_k, oversample)
+    return [(int(row), float(score)) for row, score in zip(rows, scores)]
+
+
+def scan_range(
+    query: np.ndarray,
+    quantization: str,
+    codes: Optional[np.ndarray],
+    scales: Optional[np.ndarray],
+    full: np.ndarray,
+    deleted: np.ndarray,
+    start: int,
+    stop: int,
+    top_k: int,
+    oversample: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best live rows in [start, stop) and their exact scores, best first"""
+    limit = top_k if quantization == "none" else top_k * oversample
+    candidate_rows = []
+    candidate_scores = []
+    for block_start in range(start, stop, SCAN_BLOCK_ROWS):
+        block_stop = min(block_start + SCAN_BLOCK_ROWS, stop)
+        scores = approximate_scores(query, quantization, codes, scales, full, block_start, block_stop)
+        scores[deleted[block_start:block_stop]] = -np.inf
+        best = _top_candidates(scores, limit)
+        candidate_rows.append(best + block_start)
+        candidate_scores.append(scores[best])
+    rows = np.concatenate(candidate_rows)
+    scores = np.concatenate(candidate_scores)
+    keep = _top_candidates(scores, limit)
+    rows, scores = rows[keep], scores[keep]
+    live = np.isfinite(scores)
+    rows, scores = rows[live], scores[live]
+
+    if quantization != "none":
+        # Sorted row order keeps the mmap reads sequential
+        rows = np.sort(rows)
+        scores = np.asarray(full[rows]) @ query
+    order = np.argsort(-scores)[:top_k]
+    return rows[order], scores[order]
+
+
+class LocalVectorStore:
+    """File-backed vector store answering the subset of the Pinecone Index API used here.
+
+    Vectors are normalized (cosine metric) and kept at full precision on disk
+    behind an mmap. With ``quantization`` set to "int8" (4x smaller) or
+    "binary" (32x smaller), only compact codes are held in memory and scanned;
+    the best ``top_k * oversample`` candidates are then rescored exactly.
+    With ``index="hnsw"`` queries walk an HNSW graph over the full vectors
+    instead of scanning every row; ``hnsw_params`` (M, ef_construction,
+    ef_search) are passed to HNSWIndex. With ``workers`` > 1, flat scans of
+    namespaces holding at least ``shard_min_rows`` rows are split across
+    that many worker processes (see sharding.ShardPool). Any number of
+    processes may open the same directory; writes are serialized by a file
+    lock per namespace (see _Namespace).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        quantization: str = "int8",
+        oversample: int = 4,
+        index: str = "flat",
+        hnsw_params: Optional[JsonDict] = None,
+        workers: int = 0,
+        shard_min_rows: int = 50_000,
+    ) -> None:
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        if index not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index}")
+        self.directory = directory
+        self.dimension = dimension
+        self.quantization = quantization
+        self.oversample = oversample
+        self.index = index
+        self.hnsw_params = hnsw_params or {}
+        self.shards = None
+        if workers > 1 and index == "flat":
+            from .sharding import ShardPool
+
+            self.shards = ShardPool(workers, min_rows=shard_min_rows)
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str) -> _Namespace:
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = _Namespace(
+                    os.path.join(self.directory, name),
+                    self.dimension,
+                    self.quantization,
+                    index=self.index,
+                    hnsw_params=self.hnsw_params,
+                )
+                self._namespaces[name].shards = self.shards
+            return self._namespaces[name]
+
+    def upsert(self, vectors: List[JsonDict], namespace: str = "") -> JsonDict:
+        if not vectors:
+            return {"upserted_count": 0}
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        if values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {values.shape[1]} does not match index dimension {self.dimension}")
+        self.namespace(namespace).upsert(
+            [vector["id"] for vector in vectors],
+            values,
+            [vector.get("metadata", {}) for vector in vectors],
+        )
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], namespace: str = "") -> JsonDict:
+        self.namespace(namespace).delete(ids)
+        return {}
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        namespace: str = "",
+        include_metadata: bool = False,
+        oversample: Optional[int] = None,
+        ef: Optional[int] = None,
+    ) -> JsonDict:
+        store = self.namespace(namespace)
+        results = search_rows(
+            store, np.asarray(vector, dtype=np.float32), top_k, oversample or self.oversample, ef=ef
+        )
+        matches = []
+        for row, score in results:
+            match = {"id": store.ids[row], "score": score}
+            if include_metadata:
+                match["metadata"] = store.metadata(row)
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def describe_index_stats(self) -> JsonDict:
+        namespaces = {}
+        for name in sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []:
+            store = self.namespace(name)
+            store.refresh()
+            namespaces[name] = {"vector_count": int(store.count - store.deleted.view().sum())}
+        return {"dimension": self.dimension, "namespaces": namespaces}
+
+    def close(self) -> None:
+        with self._lock:
+            namespaces = list(self._namespaces.values())
+        for store in namespaces:
+            store.close()
+        if self.shards is not None:
+            self.shards.close()
+
+    def memory_bytes(self, namespace: str = "") -> int:
+        """Bytes of vector data held in memory (codes and scales, not the mmap)"""
+        store = self.namespace(namespace)
+        if store.quantization == "none":
+            return 0
+        size = store.codes.view().nbytes
+        if store.quantization == "int8":
+            size += store.scales.view().nbytes
+        return size
+
+
+def recall_at_k(
+    store: LocalVectorStore,
+    namespace: str,
+    queries: np.ndarray,
+    top_k: int,
+    oversample: Optional[int] = None,
+    ef: Optional[int] = None,
+) -> float:
+    """Fraction of the exact top-k that the approximate search returns, averaged over queries"""
+    data = store.namespace(namespace)
+    hits = 0
+    total = 0
+    for query in queries:
+        exact = {row for row, _ in search_rows(data, query, top_k, 1, exact=True)}
+        approx = {row for row, _ in search_rows(data, query, top_k, oversample or store.oversample, ef=ef)}
+        hits += len(exact & approx)
+        total += len(exact)
+    return hits / total if total else 1.0
@@ -1,50 +1,64 @@
 # backend/assessment/views.py
 
+import hmac
 import json
 import logging
+import math
 import os
+import queue
 import time
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import pinecone
 from pinecone import Pinecone, ServerlessSpec
 
 import chromadb
-from asgiref.sync import sync_to_async
+import numpy as np
 import asyncio
 from django.conf import settings
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from functools import wraps
 from google import generativeai as genai
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-from langchain_community.document_loaders import (
-    UnstructuredPDFLoader,
-    UnstructuredWordDocumentLoader,
-    UnstructuredExcelLoader,
-    UnstructuredPowerPointLoader,
-    CSVLoader,
-)
 
-from .models import UploadedFile
+from results.writebehind import record_scores
+
+from . import background, metrics
+from .admission import AdmissionController, admission_controlled
+from .cohort import group_cohort_answers
+from .deadlines import DeadlineExceeded, hedged, latency_budget, with_deadline
+from .dedup import MinHasher, MinHashLSH, find_near_duplicates
+from .loaders import TABULAR_CONTENT_TYPES, TabularRowGroupLoader, unstructured_loader
+from .models import RequestProfile, UploadedFile
+from .pregen import QuestionPool
+from .profiling import authorized, profiled, sync_to_async
+from .semantic_cache import SemanticCache
+from .singleflight import SingleFlight
+from .splitter import LinearTextSplitter
+from .vectorstore import LocalVectorStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Configure Google Generative AI
-os.environ["GEMINI_API_KEY"] = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+# Configure Google Generative AI (skipped without a key, e.g. offline load tests with fakes)
+if os.getenv("GOOGLE_API_KEY"):
+    os.environ["GEMINI_API_KEY"] = os.getenv("GOOGLE_API_KEY")
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
 
-pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"]) if settings.VECTOR_BACKEND == "pinecone" else None
 # os.environ["PINECONE_API_KEY"] = os.getenv("PINECONE_API_KEY")
 # pinecone.init(api_key=os.environ["PINECONE_API_KEY"], environment="us-east-1")
 INDEX_NAME = "document-embeddings"
 VECTOR_DIMENSION = 768
 VECTOR_METRIC = "cosine"
 NAMESPACE = "documents"  # Namespace for document embeddings
+EMBED_BATCH_LIMIT = 100  # Most texts accepted by one batch embedding request
+TABULAR_BATCH_SIZE = 200  # Row-group chunks embedded per batch for CSV/XLSX uploads
+CHUNK_SIZE = 1000  # Characters per chunk of parsed documents
+CHUNK_OVERLAP = 200
+_index_ready = False  # Set once describe_index has reported the index ready
 
 # if INDEX_NAME in pc.list_indexes().names():
 #     pc.delete_index(INDEX_NAME)
@@ -73,14 +87,90 @@ def init_pinecone():
         raise
 
 
-
-init_pinecone()
+def get_index() -> Any:
+    """Return the configured vector index: Pinecone, or the local store with the same API"""
+    if settings.VECTOR_BACKEND == "local":
+        return local_vector_store
+    return pc.Index(INDEX_NAME)
+
+
+if settings.VECTOR_BACKEND == "local":
+    local_vector_store = LocalVectorStore(
+        settings.LOCAL_VECTOR_DIR,
+        VECTOR_DIMENSION,
+        quantization=settings.LOCAL_VECTOR_QUANTIZATION,
+        oversample=settings.LOCAL_VECTOR_OVERSAMPLE,
+        index=settings.LOCAL_VECTOR_INDEX,
+        hnsw_params={
+            "M": settings.HNSW_M,
+            "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.HNSW_EF_SEARCH,
+        },
+        workers=settings.LOCAL_VECTOR_WORKERS,
+        shard_min_rows=settings.LOCAL_VECTOR_SHARD_MIN_ROWS,
+    )
+else:
+    init_pinecone()
 
 # Type definitions
 JsonDict = Dict[str, Any]
 QuestionType = (
     str  # "mcq" | "true_false" | "fill_in_blank" | "short_answer" | "long_answer"
 )
+ASSESSMENT_TYPES = ("mcq", "true_false", "fill_in_blank", "short_answer", "long_answer")
+# What each shard of a large generation concentrates on, by part number
+QUESTION_ASPECTS = (
+    "definitions and key terms",
+    "processes and mechanisms",
+    "causes and effects",
+    "applications and real-world examples",
+    "comparisons and contrasts",
+    "common misconceptions",
+    "problem solving and analysis",
+    "history and context",
+)
+
+admission_controller = (
+    AdmissionController(
+        capacity=settings.ADMISSION_MAX_IN_FLIGHT,
+        endpoints=settings.ADMISSION_ENDPOINTS,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    )
+    if settings.ADMISSION_CONTROL_ENABLED
+    else None
+)
+
+# Questions generated in the background right after an upload, served by /generate/
+question_pool = QuestionPool(ttl=settings.PREGENERATION_TTL)
+semantic_cache = SemanticCache(
+    threshold=settings.SEMANTIC_CACHE_SIMILARITY,
+    ttl=settings.SEMANTIC_CACHE_TTL,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    stale_similarity=settings.SEMANTIC_CACHE_STALE_SIMILARITY,
+)
+
+# Identical concurrent embed / retrieve / LLM calls share one upstream call
+embed_flight = SingleFlight("embed")
+retrieve_flight = SingleFlight("retrieve")
+llm_flight = SingleFlight("llm")
+
+minhasher = MinHasher()
+_dedup_indexes: Dict[str, MinHashLSH] = {}
+
+
+def get_dedup_index(namespace: str) -> MinHashLSH:
+    """Return the near-duplicate index for a namespace, loading it from disk on first use"""
+    index = _dedup_indexes.get(namespace)
+    if index is None:
+        os.makedirs(settings.CHUNK_DEDUP_DIR, exist_ok=True)
+        index = _dedup_indexes.setdefault(
+            namespace,
+            MinHashLSH(
+                threshold=settings.CHUNK_DEDUP_THRESHOLD,
+                path=os.path.join(settings.CHUNK_DEDUP_DIR, f"{namespace}.minhash"),
+            ),
+        )
+    return index
 
 
 def async_view(view_func: Callable) -> Callable:
@@ -101,38 +191,78 @@ async def generate_gemini_embeddings(
     task_type: str = "retrieval_document",
 ) -> Optional[List[float]]:
     """Generate embeddings using Google's Gemini embedding model"""
+    try:
+        return await _embed_content(content, title, model, task_type)
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}")
+        return None
+
+
+async def _embed_content(
+    content: Union[str, List[str]],
+    title: str = "",
+    model: str = "models/embedding-001",
+    task_type: str = "retrieval_document",
+) -> Union[List[float], List[List[float]]]:
+    """generate_gemini_embeddings without the error handling: raises on failure, as hedged needs"""
     try:
         # Handle single string or list of strings
         if isinstance(content, list):
-            # Process multiple texts
+            # Process multiple texts, one batch request per EMBED_BATCH_LIMIT texts
             embeddings = []
-            for text in content:
-                result = await sync_to_async(genai.embed_content)(
-                    model=model, content=text, task_type=task_type, title=title
+            for start in range(0, len(content), EMBED_BATCH_LIMIT):
+                result = await sync_to_async(genai.embed_content, thread_sensitive=False)(
+                    model=model, content=content[start:start + EMBED_BATCH_LIMIT], task_type=task_type, title=title
                 )
-                embedding = result["embedding"]
-                # Verify embedding dimension
-                if len(embedding) != VECTOR_DIMENSION:
-                    raise ValueError(f"Generated embedding dimension {len(embedding)} does not match expected {VECTOR_DIMENSION}")
-                embeddings.append(embedding)
+                metrics.incr("embedding_calls_total", task_type=task_type)
+                metrics.incr("embedding_texts_total", len(result["embedding"]), task_type=task_type)
+                for embedding in result["embedding"]:
+                    # Verify embedding dimension
+                    if len(embedding) != VECTOR_DIMENSION:
+                        raise ValueError(f"Generated embedding dimension {len(embedding)} does not match expected {VECTOR_DIMENSION}")
+                    embeddings.append(embedding)
             return embeddings
         else:
             # Process single text
-            result = await sync_to_async(genai.embed_content)(
+            result = await sync_to_async(genai.embed_content, thread_sensitive=False)(
                 model=model, content=content, task_type=task_type, title=title
             )
+            metrics.incr("embedding_calls_total", task_type=task_type)
+            metrics.incr("embedding_texts_total", task_type=task_type)
             embedding = result["embedding"]
             # Verify embedding dimension
             if len(embedding) != VECTOR_DIMENSION:
                 raise ValueError(f"Generated embedding dimension {len(embedding)} does not match expected {VECTOR_DIMENSION}")
             return embedding
+    except Exception:
+        metrics.incr("embedding_errors_total", task_type=task_type)
+        raise
+
+
+async def make_api_request(prompt: str, stage: str = "generate") -> Optional[str]:
+    """Make API request to Google's Generative AI, sharing identical in-flight prompts.
+
+    The call is hedged and bounded by the stage deadline; None is returned
+    when it fails or cannot finish in time.
+    """
+    model_name = settings.GOOGLE_GENERATIVE_AI_MODEL
+    try:
+        return await with_deadline(
+            stage,
+            llm_flight.do((model_name, prompt), lambda: hedged(stage, lambda: _generate_content(prompt, stage))),
+        )
+    except DeadlineExceeded as e:
+        logger.warning(f"API request error: {e}")
+        return None
     except Exception as e:
-        logger.error(f"Error generating embeddings: {e}")
+        logger.error(f"API request error: {e}")
         return None
 
 
-async def make_api_request(prompt: str) -> Optional[str]:
-    """Make API request to Google's Generative AI"""
+async def _generate_content(prompt: str, stage: str = "generate") -> str:
+    """One LLM attempt; raises on failure so hedged can fall back to the other attempt"""
+    started = time.perf_counter()
+    metrics.incr("llm_calls_total", stage=stage)
     try:
         model_instance = genai.GenerativeModel(
             model_name=settings.GOOGLE_GENERATIVE_AI_MODEL
@@ -141,14 +271,68 @@ async def make_api_request(prompt: str) -> Optional[str]:
         if asyncio.iscoroutinefunction(model_instance.generate_content):
             response = await model_instance.generate_content(prompt)
         else:
-            response = await sync_to_async(model_instance.generate_content)(prompt)
+            # Not thread-sensitive, so concurrent prompts are not serialized on one thread
+            response = await sync_to_async(model_instance.generate_content, thread_sensitive=False)(prompt)
 
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            metrics.incr("llm_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, stage=stage, kind="prompt")
+            metrics.incr("llm_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, stage=stage, kind="output")
         return response.text.strip()
+    except Exception:
+        metrics.incr("llm_errors_total", stage=stage)
+        raise
+    finally:
+        metrics.observe("llm_call_duration_seconds", time.perf_counter() - started, stage=stage)
+
+
+async def embed_query(text: str) -> Optional[List[float]]:
+    """Embed a single query text, sharing the call with identical in-flight requests"""
+    try:
+        return await with_deadline(
+            "embed",
+            embed_flight.do(text, lambda: hedged("embed", lambda: _embed_content(text))),
+        )
+    except DeadlineExceeded as e:
+        logger.warning(f"Error generating embeddings: {e}")
+        return None
     except Exception as e:
-        logger.error(f"API request error: {e}")
+        logger.error(f"Error generating embeddings: {e}")
         return None
 
 
+async def retrieve_passages(topic: str, topic_embedding: List[float], top_k: int = 3) -> List[str]:
+    """Query the index for a topic and return the matching texts, best first"""
+
+    async def query() -> List[str]:
+        index = get_index()
+        query_response = await sync_to_async(index.query)(
+            vector=topic_embedding,
+            top_k=top_k,
+            namespace=NAMESPACE,
+            include_metadata=True
+        )
+        return [
+            match['metadata']['text']
+            for match in query_response['matches']
+        ]
+
+    try:
+        return await with_deadline(
+            "retrieve",
+            retrieve_flight.do((NAMESPACE, topic, top_k), lambda: hedged("retrieve", query)),
+        )
+    except DeadlineExceeded as e:
+        # Degrade to generating or scoring without retrieved context
+        logger.warning(f"Retrieval skipped: {e}")
+        return []
+
+
+async def retrieve_context(topic: str, topic_embedding: List[float], top_k: int = 3) -> str:
+    """Query the index for a topic and join the matching texts into one context string"""
+    return " ".join(await retrieve_passages(topic, topic_embedding, top_k))
+
+
 def parse_generated_text(
     generated_text: str, assessment_type: QuestionType
 ) -> List[JsonDict]:
@@ -236,7 +420,7 @@ async def process_answer(answer: JsonDict, topic: str) -> JsonDict:
             f"Provide a probability score between 0 and 1. Return only the number."
         )
 
-        score_text = await make_api_request(prompt)
+        score_text = await make_api_request(prompt, stage="score")
         logger.info(f"Score Text: {score_text}")
         if score_text is not None:
             try:
@@ -256,58 +440,195 @@ async def process_answer(answer: JsonDict, topic: str) -> JsonDict:
         return {"score": 0, "is_correct": False, "verified_by_llm": False}
 
 
-async def process_documents(documents: List[Any]) -> None:
-    """Process and embed documents for storage"""
-    try:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
-        )
-        chunks = text_splitter.split_documents(documents)
-        texts = [chunk.page_content for chunk in chunks]
+async def wait_for_index_ready(poll_interval: float = 1.0) -> None:
+    """Wait for the Pinecone index to report ready without blocking the event loop"""
+    global _index_ready
+    if settings.VECTOR_BACKEND == "local":
+        return
+    while not _index_ready:
+        description = await sync_to_async(pc.describe_index, thread_sensitive=False)(INDEX_NAME)
+        if description.status["ready"]:
+            _index_ready = True
+        else:
+            await asyncio.sleep(poll_interval)
 
-        # Generate embeddings for all texts
-        embeddings = await generate_gemini_embeddings(texts)
-        if not embeddings:
-            raise ValueError("Failed to generate embeddings")
 
-        # Verify all embeddings have correct dimension
-        for i, embedding in enumerate(embeddings):
-            if len(embedding) != VECTOR_DIMENSION:
-                raise ValueError(f"Embedding {i} has incorrect dimension: {len(embedding)}")
+async def upsert_with_retry(index: Any, batch: List[JsonDict], batch_number: int) -> None:
+    """Upsert one batch, retrying only that batch with exponential backoff"""
+    for attempt in range(settings.UPSERT_MAX_RETRIES + 1):
+        try:
+            # Not thread-sensitive, so several batches can be in flight at once
+            await sync_to_async(index.upsert, thread_sensitive=False)(
+                vectors=batch,
+                namespace=NAMESPACE
+            )
+            return
+        except Exception as e:
+            if attempt == settings.UPSERT_MAX_RETRIES:
+                logger.error(f"Error upserting batch {batch_number}: {e}")
+                raise
+            logger.warning(f"Retrying batch {batch_number} after upsert error (attempt {attempt + 1}): {e}")
+            metrics.incr("upsert_retries_total")
+            await asyncio.sleep(settings.UPSERT_RETRY_BACKOFF * 2 ** attempt)
 
-        while not pc.describe_index(INDEX_NAME).status["ready"]:
-            time.sleep(1)
-        
-        # Get Pinecone index
-        index = pc.Index(INDEX_NAME)
-
-        # Prepare vectors for upsert
-        vectors = []
-        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-            vectors.append({
-                "id": f"doc_{i}",
-                "values": embedding,
-                "metadata": {"text": text}
-            })
-
-        # Upsert in batches of 100
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            try:
-                await sync_to_async(index.upsert)(
-                    vectors=batch,
-                    namespace=NAMESPACE
+
+async def process_documents(
+    documents: List[Any],
+    id_prefix: str = "doc",
+    collect: Optional[List[str]] = None,
+    written: Optional[JsonDict] = None,
+    dedup_ignore: Sequence[Tuple[int, int]] = (),
+) -> JsonDict:
+    """Process and embed documents for storage, returning chunk and dedup counts.
+
+    Chunk ids are ``{id_prefix}_{n}`` for the n-th chunk before dedup, so
+    processing the same documents again overwrites the same vectors. When
+    collect is given, stored chunk texts are appended to it (up to
+    PREGENERATION_MAX_PASSAGES) for background question pre-generation.
+    When written is given, the ids of each upsert are appended to its "ids"
+    before the upsert starts, and the [start, stop) dedup index positions
+    of the stored chunks are set as its "dedup". Dedup index positions in
+    the dedup_ignore ranges do not count as duplicates.
+    """
+    try:
+        text_splitter = LinearTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+        )
+        with metrics.span("split", operation="ingest"):
+            chunks = text_splitter.split_documents(documents)
+            texts = [chunk.page_content for chunk in chunks]
+
+        # Drop near-duplicate chunks (repeated headers, footers, slide templates) before embedding
+        signatures = []
+        stats = {
+            "chunks": len(texts),
+            "duplicates_within_upload": 0,
+            "duplicates_of_existing": 0,
+            "dedup_ratio": 0.0,
+        }
+        if settings.CHUNK_DEDUP_ENABLED and texts:
+            dedup_index = get_dedup_index(NAMESPACE)
+            with metrics.span("dedup", operation="ingest"):
+                keep, signatures, stats = await sync_to_async(find_near_duplicates, thread_sensitive=False)(
+                    texts, dedup_index, minhasher, dedup_ignore
                 )
-            except Exception as e:
-                logger.error(f"Error upserting batch {i//batch_size}: {e}")
-                raise
+            texts = [texts[i] for i in keep]
+        else:
+            keep = list(range(len(texts)))
+        if not texts:
+            return {**stats, "stored": 0}
+
+        index = get_index()
+        index_ready = asyncio.create_task(wait_for_index_ready())
+        # Bounds upserts in flight; embedding waits here when upserts fall behind
+        in_flight = asyncio.Semaphore(settings.UPSERT_CONCURRENCY)
+        batch_size = settings.UPSERT_BATCH_SIZE
+        upserts = []
+
+        async def upsert_when_ready(batch: List[JsonDict], batch_number: int) -> None:
+            try:
+                await asyncio.shield(index_ready)
+                with metrics.span("upsert", operation="ingest"):
+                    await upsert_with_retry(index, batch, batch_number)
+                # Cached generations on topics this batch covers would now see different context
+                semantic_cache.invalidate_near([vector["values"] for vector in batch])
+            finally:
+                in_flight.release()
+
+        try:
+            # Embed batch by batch, handing each one to an upsert task as soon as it is ready
+            for batch_number, start in enumerate(range(0, len(texts), batch_size)):
+                batch_texts = texts[start:start + batch_size]
+                with metrics.span("embed", operation="ingest"):
+                    embeddings = await generate_gemini_embeddings(batch_texts)
+                if not embeddings:
+                    raise ValueError("Failed to generate embeddings")
+
+                # Verify all embeddings have correct dimension
+                for i, embedding in enumerate(embeddings):
+                    if len(embedding) != VECTOR_DIMENSION:
+                        raise ValueError(f"Embedding {start + i} has incorrect dimension: {len(embedding)}")
+
+                batch = [
+                    {
+                        "id": f"{id_prefix}_{keep[start + i]}",
+                        "values": embedding,
+                        "metadata": {"text": text}
+                    }
+                    for i, (text, embedding) in enumerate(zip(batch_texts, embeddings))
+                ]
+
+                with metrics.span("upsert_backpressure", operation="ingest"):
+                    await in_flight.acquire()
+                if written is not None:
+                    written.setdefault("ids", []).extend(vector["id"] for vector in batch)
+                # Stop embedding as soon as an upsert has given up
+                for task in upserts:
+                    if task.done() and not task.cancelled() and task.exception():
+                        in_flight.release()
+                        raise task.exception()
+                upserts.append(asyncio.create_task(upsert_when_ready(batch, batch_number)))
+
+            await asyncio.gather(*upserts)
+        except BaseException:
+            for task in [index_ready, *upserts]:
+                task.cancel()
+            await asyncio.gather(index_ready, *upserts, return_exceptions=True)
+            raise
+
+        metrics.incr("ingested_chunks_total", len(texts))
+        if signatures:
+            position = dedup_index.add(signatures)
+            if written is not None:
+                written["dedup"] = [position, position + len(signatures)]
+        if collect is not None:
+            collect.extend(texts[:max(0, settings.PREGENERATION_MAX_PASSAGES - len(collect))])
+        return {**stats, "stored": len(texts)}
 
     except Exception as e:
         logger.error(f"Error processing documents: {e}")
         raise
 
 
+def merge_ingest_stats(total: JsonDict, stats: JsonDict) -> JsonDict:
+    """Accumulate per-batch process_documents counts into per-file totals"""
+    merged = {
+        key: total.get(key, 0) + stats.get(key, 0)
+        for key in ("chunks", "stored", "duplicates_within_upload", "duplicates_of_existing")
+    }
+    duplicates = merged["duplicates_within_upload"] + merged["duplicates_of_existing"]
+    merged["dedup_ratio"] = duplicates / merged["chunks"] if merged["chunks"] else 0.0
+    return merged
+
+
+async def process_tabular_file(
+    file_path: str, content_type: str, file_id: Any, collect: Optional[List[str]] = None
+) -> JsonDict:
+    """Stream a CSV/XLSX file through process_documents in bounded row-group batches"""
+    loader = TabularRowGroupLoader(file_path, content_type)
+    row_groups = loader.lazy_load()
+
+    def next_batch() -> List[Any]:
+        batch = []
+        for document in row_groups:
+            batch.append(document)
+            if len(batch) >= TABULAR_BATCH_SIZE:
+                break
+        return batch
+
+    totals: JsonDict = {}
+    batch_number = 0
+    while True:
+        # Read each batch on the same thread so the generator and its file handle stay put
+        batch = await sync_to_async(next_batch)()
+        if not batch:
+            break
+        stats = await process_documents(batch, id_prefix=f"doc_{file_id}_{batch_number}", collect=collect)
+        totals = merge_ingest_stats(totals, stats)
+        batch_number += 1
+    return merge_ingest_stats(totals, {})
+
+
 async def generate_prompt(
     assessment_type: QuestionType, question_count: int, topic: str, context: str
 ) -> str:
@@ -343,8 +664,176 @@ async def generate_prompt(
     return prompt_templates.get(assessment_type, "")
 
 
+async def generate_question_batch(
+    assessment_type: QuestionType,
+    question_count: int,
+    topic: str,
+    context: str,
+    avoid: Sequence[str] = (),
+    part: Optional[int] = None,
+) -> List[JsonDict]:
+    """Generate one batch of questions, optionally steering away from existing ones.
+
+    Shards of a larger set pass their part number, which gives every shard
+    its own prompt and focus: identical prompts would be coalesced by
+    llm_flight into one call returning the same questions to each shard.
+    """
+    prompt = await generate_prompt(assessment_type, question_count, topic, context)
+    if part is not None:
+        aspect = QUESTION_ASPECTS[(part - 1) % len(QUESTION_ASPECTS)]
+        prompt += (
+            f"\nThis is part {part} of a larger question set; focus on {aspect} "
+            f"so the parts do not overlap."
+        )
+    if avoid:
+        prompt += f"\nDo not repeat or rephrase any of these existing questions: {json.dumps(list(avoid))}"
+    generated_text = await make_api_request(prompt)
+    if generated_text is None:
+        return []
+    return parse_generated_text(generated_text, assessment_type)
+
+
+async def dedupe_questions(
+    questions: List[JsonDict],
+    threshold: float,
+    kept: Sequence[JsonDict] = (),
+    kept_vectors: Optional[np.ndarray] = None,
+) -> Tuple[List[JsonDict], Optional[np.ndarray]]:
+    """Append to kept the questions whose text embedding is not within threshold cosine
+    similarity of a kept or earlier one.
+
+    Only the new questions are embedded. Returns every kept question and
+    their normalized embeddings, or None for those when embeddings were
+    unavailable and exact-text dedup was used instead.
+    """
+    kept = list(kept)
+    texts = [str(question.get("text", "")) for question in questions]
+    if not texts:
+        return kept, kept_vectors
+    try:
+        embeddings = await with_deadline("embed", generate_gemini_embeddings(texts))
+    except DeadlineExceeded as e:
+        logger.warning(f"Question dedup falling back to exact text: {e}")
+        embeddings = None
+    if not embeddings or (kept and kept_vectors is None):
+        # Fall back to exact-text dedup when embeddings are unavailable
+        seen = {" ".join(str(question.get("text", "")).lower().split()) for question in kept}
+        for question, text in zip(questions, texts):
+            key = " ".join(text.lower().split())
+            if key not in seen:
+                seen.add(key)
+                kept.append(question)
+        return kept, None
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    if kept_vectors is not None:
+        vectors = np.concatenate([kept_vectors, vectors])
+    base = len(kept)
+    chosen = list(range(base))
+    for i in range(base, len(vectors)):
+        if chosen and float(np.max(vectors[chosen] @ vectors[i])) >= threshold:
+            continue
+        chosen.append(i)
+        kept.append(questions[i - base])
+    return kept, vectors[chosen]
+
+
+async def generate_questions_sharded(
+    assessment_type: QuestionType,
+    question_count: int,
+    topic: str,
+    topic_embedding: Optional[List[float]] = None,
+    passages: Optional[List[str]] = None,
+) -> List[JsonDict]:
+    """Generate a large question set as parallel sub-generations over different context slices.
+
+    Each shard asks for at most GENERATION_SHARD_SIZE questions from its own
+    slice of the passages (retrieved for the topic unless given) and its own
+    part number; at most GENERATION_SHARD_CONCURRENCY run at once. The merged
+    set is deduplicated by embedding similarity and any shortfall is topped up.
+    """
+    shard_size = settings.GENERATION_SHARD_SIZE
+    shard_count = math.ceil(question_count / shard_size)
+    if passages is None:
+        passages = await retrieve_passages(
+            topic, topic_embedding, top_k=min(3 * shard_count, settings.GENERATION_MAX_PASSAGES)
+        )
+
+    def context_for(shard: int) -> str:
+        if not passages:
+            return ""
+        return " ".join(passages[shard::shard_count] or [passages[shard % len(passages)]])
+
+    limit = asyncio.Semaphore(settings.GENERATION_SHARD_CONCURRENCY)
+    parts = 0
+
+    async def shard_batch(count: int, context: str, avoid: Sequence[str] = ()) -> List[JsonDict]:
+        nonlocal parts
+        parts += 1
+        part = parts
+        async with limit:
+            return await generate_question_batch(assessment_type, count, topic, context, avoid=avoid, part=part)
+
+    shard_counts = [shard_size] * (shard_count - 1) + [question_count - shard_size * (shard_count - 1)]
+    batches = await asyncio.gather(*[
+        shard_batch(count, context_for(shard)) for shard, count in enumerate(shard_counts)
+    ])
+    questions, vectors = await dedupe_questions(
+        [question for batch in batches for question in batch],
+        settings.QUESTION_DEDUP_SIMILARITY,
+    )
+
+    for round_number in range(settings.GENERATION_TOPUP_ROUNDS):
+        shortfall = question_count - len(questions)
+        if shortfall <= 0 or not questions:
+            break
+        logger.info(f"Topping up {shortfall} questions (round {round_number + 1})")
+        extra_shards = math.ceil(shortfall / shard_size)
+        avoid = [str(question.get("text", "")) for question in questions]
+        extra = await asyncio.gather(*[
+            shard_batch(
+                min(shard_size, shortfall - shard * shard_size),
+                context_for((round_number + 1 + shard) % shard_count),
+                avoid=avoid,
+            )
+            for shard in range(extra_shards)
+        ])
+        questions, vectors = await dedupe_questions(
+            [question for batch in extra for question in batch],
+            settings.QUESTION_DEDUP_SIMILARITY,
+            kept=questions,
+            kept_vectors=vectors,
+        )
+
+    return questions[:question_count]
+
+
+async def pregenerate_questions(topic: str, passages: List[str]) -> None:
+    """Fill the question pool for every assessment type from freshly ingested passages"""
+
+    async def fill(assessment_type: QuestionType) -> None:
+        questions = await generate_questions_sharded(
+            assessment_type, settings.PREGENERATION_POOL_SIZE, topic, passages=passages
+        )
+        if questions:
+            question_pool.put(topic, assessment_type, questions)
+            logger.info(f"Pre-generated {len(questions)} {assessment_type} questions for '{topic}'")
+        if len(questions) < settings.PREGENERATION_POOL_SIZE:
+            logger.warning(
+                f"Pre-generated only {len(questions)} of {settings.PREGENERATION_POOL_SIZE} "
+                f"{assessment_type} questions for '{topic}'"
+            )
+
+    await asyncio.gather(*[fill(assessment_type) for assessment_type in ASSESSMENT_TYPES])
+
+
 class GenerateAssessmentView(APIView):
+    @metrics.timed_view("generate")
+    @admission_controlled(admission_controller, "generate")
+    @profiled("generate")
     @async_view
+    @latency_budget(settings.REQUEST_LATENCY_BUDGETS["generate"])
     async def post(self, request: HttpRequest) -> Response:
         try:
             topic = request.data.get("topic")
@@ -356,44 +845,94 @@ class GenerateAssessmentView(APIView):
                     {"error": "Missing required fields"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if assessment_type not in ASSESSMENT_TYPES:
+                # Also keeps arbitrary values out of the pool, cache scopes and metric labels
+                return Response(
+                    {"error": f"assessmentType must be one of {', '.join(ASSESSMENT_TYPES)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                question_count = int(question_count)
+            except (TypeError, ValueError):
+                question_count = 0
+            if not 1 <= question_count <= settings.GENERATION_MAX_QUESTIONS:
+                return Response(
+                    {"error": f"questionCount must be between 1 and {settings.GENERATION_MAX_QUESTIONS}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            # Generate embedding for the topic using Pinecone's inference API
-            topic_embeddings = await generate_gemini_embeddings([topic])
-            if not topic_embeddings:
+            # Serve from questions pre-generated after the last upload on this topic
+            if settings.PREGENERATION_ENABLED:
+                with metrics.span("pool_lookup", operation="generate"):
+                    pooled = question_pool.take(topic, assessment_type, question_count)
+                if pooled is not None:
+                    return Response(
+                        {
+                            "questions": pooled,
+                            "assessmentType": assessment_type
+                        },
+                        status=status.HTTP_200_OK
+                    )
+
+            # Generate embedding for the topic
+            with metrics.span("embed", operation="generate"):
+                topic_embedding = await embed_query(topic)
+            if not topic_embedding:
                 return Response(
                     {"error": "Failed to generate embeddings"},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-            # Query Pinecone
-            index = pc.Index(INDEX_NAME)
-            query_response = await sync_to_async(index.query)(
-                vector=topic_embeddings[0],
-                top_k=3,
-                namespace=NAMESPACE,
-                include_metadata=True
-            )
+            # Serve from an earlier generation on a topic with nearly the same meaning
+            cache_scope = f"{NAMESPACE}:{assessment_type}"
+            cache_generation = semantic_cache.generation
+            if settings.SEMANTIC_CACHE_ENABLED:
+                with metrics.span("cache_lookup", operation="generate"):
+                    cached = semantic_cache.lookup(topic_embedding, cache_scope, question_count)
+                if cached is not None:
+                    return Response(
+                        {
+                            "questions": cached,
+                            "assessmentType": assessment_type
+                        },
+                        status=status.HTTP_200_OK
+                    )
+
+            if question_count > settings.GENERATION_SHARD_SIZE:
+                # Large requests are split into parallel sub-generations
+                with metrics.span("generate_sharded", operation="generate"):
+                    questions = await generate_questions_sharded(
+                        assessment_type, question_count, topic, topic_embedding
+                    )
+                if not questions:
+                    return Response(
+                        {"error": "Failed to generate questions"},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
+            else:
+                # Query Pinecone for relevant texts
+                with metrics.span("retrieve", operation="generate"):
+                    context = await retrieve_context(topic, topic_embedding)
+
+                # Continue with question generation...
+                prompt = await generate_prompt(assessment_type, question_count, topic, context)
+                with metrics.span("llm", operation="generate"):
+                    generated_text = await make_api_request(prompt)
+
+                if generated_text is None:
+                    return Response(
+                        {"error": "Failed to generate questions"},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
 
-            # Extract relevant texts from query results
-            context = " ".join([
-                match['metadata']['text']
-                for match in query_response['matches']
-            ]) if query_response['matches'] else ""
+                with metrics.span("parse", operation="generate"):
+                    questions = parse_generated_text(generated_text, assessment_type)
 
-            # Continue with question generation...
-            prompt = await generate_prompt(assessment_type, question_count, topic, context)
-            generated_text = await make_api_request(prompt)
+            if settings.SEMANTIC_CACHE_ENABLED:
+                semantic_cache.store(topic, topic_embedding, cache_scope, questions, cache_generation)
 
-            if generated_text is None:
-                return Response(
-                    {"error": "Failed to generate questions"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+            logger.debug(f"Generated {len(questions)} {assessment_type} questions for '{topic}'")
 
-            questions = parse_generated_text(generated_text, assessment_type)
-            
-            print("Questions: ", questions)
-            
             return Response(
                 {
                     "questions": questions,
@@ -410,10 +949,98 @@ class GenerateAssessmentView(APIView):
             )
 
 
+async def score_answer(answer: JsonDict, topic: str, context: str) -> JsonDict:
+    """Process and score individual answers with RAG context"""
+    try:
+        question_type = answer.get("type")
+        question_text = answer.get("text")
+        user_answer = answer.get("user_answer")
+        correct_answer = answer.get("correct_answer")
+
+        if not all([question_type, question_text, user_answer, correct_answer]):
+            logger.warning("Missing fields in answer")
+            return {"score": 0, "is_correct": False, "verified_by_llm": False}
+
+        # Enhanced prompt using RAG context
+        prompt = (
+            f"Based on the following context and information, evaluate the answer's correctness:\n\n"
+            f"Context: {context}\n\n"
+            f"Topic: {topic}\n"
+            f"Question Type: {question_type}\n"
+            f"Question: {question_text}\n"
+            f"Correct Answer: {correct_answer}\n"
+            f"User's Answer: {user_answer}\n\n"
+            f"Assessment Instructions:\n"
+            f"1. Compare the user's answer with both the correct answer and the context provided\n"
+            f"2. For objective questions (MCQ, True/False), ensure exact matching\n"
+            f"3. For subjective questions (Short/Long Answer), evaluate based on key concepts present in the context\n"
+            f"4. Consider partial credit for answers that demonstrate understanding but may not be complete\n\n"
+            f"Return a JSON object with the following fields:\n"
+            f"- score: probability between 0 and 1\n"
+            f"- explanation: brief explanation of the scoring\n"
+            f"- key_matches: list of key concepts correctly mentioned"
+        )
+
+        response_text = await make_api_request(prompt, stage="score")
+        # print("Response Text: ", response_text)
+        if response_text is None:
+            return {"score": 0, "is_correct": False, "verified_by_llm": False}
+
+        try:
+            try:
+                response = parse_generated_evaluation_response_text(response_text)
+                # print("Response: ", response)
+            except Exception as e:
+                logger.error(f"Error decoding LLM response: {e}")
+                
+            
+            score = float(response.get("score", 0))
+            is_correct = score >= 0.7  # Adjusted threshold with context
+            feedback =  {
+                "score": score,
+                "is_correct": is_correct,
+                "verified_by_llm": True,
+                "explanation": response.get("explanation", ""),
+                "key_matches": response.get("key_matches", []),
+                "confidence": score
+            }
+            return feedback
+        except Exception as e:
+            logger.error(f"Error processing LLM response: {e}")
+            return {"score": 0, "is_correct": False, "verified_by_llm": False, "explanation": "Error processing LLM response"}
+
+    except Exception as e:
+        logger.error(f"Error processing answer: {e}")
+        return {"score": 0, "is_correct": False, "verified_by_llm": False, "explanation": str(e)}
+
+
+def summarize_results(results: List[JsonDict]) -> JsonDict:
+    """Aggregate per-answer scores into the feedback returned for one submission"""
+    # Calculate weighted score based on confidence
+    total_score = sum(result["score"] for result in results)
+    average_score = total_score / len(results) if results else 0
+
+    # Aggregate feedback
+    return {
+        "overall_score": average_score,
+        "confidence": sum(result.get("confidence", 0) for result in results) / len(results) if results else 0,
+        "detailed_results": results,
+        "summary": {
+            "total_questions": len(results),
+            "correct_answers": sum(1 for result in results if result["is_correct"]),
+            "needs_improvement": sum(1 for result in results if not result["is_correct"])
+        }
+    }
+
+
 class ScoreAnswersView(APIView):
     """View for scoring assessment answers using RAG context"""
 
+    @metrics.timed_view("score")
+    @admission_controlled(admission_controller, "score")
+    @profiled("score")
     @async_view
+    @latency_budget(settings.REQUEST_LATENCY_BUDGETS["score"])
     async def post(self, request: HttpRequest) -> Response:
         try:
             logger.info("ScoreAnswersView called")
@@ -428,7 +1055,8 @@ class ScoreAnswersView(APIView):
                 )
 
             # Generate embedding for the topic
-            topic_embedding = await generate_gemini_embeddings(topic)
+            with metrics.span("embed", operation="score"):
+                topic_embedding = await embed_query(topic)
             if not topic_embedding:
                 return Response(
                     {"error": "Failed to generate topic embeddings"},
@@ -436,110 +1064,25 @@ class ScoreAnswersView(APIView):
                 )
 
             # Query Pinecone for relevant context
-            index = pc.Index(INDEX_NAME)
-            query_response = await sync_to_async(index.query)(
-                vector=topic_embedding,
-                top_k=3,
-                namespace=NAMESPACE,
-                include_metadata=True
-            )
-
-            # Extract relevant context
-            context = " ".join([
-                match['metadata']['text']
-                for match in query_response['matches']
-            ]) if query_response['matches'] else ""
-
-            async def process_answer_with_context(answer: JsonDict, topic: str, context: str) -> JsonDict:
-                """Process and score individual answers with RAG context"""
-                try:
-                    question_type = answer.get("type")
-                    question_text = answer.get("text")
-                    user_answer = answer.get("user_answer")
-                    correct_answer = answer.get("correct_answer")
-
-                    if not all([question_type, question_text, user_answer, correct_answer]):
-                        logger.warning("Missing fields in answer")
-                        return {"score": 0, "is_correct": False, "verified_by_llm": False}
-
-                    # Enhanced prompt using RAG context
-                    prompt = (
-                        f"Based on the following context and information, evaluate the answer's correctness:\n\n"
-                        f"Context: {context}\n\n"
-                        f"Topic: {topic}\n"
-                        f"Question Type: {question_type}\n"
-                        f"Question: {question_text}\n"
-                        f"Correct Answer: {correct_answer}\n"
-                        f"User's Answer: {user_answer}\n\n"
-                        f"Assessment Instructions:\n"
-                        f"1. Compare the user's answer with both the correct answer and the context provided\n"
-                        f"2. For objective questions (MCQ, True/False), ensure exact matching\n"
-                        f"3. For subjective questions (Short/Long Answer), evaluate based on key concepts present in the context\n"
-                        f"4. Consider partial credit for answers that demonstrate understanding but may not be complete\n\n"
-                        f"Return a JSON object with the following fields:\n"
-                        f"- score: probability between 0 and 1\n"
-                        f"- explanation: brief explanation of the scoring\n"
-                        f"- key_matches: list of key concepts correctly mentioned"
-                    )
-
-                    response_text = await make_api_request(prompt)
-                    # print("Response Text: ", response_text)
-                    if response_text is None:
-                        return {"score": 0, "is_correct": False, "verified_by_llm": False}
-
-                    try:
-                        try:
-                            response = parse_generated_evaluation_response_text(response_text)
-                            # print("Response: ", response)
-                        except Exception as e:
-                            logger.error(f"Error decoding LLM response: {e}")
-                            
-                        
-                        score = float(response.get("score", 0))
-                        print("Score: ", score)
-                        is_correct = score >= 0.7  # Adjusted threshold with context
-                        feedback =  {
-                            "score": score,
-                            "is_correct": is_correct,
-                            "verified_by_llm": True,
-                            "explanation": response.get("explanation", ""),
-                            "key_matches": response.get("key_matches", []),
-                            "confidence": score
-                        }
-                        print("Feedback: ", feedback)
-                        return feedback
-                    except Exception as e:
-                        logger.error(f"Error processing LLM response: {e}")
-                        return {"score": 0, "is_correct": False, "verified_by_llm": False, "explanation": "Error processing LLM response"}
-
-                except Exception as e:
-                    logger.error(f"Error processing answer: {e}")
-                    return {"score": 0, "is_correct": False, "verified_by_llm": False, "explanation": str(e)}
+            with metrics.span("retrieve", operation="score"):
+                context = await retrieve_context(topic, topic_embedding)
 
             # Process all answers with context
-            tasks = [process_answer_with_context(answer, topic, context) for answer in answers]
-            results = await asyncio.gather(*tasks)
-            
-            print("Results: ", results)
-            # Calculate weighted score based on confidence
-            total_score = sum(result["score"] for result in results)
-            average_score = total_score / len(results) if results else 0
-            
-            # Aggregate feedback
-            feedback = {
-                "overall_score": average_score,
-                "confidence": sum(result.get("confidence", 0) for result in results) / len(results),
-                "detailed_results": results,
-                "summary": {
-                    "total_questions": len(results),
-                    "correct_answers": sum(1 for result in results if result["is_correct"]),
-                    "needs_improvement": sum(1 for result in results if not result["is_correct"])
-                }
-            }
-            
-            print(f"Final Feedback: {feedback}")
+            with metrics.span("llm", operation="score"):
+                tasks = [score_answer(answer, topic, context) for answer in answers]
+                results = await asyncio.gather(*tasks)
+
+            feedback = summarize_results(results)
+            with metrics.span("record", operation="score"):
+                record_scores(
+                    topic,
+                    answers,
+                    results,
+                    assessment_id=request.data.get("assessment_id"),
+                    student_id=request.data.get("student_id"),
+                )
 
-            logger.info(f"Scoring completed with average score: {average_score}")
+            logger.info(f"Scoring completed with average score: {feedback['overall_score']}")
 
             return Response(feedback, status=status.HTTP_200_OK)
 
@@ -550,9 +1093,107 @@ class ScoreAnswersView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
+@latency_budget(settings.REQUEST_LATENCY_BUDGETS["cohort"])
+async def score_cohort(topic: str, submissions: List[JsonDict], emit: Callable[[JsonDict], None]) -> None:
+    """Score a whole cohort, scoring each group of equivalent answers once.
+
+    Progress and the final per-student feedback are passed to emit as
+    events; the last event is always "result" or "error", unless the run is
+    cancelled, which also cancels every group still being scored.
+    """
+    try:
+        groups, stats = group_cohort_answers(submissions, minhasher, settings.COHORT_ANSWER_SIMILARITY)
+        logger.info(f"Cohort scoring: {stats['answers']} answers in {stats['groups']} groups")
+        emit({"event": "grouped", **stats})
+
+        topic_embedding = await embed_query(topic)
+        if not topic_embedding:
+            emit({"event": "error", "error": "Failed to generate topic embeddings"})
+            return
+        context = await retrieve_context(topic, topic_embedding)
+
+        semaphore = asyncio.Semaphore(settings.COHORT_SCORING_CONCURRENCY)
+
+        async def score_group(group: JsonDict) -> None:
+            async with semaphore:
+                group["result"] = await score_answer(group["answer"], topic, context)
+
+        tasks = [asyncio.ensure_future(score_group(group)) for group in groups]
+        try:
+            for scored, task in enumerate(asyncio.as_completed(tasks), start=1):
+                await task
+                emit({"event": "progress", "scored_groups": scored, "total_groups": len(groups)})
+        finally:
+            # On cancellation or an error, stop the groups still waiting for the semaphore or the LLM
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Fan each group's score back out to every student who gave that answer
+        results: List[List[Optional[JsonDict]]] = [
+            [None] * len(submission.get("answers") or []) for submission in submissions
+        ]
+        for group in groups:
+            for submission_index, answer_index in group["members"]:
+                results[submission_index][answer_index] = {**group["result"], "group_size": len(group["members"])}
+
+        students = [
+            {"student_id": submission.get("student_id"), **summarize_results(student_results)}
+            for submission, student_results in zip(submissions, results)
+        ]
+        for submission, student_results in zip(submissions, results):
+            record_scores(
+                topic,
+                submission.get("answers") or [],
+                student_results,
+                assessment_id=submission.get("assessment_id"),
+                student_id=submission.get("student_id"),
+            )
+        emit({"event": "result", "students": students, "stats": stats})
+    except Exception as e:
+        logger.error(f"Error in cohort scoring: {e}")
+        emit({"event": "error", "error": str(e)})
+
+
+class CohortScoreView(APIView):
+    """View for scoring a whole cohort's submissions, streamed as NDJSON progress events"""
+
+    @metrics.timed_view("cohort")
+    @admission_controlled(admission_controller, "score")
+    def post(self, request: HttpRequest) -> HttpResponse:
+        topic = request.data.get("topic")
+        submissions = request.data.get("submissions")
+
+        if not topic or not isinstance(submissions, list) or not submissions:
+            logger.warning("Missing 'submissions' or 'topic' in request")
+            return Response(
+                {"error": "Missing required fields"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        events: "queue.Queue[JsonDict]" = queue.Queue()
+        # Scoring outlives this call: the response body is produced while it runs
+        future = background.submit(score_cohort(topic, submissions, events.put))
+
+        def stream():
+            try:
+                while True:
+                    event = events.get()
+                    yield json.dumps(event) + "\n"
+                    if event["event"] in ("result", "error"):
+                        return
+            finally:
+                # Stop scoring if the client goes away before the result
+                future.cancel()
+
+        return StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+
+
 class FileUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
+    @metrics.timed_view("upload")
+    @profiled("upload")
     @async_view
     async def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> Response:
         try:
@@ -568,8 +1209,8 @@ class FileUploadView(APIView):
                 }, status=status.HTTP_200_OK)
 
             # First, verify Pinecone index dimensions
-            index_info = pc.describe_index(INDEX_NAME)
-            if index_info.dimension != VECTOR_DIMENSION:
+            index_info = pc.describe_index(INDEX_NAME) if pc is not None else None
+            if index_info is not None and index_info.dimension != VECTOR_DIMENSION:
                 logger.error(f"Index dimension mismatch. Index: {index_info.dimension}, Expected: {VECTOR_DIMENSION}")
                 return Response(
                     {"error": "Index dimension mismatch. Please recreate the index with correct dimensions."},
@@ -584,39 +1225,52 @@ class FileUploadView(APIView):
             # Process files
             processed_files = []
             failed_files = []
+            ingest_stats = {}
+            passages: Optional[List[str]] = [] if settings.PREGENERATION_ENABLED and topic else None
             
             for file in files:
                 try:
-                    uploaded_file = await save_file(file)
+                    with metrics.span("save", operation="upload"):
+                        uploaded_file = await save_file(file)
                     file_path = os.path.join(settings.MEDIA_ROOT, uploaded_file.file.name)
                     
-                    loader = None
-                    if file.content_type == "application/pdf":
-                        loader = UnstructuredPDFLoader(file_path)
-                    elif file.content_type in ["application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-                        loader = UnstructuredWordDocumentLoader(file_path)
-                    elif file.content_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-                        loader = UnstructuredExcelLoader(file_path)
-                    elif file.content_type == "application/vnd.openxmlformats-officedocument.presentationml.presentation":
-                        loader = UnstructuredPowerPointLoader(file_path)
-                    elif file.content_type == "text/csv":
-                        loader = CSVLoader(file_path)
-                    else:
+                    if file.content_type in TABULAR_CONTENT_TYPES:
+                        with metrics.span("ingest", operation="upload"):
+                            ingest_stats[file.name] = await process_tabular_file(
+                                file_path, file.content_type, uploaded_file.pk, collect=passages
+                            )
+                        processed_files.append(file.name)
+                        continue
+
+                    loader = unstructured_loader(file_path, file.content_type)
+                    if loader is None:
                         failed_files.append({"file": file.name, "error": "Unsupported file type"})
                         continue
 
-                    documents = await sync_to_async(loader.load)()
-                    await process_documents(documents)
+                    with metrics.span("load", operation="upload"):
+                        documents = await sync_to_async(loader.load)()
+                    # Ids are unique per upload so the dedup index never refers to overwritten vectors
+                    with metrics.span("ingest", operation="upload"):
+                        ingest_stats[file.name] = await process_documents(
+                            documents, id_prefix=f"doc_{uploaded_file.pk}", collect=passages
+                        )
                     processed_files.append(file.name)
                     
                 except Exception as e:
                     logger.error(f"Error processing file {file.name}: {e}")
                     failed_files.append({"file": file.name, "error": str(e)})
 
+            # Opt-in: pre-generate questions for the upload topic after the response is returned
+            pregenerating = bool(passages)
+            if pregenerating:
+                background.submit(pregenerate_questions(topic, passages))
+
             return Response({
                 "message": "File processing completed",
                 "processed_files": processed_files,
-                "failed_files": failed_files
+                "failed_files": failed_files,
+                "ingest_stats": ingest_stats,
+                "pregenerating": pregenerating
             }, status=status.HTTP_200_OK if processed_files else status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         except Exception as e:
@@ -624,4 +1278,57 @@ class FileUploadView(APIView):
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class ProfileListView(APIView):
+    """Recent request profiles, newest first; requires the profiling token"""
+
+    def get(self, request: HttpRequest) -> Response:
+        if not authorized(request):
+            return Response({"error": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        profiles = RequestProfile.objects.order_by("-created_at", "-pk")
+        view = request.query_params.get("view")
+        if view:
+            profiles = profiles.filter(view=view)
+        return Response([
+            {
+                "id": profile.pk,
+                "view": profile.view,
+                "trigger": profile.trigger,
+                "method": profile.method,
+                "path": profile.path,
+                "status_code": profile.status_code,
+                "wall_seconds": profile.wall_seconds,
+                "cpu_seconds": profile.cpu_seconds,
+                "samples": profile.samples,
+                "metadata": profile.metadata,
+                "created_at": profile.created_at,
+            }
+            for profile in profiles.defer("wall_stacks", "cpu_stacks")[:100]
+        ], status=status.HTTP_200_OK)
+
+
+class ProfileDownloadView(APIView):
+    """One profile's wall-clock or CPU stacks (?kind=wall|cpu) in folded flame graph format"""
+
+    def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        if not authorized(request):
+            return Response({"error": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        kind = request.query_params.get("kind", "wall")
+        if kind not in ("wall", "cpu"):
+            return Response({"error": "kind must be 'wall' or 'cpu'"}, status=status.HTTP_400_BAD_REQUEST)
+        profile = RequestProfile.objects.filter(pk=pk).first()
+        if profile is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(getattr(profile, f"{kind}_stacks"), content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}-{kind}.folded"'
+        return response
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Counters, gauges and timing histograms in the Prometheus text format; requires the metrics token"""
+    token = settings.METRICS_TOKEN
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse("Not authorized\n", status=status.HTTP_403_FORBIDDEN, content_type="text/plain")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -154,12 +154,128 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 GOOGLE_GENERATIVE_AI_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_GENERATIVE_AI_MODEL = "gemini-1.5-flash-8b"
 
+# Near-duplicate chunk elimination before embedding (see assessment/dedup.py)
+CHUNK_DEDUP_ENABLED = os.getenv("CHUNK_DEDUP_ENABLED", "True") == "True"
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.85"))
+CHUNK_DEDUP_DIR = os.path.join(BASE_DIR, "dedup_index")
+
+# Pinecone upserts are pipelined with embedding: batches of UPSERT_BATCH_SIZE vectors,
+# at most UPSERT_CONCURRENCY in flight, each retried independently on failure
+UPSERT_BATCH_SIZE = 100
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+UPSERT_MAX_RETRIES = 3
+UPSERT_RETRY_BACKOFF = 0.5  # seconds, doubled per attempt
+
+# Requests for more than GENERATION_SHARD_SIZE questions are generated as parallel shards, at most
+# GENERATION_SHARD_CONCURRENCY at once, deduplicated by embedding similarity and topped up for up to
+# GENERATION_TOPUP_ROUNDS rounds. Requests for more than GENERATION_MAX_QUESTIONS are rejected.
+GENERATION_SHARD_SIZE = int(os.getenv("GENERATION_SHARD_SIZE", "10"))
+GENERATION_SHARD_CONCURRENCY = int(os.getenv("GENERATION_SHARD_CONCURRENCY", "4"))
+GENERATION_MAX_QUESTIONS = int(os.getenv("GENERATION_MAX_QUESTIONS", "100"))
+GENERATION_MAX_PASSAGES = 30
+GENERATION_TOPUP_ROUNDS = 2
+QUESTION_DEDUP_SIMILARITY = float(os.getenv("QUESTION_DEDUP_SIMILARITY", "0.92"))
+
+# Opt-in: after an upload with a topic, pre-generate PREGENERATION_POOL_SIZE questions per
+# assessment type in the background so the following /generate/ call is served from the pool
+PREGENERATION_ENABLED = os.getenv("PREGENERATION_ENABLED") == "True"
+PREGENERATION_POOL_SIZE = 20
+PREGENERATION_MAX_PASSAGES = 30
+PREGENERATION_TTL = 60 * 60  # seconds
+
+# Per-stage deadlines and per-request latency budgets (seconds) for upstream calls.
+# A stage gets min(its deadline, what is left of the request budget). Calls running longer
+# than the stage's observed p95 are hedged with one duplicate once HEDGE_MIN_SAMPLES exist.
+# "cohort" bounds a whole streamed cohort scoring run; groups still unscored when it runs out
+# come back unverified.
+STAGE_DEADLINES = {
+    "embed": 10.0,
+    "retrieve": 5.0,
+    "generate": 60.0,
+    "score": 20.0,
+}
+REQUEST_LATENCY_BUDGETS = {
+    "generate": 90.0,
+    "score": 30.0,
+    "cohort": 600.0,
+}
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "True") == "True"
+HEDGE_MIN_SAMPLES = 20
+
+# Cohort scoring groups answers to the same question that are identical after normalization, or
+# whose MinHash similarity reaches COHORT_ANSWER_SIMILARITY, and scores each group once.
+COHORT_ANSWER_SIMILARITY = float(os.getenv("COHORT_ANSWER_SIMILARITY", "0.85"))
+COHORT_SCORING_CONCURRENCY = int(os.getenv("COHORT_SCORING_CONCURRENCY", "8"))
+
+# Semantic cache of generations: a topic within SEMANTIC_CACHE_SIMILARITY cosine of a cached topic
+# (same namespace and assessment type) reuses its questions. Ingesting a chunk within
+# SEMANTIC_CACHE_STALE_SIMILARITY of a cached topic drops that entry; set it to -1 to drop
+# every entry on any ingestion.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "True") == "True"
+SEMANTIC_CACHE_SIMILARITY = float(os.getenv("SEMANTIC_CACHE_SIMILARITY", "0.92"))
+SEMANTIC_CACHE_STALE_SIMILARITY = float(os.getenv("SEMANTIC_CACHE_STALE_SIMILARITY", "0.5"))
+SEMANTIC_CACHE_TTL = 24 * 60 * 60  # seconds
+SEMANTIC_CACHE_MAX_ENTRIES = 1000  # per namespace and assessment type
+
+# Scoring results are queued in memory and written by a background thread with bulk_create,
+# every RESULTS_FLUSH_INTERVAL seconds or once RESULTS_FLUSH_BATCH_SIZE are waiting.
+RESULTS_WRITE_BEHIND_ENABLED = os.getenv("RESULTS_WRITE_BEHIND_ENABLED", "True") == "True"
+RESULTS_FLUSH_BATCH_SIZE = 500
+RESULTS_FLUSH_INTERVAL = 2.0  # seconds
+RESULTS_MAX_PENDING = 50000  # oldest unwritten results are dropped beyond this while the database is failing
+
+# Admission control for the LLM-backed views: per-endpoint in-flight limits and wait queues sharing
+# ADMISSION_MAX_IN_FLIGHT slots. Freed slots go to the lowest priority number first, so scoring is
+# admitted ahead of generation; requests that cannot get in within ADMISSION_QUEUE_TIMEOUT seconds
+# receive a 503 with Retry-After.
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "True") == "True"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "24"))
+ADMISSION_ENDPOINTS = {
+    "score": {"max_in_flight": 24, "max_queue": 48, "priority": 0},
+    "generate": {"max_in_flight": 8, "max_queue": 8, "priority": 1},
+}
+ADMISSION_QUEUE_TIMEOUT = 2.0  # seconds
+
+# Opt-in profiling of single generate/score/upload requests: those sending an X-Profile-Token header
+# equal to PROFILING_TOKEN, plus a random PROFILING_SAMPLE_RATE fraction of all requests. The stacks of
+# the request thread, and of worker threads while they run its sync_to_async calls (parsing, dedup),
+# are sampled every PROFILING_INTERVAL seconds into wall-clock and CPU profiles; the newest
+# PROFILING_MAX_STORED are kept for download from /api/assessment/profiles/ with the token.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL = 0.005  # seconds
+PROFILING_MAX_STORED = int(os.getenv("PROFILING_MAX_STORED", "200"))
+
+# Prometheus metrics are served at /metrics to scrapers sending "Authorization: Bearer <METRICS_TOKEN>";
+# with no token set the endpoint answers 403. Counters, gauges and histograms live in each server
+# process, so with several workers a scrape only sees the worker that answered it: run one worker per
+# scrape target, or expose each worker on its own port.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 CHROMA_DB_DIR = os.path.join(BASE_DIR, "chroma_db")
 
+# Vector backend: "pinecone", or "local" for the file-backed store in assessment/vectorstore.py.
+# The local store keeps int8 ("int8") or 1-bit ("binary") codes in memory and rescores the best
+# top_k * LOCAL_VECTOR_OVERSAMPLE candidates against mmapped float32 vectors ("none" scans those directly).
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_VECTOR_DIR = os.path.join(BASE_DIR, "vector_store")
+LOCAL_VECTOR_QUANTIZATION = os.getenv("LOCAL_VECTOR_QUANTIZATION", "int8")
+LOCAL_VECTOR_OVERSAMPLE = int(os.getenv("LOCAL_VECTOR_OVERSAMPLE", "4"))
+# "hnsw" walks an HNSW graph (assessment/hnsw.py) instead of scanning every row. Larger M and
+# ef_construction give a better graph at higher insert cost; HNSW_EF_SEARCH trades latency for recall.
+LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "flat")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# Flat scans of namespaces with at least LOCAL_VECTOR_SHARD_MIN_ROWS rows are split across this
+# many worker processes sharing the mmapped files (0 or 1 scans in the request thread).
+LOCAL_VECTOR_WORKERS = int(os.getenv("LOCAL_VECTOR_WORKERS", "0"))
+LOCAL_VECTOR_SHARD_MIN_ROWS = int(os.getenv("LOCAL_VECTOR_SHARD_MIN_ROWS", "50000"))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -24,7 +24,10 @@ from django.views.generic import TemplateView  # Add this import
 from django.contrib import admin
 from django.urls import path, include
 
+from assessment.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/assessment/', include('assessment.urls')),  # Include the assessment app URLs
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape target
 ]
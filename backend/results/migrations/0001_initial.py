@@ -0,0 +1,108 @@
+# Generated by Django 5.0.7 on 2026-10-19 12:00
+
+import django.utils.timezone
+import results.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="AssessmentAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                ("score_sum", models.FloatField(default=0.0)),
+                ("pass_count", models.IntegerField(default=0)),
+                (
+                    "distribution",
+                    models.JSONField(default=results.models.empty_distribution),
+                ),
+                ("unverified_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("assessment_key", models.CharField(max_length=200, unique=True)),
+                ("topic", models.CharField(max_length=200)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="QuestionAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                ("score_sum", models.FloatField(default=0.0)),
+                ("pass_count", models.IntegerField(default=0)),
+                (
+                    "distribution",
+                    models.JSONField(default=results.models.empty_distribution),
+                ),
+                ("unverified_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("assessment_key", models.CharField(max_length=200)),
+                ("question_key", models.CharField(max_length=40)),
+                ("question_text", models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ScoreResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("assessment_key", models.CharField(db_index=True, max_length=200)),
+                ("question_key", models.CharField(db_index=True, max_length=40)),
+                (
+                    "student_id",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("topic", models.CharField(max_length=200)),
+                ("question_type", models.CharField(max_length=20)),
+                ("question_text", models.TextField()),
+                ("user_answer", models.TextField()),
+                ("score", models.FloatField()),
+                ("is_correct", models.BooleanField(default=False)),
+                ("verified_by_llm", models.BooleanField(default=False)),
+                ("explanation", models.TextField(blank=True, default="")),
+                ("key_matches", models.JSONField(default=list)),
+                (
+                    "scored_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="questionaggregate",
+            constraint=models.UniqueConstraint(
+                fields=("assessment_key", "question_key"),
+                name="unique_question_aggregate",
+            ),
+        ),
+    ]
@@ -1,3 +1,80 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+# Score distribution buckets: [0, 0.1), [0.1, 0.2), ... [0.9, 1.0]
+DISTRIBUTION_BUCKETS = 10
+
+
+def empty_distribution():
+    return [0] * DISTRIBUTION_BUCKETS
+
+
+class ScoreResult(models.Model):
+    """One scored answer, as returned in ScoreAnswersView's detailed_results"""
+
+    assessment_key = models.CharField(max_length=200, db_index=True)
+    question_key = models.CharField(max_length=40, db_index=True)
+    student_id = models.CharField(max_length=100, blank=True, default="")
+    topic = models.CharField(max_length=200)
+    question_type = models.CharField(max_length=20)
+    question_text = models.TextField()
+    user_answer = models.TextField()
+    score = models.FloatField()
+    is_correct = models.BooleanField(default=False)
+    verified_by_llm = models.BooleanField(default=False)
+    explanation = models.TextField(blank=True, default="")
+    key_matches = models.JSONField(default=list)
+    scored_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Result for {self.question_key} ({self.score:.2f})"
+
+
+class ScoreAggregate(models.Model):
+    """Running totals kept up to date as results are written, so reads never scan results.
+
+    Answers the LLM could not score (verified_by_llm is False) are only counted
+    in ``unverified_count``, so an upstream outage does not read as failing students.
+    """
+
+    count = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    pass_count = models.IntegerField(default=0)
+    distribution = models.JSONField(default=empty_distribution)
+    unverified_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.count if self.count else 0.0
+
+    @property
+    def pass_rate(self):
+        return self.pass_count / self.count if self.count else 0.0
+
+
+class AssessmentAggregate(ScoreAggregate):
+    assessment_key = models.CharField(max_length=200, unique=True)
+    topic = models.CharField(max_length=200)
+
+    def __str__(self):
+        return f"Aggregate for {self.assessment_key}"
+
+
+class QuestionAggregate(ScoreAggregate):
+    assessment_key = models.CharField(max_length=200)
+    question_key = models.CharField(max_length=40)
+    question_text = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["assessment_key", "question_key"], name="unique_question_aggregate"
+            )
+        ]
+
+    def __str__(self):
+        return f"Aggregate for {self.question_key} in {self.assessment_key}"
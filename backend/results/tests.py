@@ -1,3 +1,48 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .models import AssessmentAggregate, QuestionAggregate, ScoreResult
+from .writebehind import ResultWriteBuffer, build_results
+
+
+class ResultWriteBufferTests(TestCase):
+    question = {"type": "short_answer", "text": "What does the mitochondria do?", "correct_answer": "Produces ATP"}
+
+    def record(self, buffer, score, student_id, verified=True):
+        result = {"score": score, "is_correct": score >= 0.7, "verified_by_llm": verified}
+        buffer.add(build_results("Cells", [self.question], [result], student_id=student_id))
+
+    def test_flush_writes_results_and_aggregates(self):
+        buffer = ResultWriteBuffer(background=False)
+        for student_id, score in enumerate([0.2, 0.75, 0.95]):
+            self.record(buffer, score, student_id)
+        self.assertEqual(ScoreResult.objects.count(), 0)
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(ScoreResult.objects.count(), 3)
+        aggregate = AssessmentAggregate.objects.get(assessment_key="topic:cells")
+        self.assertEqual(aggregate.count, 3)
+        self.assertAlmostEqual(aggregate.mean_score, 1.9 / 3)
+        self.assertAlmostEqual(aggregate.pass_rate, 2 / 3)
+        self.assertEqual(aggregate.distribution, [0, 0, 1, 0, 0, 0, 0, 1, 0, 1])
+
+    def test_aggregates_accumulate_across_flushes(self):
+        buffer = ResultWriteBuffer(background=False)
+        self.record(buffer, 1.0, 1)
+        buffer.flush()
+        self.record(buffer, 0.0, 2)
+        buffer.flush()
+        aggregate = QuestionAggregate.objects.get()
+        self.assertEqual((aggregate.count, aggregate.pass_count), (2, 1))
+        self.assertEqual(aggregate.mean_score, 0.5)
+
+    def test_unverified_results_are_counted_apart_from_the_scores(self):
+        buffer = ResultWriteBuffer(background=False)
+        self.record(buffer, 0.9, 1)
+        for student_id in (2, 3):
+            self.record(buffer, 0, student_id, verified=False)
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(ScoreResult.objects.filter(verified_by_llm=False).count(), 2)
+        for aggregate in (AssessmentAggregate.objects.get(), QuestionAggregate.objects.get()):
+            self.assertEqual((aggregate.count, aggregate.unverified_count), (1, 2))
+            self.assertEqual((aggregate.mean_score, aggregate.pass_rate), (0.9, 1.0))
+            self.assertEqual(sum(aggregate.distribution), 1)
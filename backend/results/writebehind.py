@@ -0,0 +1,225 @@
+# backend/results/writebehind.py
+
+import atexit
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from assessment import metrics
+from assessment.cohort import question_key
+from assessment.pregen import normalize_topic
+
+from .models import DISTRIBUTION_BUCKETS, AssessmentAggregate, QuestionAggregate, ScoreResult
+
+logger = logging.getLogger(__name__)
+
+JsonDict = Dict[str, Any]
+
+
+def _bucket(score: float) -> int:
+    return min(max(int(score * DISTRIBUTION_BUCKETS), 0), DISTRIBUTION_BUCKETS - 1)
+
+
+class _Totals:
+    """Deltas for one aggregate row, accumulated over a flushed batch"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.score_sum = 0.0
+        self.pass_count = 0
+        self.distribution = [0] * DISTRIBUTION_BUCKETS
+        self.unverified_count = 0
+
+    def add(self, result: ScoreResult) -> None:
+        if not result.verified_by_llm:
+            # Scored 0 because the LLM call failed, not because the answer was wrong
+            self.unverified_count += 1
+            return
+        self.count += 1
+        self.score_sum += result.score
+        self.pass_count += int(result.is_correct)
+        self.distribution[_bucket(result.score)] += 1
+
+    def apply(self, aggregate: Any) -> None:
+        aggregate.count += self.count
+        aggregate.score_sum += self.score_sum
+        aggregate.pass_count += self.pass_count
+        aggregate.distribution = [a + b for a, b in zip(aggregate.distribution, self.distribution)]
+        aggregate.unverified_count += self.unverified_count
+
+
+class ResultWriteBuffer:
+    """Collect scored answers in memory and write them in batches from a background thread.
+
+    Requests only append to the buffer. A flusher thread writes everything
+    pending with one bulk_create, and folds the batch into the assessment and
+    question aggregates in the same transaction, whenever ``batch_size``
+    results are waiting or ``flush_interval`` seconds have passed. Pending
+    results are flushed at interpreter exit; results that fail to write are
+    kept for the next flush up to ``max_pending``. With ``background`` off no
+    thread is started and results are only written by calling ``flush``.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_pending: int = 50_000,
+        background: bool = True,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self._pending: List[ScoreResult] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, results: Sequence[ScoreResult]) -> None:
+        if not results:
+            return
+        with self._lock:
+            self._pending.extend(results)
+            pending = len(self._pending)
+            if self.background and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="results-write-behind", daemon=True)
+                self._thread.start()
+        metrics.gauge_add("results_write_buffer_pending", len(results))
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything pending; returns the number of results written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    ScoreResult.objects.bulk_create(batch, batch_size=self.batch_size)
+                    self._update_aggregates(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} scoring results: {e}")
+                metrics.incr("results_write_failures_total")
+                for result in batch:
+                    # bulk_create may have assigned keys inside the rolled-back transaction
+                    result.pk = None
+                with self._lock:
+                    # Retry on the next flush, dropping the oldest results beyond the cap
+                    self._pending = batch + self._pending
+                    dropped = max(0, len(self._pending) - self.max_pending)
+                    if dropped:
+                        del self._pending[:dropped]
+                if dropped:
+                    logger.error(f"Dropped {dropped} scoring results over the write-behind limit")
+                    metrics.incr("results_dropped_total", dropped)
+                    metrics.gauge_add("results_write_buffer_pending", -dropped)
+                return 0
+            finally:
+                close_old_connections()
+            metrics.gauge_add("results_write_buffer_pending", -len(batch))
+            metrics.incr("results_written_total", len(batch))
+            return len(batch)
+
+    @staticmethod
+    def _update_aggregates(batch: List[ScoreResult]) -> None:
+        assessments: Dict[str, _Totals] = defaultdict(_Totals)
+        questions: Dict[Tuple[str, str], _Totals] = defaultdict(_Totals)
+        first: Dict[Any, ScoreResult] = {}
+        for result in batch:
+            assessments[result.assessment_key].add(result)
+            questions[(result.assessment_key, result.question_key)].add(result)
+            first.setdefault(result.assessment_key, result)
+            first.setdefault((result.assessment_key, result.question_key), result)
+
+        # Row locks keep concurrent flushes from other processes from losing updates
+        for assessment_key, totals in assessments.items():
+            aggregate, _ = AssessmentAggregate.objects.select_for_update().get_or_create(
+                assessment_key=assessment_key, defaults={"topic": first[assessment_key].topic}
+            )
+            totals.apply(aggregate)
+            aggregate.save()
+        for (assessment_key, key), totals in questions.items():
+            aggregate, _ = QuestionAggregate.objects.select_for_update().get_or_create(
+                assessment_key=assessment_key,
+                question_key=key,
+                defaults={"question_text": first[(assessment_key, key)].question_text},
+            )
+            totals.apply(aggregate)
+            aggregate.save()
+
+
+def build_results(
+    topic: str,
+    answers: Sequence[JsonDict],
+    results: Sequence[JsonDict],
+    assessment_id: Optional[Any] = None,
+    student_id: Optional[Any] = None,
+) -> List[ScoreResult]:
+    """ScoreResult rows for answers scored together, e.g. one ScoreAnswersView request.
+
+    Results are grouped by ``assessment_id`` when the client sends one, and by
+    normalized topic otherwise; questions are identified by a hash of their
+    type, text and expected answer.
+    """
+    assessment_key = (str(assessment_id) if assessment_id else f"topic:{normalize_topic(topic)}")[:200]
+    scored_at = timezone.now()
+    rows = []
+    for answer, result in zip(answers, results):
+        rows.append(
+            ScoreResult(
+                assessment_key=assessment_key,
+                question_key=hashlib.sha1("\x1f".join(question_key(answer)).encode("utf-8")).hexdigest(),
+                student_id=str(student_id or ""),
+                topic=topic[:200],
+                question_type=str(answer.get("type") or "")[:20],
+                question_text=str(answer.get("text") or ""),
+                user_answer=str(answer.get("user_answer") or ""),
+                score=float(result.get("score", 0)),
+                is_correct=bool(result.get("is_correct")),
+                verified_by_llm=bool(result.get("verified_by_llm")),
+                explanation=str(result.get("explanation", "")),
+                key_matches=result.get("key_matches", []),
+                scored_at=scored_at,
+            )
+        )
+    return rows
+
+
+result_buffer = ResultWriteBuffer(
+    batch_size=settings.RESULTS_FLUSH_BATCH_SIZE,
+    flush_interval=settings.RESULTS_FLUSH_INTERVAL,
+    max_pending=settings.RESULTS_MAX_PENDING,
+)
+atexit.register(result_buffer.flush)
+
+
+def record_scores(
+    topic: str,
+    answers: Sequence[JsonDict],
+    results: Sequence[JsonDict],
+    assessment_id: Optional[Any] = None,
+    student_id: Optional[Any] = None,
+) -> None:
+    """Queue scored answers for persistence without waiting on the database"""
+    if not settings.RESULTS_WRITE_BEHIND_ENABLED:
+        return
+    try:
+        result_buffer.add(build_results(topic, answers, results, assessment_id, student_id))
+    except Exception as e:
+        logger.error(f"Error queueing scoring results: {e}")